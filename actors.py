@@ -0,0 +1,114 @@
+import asyncio
+import contextvars
+import time
+from db import defer_commits
+
+# Channel whose actor is running the current operation; tasks the operation
+# starts (e.g. through asyncio.wait_for) inherit it
+_current_channel = contextvars.ContextVar('actor_channel', default=None)
+
+class GameActor:
+    """Runs the operations submitted for one channel one at a time.
+
+    Each operation is an async callable that receives the channel's live
+    GameState (or None) from the store. The actor's task drains its inbox
+    and exits once it is empty, so idle channels cost nothing; the next
+    submission starts a new task.
+
+    Writes made by an operation don't hold up the next one: the actor moves
+    on as soon as they are queued, and the caller gets its result once they
+    have committed, so a burst of operations still shares group commits.
+    """
+
+    def __init__(self, registry, channel_id):
+        self.registry = registry
+        self.channel_id = channel_id
+        self.inbox = asyncio.Queue()
+        self.task = None
+
+    def submit(self, operation, args):
+        future = asyncio.get_running_loop().create_future()
+        self.inbox.put_nowait((operation, args, future, time.perf_counter()))
+        self.registry.max_queue_depth = max(self.registry.max_queue_depth, self.inbox.qsize())
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+        return future
+
+    async def _run(self):
+        try:
+            while not self.inbox.empty():
+                operation, args, future, queued_at = self.inbox.get_nowait()
+                self.registry.queue_wait += time.perf_counter() - queued_at
+                if future.cancelled():
+                    continue
+                token = _current_channel.set(self.channel_id)
+                with defer_commits() as commits:
+                    try:
+                        game = await self.registry.store.get_game(self.channel_id)
+                        result = await operation(game, *args)
+                    except Exception as e:
+                        future.set_exception(e)
+                    else:
+                        asyncio.create_task(self._settle(future, result, commits))
+                _current_channel.reset(token)
+                self.registry.operations += 1
+        finally:
+            self.task = None
+            self.registry._retire(self)
+
+    @staticmethod
+    async def _settle(future, result, commits):
+        # Hand the result over only once the operation's writes are durable
+        try:
+            for done in commits:
+                await asyncio.shield(done)
+        except Exception as e:
+            if not future.cancelled():
+                future.set_exception(e)
+            return
+        if not future.cancelled():
+            future.set_result(result)
+
+class GameActors:
+    """Registry of per-channel actors.
+
+    Operations on the same channel are serialized; different channels run
+    in parallel. An operation that submits more work for its own channel
+    runs it inline instead of waiting on itself.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._actors = {}  # channel_id -> GameActor with queued or running work
+
+        self.operations = 0
+        self.inline = 0
+        self.queue_wait = 0.0
+        self.max_queue_depth = 0
+
+    async def run(self, channel_id, operation, *args):
+        """Run `await operation(game, *args)` exclusively for this channel and return its result"""
+        if _current_channel.get() == channel_id:
+            self.inline += 1
+            return await operation(await self.store.get_game(channel_id), *args)
+
+        actor = self._actors.get(channel_id)
+        if actor is None:
+            actor = self._actors[channel_id] = GameActor(self, channel_id)
+        # The caller may be cancelled (e.g. an interaction timing out); the
+        # operation still runs to completion so the game is never left half-updated
+        return await asyncio.shield(actor.submit(operation, args))
+
+    def _retire(self, actor):
+        if self._actors.get(actor.channel_id) is actor and actor.inbox.empty():
+            del self._actors[actor.channel_id]
+
+    def stats(self):
+        return {
+            "active": len(self._actors),
+            "queued": sum(actor.inbox.qsize() for actor in self._actors.values()),
+            "operations": self.operations,
+            "inline": self.inline,
+            "avg_queue_wait_ms": self.queue_wait / self.operations * 1000 if self.operations else 0.0,
+            "max_queue_depth": self.max_queue_depth,
+        }
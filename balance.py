@@ -0,0 +1,189 @@
+"""Rough win-rate estimates for role setups from a faction-level balance model,
+and mafia count suggestions from them.
+
+This is a model of how games are assumed to play out, not a measurement.
+In particular it is not simulator.py: that simulator's town votes with
+no information and its roles have no abilities, so mafia win most of its
+games (about 89% with 13 players and 3 mafia).
+
+The model works like this:
+
+- Each day, either nobody is lynched or one living player is.
+- A lynch is assumed to be TOWN_READ times likelier than chance to hit
+  mafia, plus SPECIAL_WEIGHT for each living town power role. This is how
+  role density enters.
+- Each night, the mafia kill one living non-mafia player.
+- Town wins when no mafia are left. Mafia win once they are at least as
+  many as everyone else.
+
+Thousands of games are advanced together as NumPy arrays.
+
+NumPy is only needed to build the table:
+
+    python balance.py --build [--games 20000]
+    python balance.py --players 13 --density LIGHT --neutrals 1
+"""
+import argparse
+import json
+import os
+import time
+
+try:
+    import numpy as np
+except ImportError:  # lookups from the prebuilt table work without it
+    np = None
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'balance_table.json')
+
+# Assumptions of the model, not values measured from real or simulated games.
+# They were picked so the old vanilla ratio of players // 4 mafia comes out
+# close to an even game.
+# Chance that a day ends without a lynch
+NO_LYNCH_CHANCE = 0.15
+# How much likelier than a random pick a lynch is to hit mafia: TOWN_READ from
+# discussion alone, plus SPECIAL_WEIGHT per living town power role
+TOWN_READ = 2.5
+SPECIAL_WEIGHT = 0.25
+# Mafia win rate the suggestion aims for
+TARGET_MAFIA_WIN_RATE = 0.45
+
+DENSITIES = ("VANILLA", "LIGHT", "HEAVY")
+TABLE_PLAYERS = range(5, 26)
+TABLE_NEUTRALS = range(0, 4)
+
+def special_town_roles(town_count, density):
+    """Number of power roles pick_roles deals to a town of this size"""
+    if density == "LIGHT":
+        return (town_count - 1) // 4
+    if density == "HEAVY":
+        return (town_count - 1) // 2
+    return 0
+
+def estimate(players, density, mafia, neutrals=0, games=20000, seed=None, max_days=60):
+    """Estimated (mafia win rate, town win rate) for one setup"""
+    if np is None:
+        raise RuntimeError("numpy is required to run balance simulations")
+    town_count = players - mafia - neutrals
+    if mafia < 1 or town_count < 1:
+        raise ValueError("a setup needs at least one mafia and one town player")
+
+    rng = np.random.default_rng(seed)
+    town = np.full(games, town_count)
+    special = np.full(games, special_town_roles(town_count, density))
+    maf = np.full(games, mafia)
+    neutral = np.full(games, neutrals)
+    winner = np.zeros(games, dtype=np.int8)  # 0 running, 1 mafia, 2 town
+
+    def kill_non_mafia(mask):
+        # Kill one living non-mafia player in every game in mask, uniformly among them
+        others = town + neutral
+        pick = rng.random(games) * np.maximum(others, 1)
+        hit_town = mask & (pick < town)
+        # A dead townie is a power role with probability special/town
+        hit_special = hit_town & (rng.random(games) * np.maximum(town, 1) < special)
+        town[hit_town] -= 1
+        special[hit_special] -= 1
+        neutral[mask & ~hit_town] -= 1
+
+    def settle():
+        running = winner == 0
+        winner[running & (maf == 0)] = 2
+        winner[running & (maf > 0) & (maf >= town + neutral)] = 1
+
+    settle()
+    for _ in range(max_days):
+        running = winner == 0
+        if not running.any():
+            break
+
+        # Day: maybe lynch, leaning towards mafia
+        lynch = running & (rng.random(games) >= NO_LYNCH_CHANCE)
+        weight = maf * (TOWN_READ + SPECIAL_WEIGHT * special)
+        total = weight + town + neutral
+        hit_mafia = lynch & (rng.random(games) * total < weight)
+        maf[hit_mafia] -= 1
+        kill_non_mafia(lynch & ~hit_mafia)
+        settle()
+
+        # Night: the mafia kill
+        kill_non_mafia(winner == 0)
+        settle()
+
+    return float((winner == 1).mean()), float((winner == 2).mean())
+
+def table_key(players, density, neutrals):
+    return f"{players}:{density}:{neutrals}"
+
+def build_table(games=20000, seed=1):
+    """{players:density:neutrals -> {mafia count: mafia win rate}} over the supported range"""
+    table = {}
+    for players in TABLE_PLAYERS:
+        for density in DENSITIES:
+            for neutrals in TABLE_NEUTRALS:
+                rates = {}
+                for mafia in range(1, (players - neutrals + 1) // 2 + 1):
+                    if players - mafia - neutrals < 1:
+                        break
+                    mafia_rate, _ = estimate(players, density, mafia, neutrals, games, seed)
+                    rates[str(mafia)] = round(mafia_rate, 4)
+                table[table_key(players, density, neutrals)] = rates
+    return table
+
+_table = None
+
+def load_table(path=TABLE_PATH):
+    global _table
+    if _table is None:
+        try:
+            with open(path) as f:
+                _table = json.load(f)
+        except (OSError, ValueError):
+            _table = {}
+    return _table
+
+def suggest_mafia_count(players, density, neutrals=0, target=TARGET_MAFIA_WIN_RATE):
+    """(mafia count, estimated mafia win rate) closest to target, or None when the table has no entry"""
+    rates = load_table().get(table_key(players, density, neutrals))
+    if not rates:
+        return None
+    mafia, rate = min(rates.items(), key=lambda item: (abs(item[1] - target), int(item[0])))
+    return int(mafia), rate
+
+def heuristic_mafia_count(players, density):
+    """The fixed ratios used before the balance table existed"""
+    if density == "VANILLA":
+        return max(1, players // 4)
+    if density == "LIGHT":
+        return max(1, players // 3)
+    return max(1, players // 2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--build', action='store_true', help=f"rebuild {os.path.basename(TABLE_PATH)}")
+    parser.add_argument('--games', type=int, default=20000, help="simulated games per setup")
+    parser.add_argument('--players', type=int, default=13)
+    parser.add_argument('--density', choices=DENSITIES, default="LIGHT")
+    parser.add_argument('--neutrals', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.build:
+        started = time.perf_counter()
+        table = build_table(args.games, args.seed)
+        with open(TABLE_PATH, 'w') as f:
+            json.dump(table, f, indent=1, sort_keys=True)
+        print(f"Wrote {len(table)} setups to {TABLE_PATH} in {time.perf_counter() - started:.1f}s")
+        return
+
+    print(f"{args.players} players, {args.density}, {args.neutrals} neutral(s):")
+    for mafia in range(1, (args.players - args.neutrals + 1) // 2 + 1):
+        started = time.perf_counter()
+        mafia_rate, town_rate = estimate(args.players, args.density, mafia, args.neutrals, args.games, args.seed)
+        print(f"  {mafia} mafia: mafia {mafia_rate:6.1%}  town {town_rate:6.1%}  "
+              f"({args.games / (time.perf_counter() - started):,.0f} games/s)")
+    suggestion = suggest_mafia_count(args.players, args.density, args.neutrals)
+    if suggestion:
+        print(f"Table suggestion: {suggestion[0]} mafia ({suggestion[1]:.1%} mafia wins)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Encode/decode throughput of the game_data codecs in codec.py.
+
+Compares the legacy JSON path with the binary codec for one game document
+and checks that the binary codec round-trips integer vote keys. The binary
+codec is skipped when msgpack is not installed. Run from the repository root:
+
+    python benchmarks/bench_codec.py [--players 13 25]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_models import make_game_dict
+from codec import JSONCodec, BinaryCodec, msgpack
+
+def throughput(fn, number):
+    seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    return 1 / seconds, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, nargs='+', default=[13, 25], help="players per game")
+    parser.add_argument('--number', type=int, default=5000, help="calls per timing run")
+    args = parser.parse_args()
+    
+    codecs = [JSONCodec()] + ([BinaryCodec()] if msgpack is not None else [])
+    print(f"{'players':>7} {'codec':<8}{'size':>8}{'encode/s':>12}{'decode/s':>12}{'enc MB/s':>10}{'dec MB/s':>10}")
+    for player_count in args.players:
+        game_dict = make_game_dict(1, player_count)
+        for codec in codecs:
+            encoded = codec.encode(game_dict)
+            size = len(encoded.encode('utf-8') if isinstance(encoded, str) else encoded)
+            decoded = codec.decode(encoded)
+            assert decoded['votes'] == game_dict['votes'], "vote keys did not round-trip"
+            
+            encode_rate, _ = throughput(lambda: codec.encode(game_dict), args.number)
+            decode_rate, _ = throughput(lambda: codec.decode(encoded), args.number)
+            print(
+                f"{player_count:>7} {codec.name:<8}{size:>8}{encode_rate:>12,.0f}{decode_rate:>12,.0f}"
+                f"{encode_rate * size / 1e6:>10.1f}{decode_rate * size / 1e6:>10.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
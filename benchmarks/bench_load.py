@@ -0,0 +1,324 @@
+"""Load scenarios for GameStore and the vote/signup/game-start paths.
+
+Drives the real VoteCog commands, SignupView buttons, game start and
+phase transitions through the fakes in benchmarks/fakes.py against a
+temporary SQLite file, and reports throughput, p50/p99 latency and bytes
+written for each scenario. Run from the repository root:
+
+    python benchmarks/bench_load.py [--scenario games signup votes expiry]
+                                    [--games 50] [--players 13]
+                                    [--rush 100] [--vote-rate 200] [--vote-seconds 5]
+                                    [--expire 500] [--http-latency 0] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiosqlite
+
+from fakes import FakeBot, FakeContext, FakeInteraction
+from cogs.setup import assign_roles, send_game_start
+from cogs.vote import VoteCog
+from db import ReaderPool
+from models import GameState, GameConfig, Phase
+from store import GameStore
+from views import SignupView
+
+HOST_ID = 1
+
+def written_bytes():
+    """Bytes this process has passed to write() so far (Linux), or None"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+class Scenario:
+    """Latencies per operation plus the DB activity of one scenario run"""
+
+    def __init__(self, name, bot):
+        self.name = name
+        self.bot = bot
+        self.store = bot.store
+        self.latencies = {}  # op -> [seconds]
+        self.notes = {}
+
+    async def timed(self, op, coro, scheduled_at=None):
+        # With scheduled_at (open-loop load) the latency includes time spent queued
+        started = scheduled_at if scheduled_at is not None else time.perf_counter()
+        await coro
+        self.latencies.setdefault(op, []).append(time.perf_counter() - started)
+
+    async def start(self):
+        """Start (or restart, after a scenario's setup) the measured window"""
+        await self.store.flush()
+        self.wall_started = time.perf_counter()
+        self.write_stats_before = self.store.write_stats()
+        self.written_before = written_bytes()
+        self.http_before = self.bot.http.requests
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.store.flush()
+        self.wall = time.perf_counter() - self.wall_started
+        written_after = written_bytes()
+        self.written = written_after - self.written_before if self.written_before is not None else None
+        after = self.store.write_stats()
+        self.commits = after['commits'] - self.write_stats_before['commits']
+        self.statements = after['statements'] - self.write_stats_before['statements']
+        self.http_requests = self.bot.http.requests - self.http_before
+
+    def report(self):
+        rows = []
+        for op, values in self.latencies.items():
+            values.sort()
+            rows.append({
+                "scenario": self.name,
+                "op": op,
+                "count": len(values),
+                "throughput": len(values) / self.wall if self.wall else 0.0,
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": values[-1] * 1000,
+            })
+        return {
+            "scenario": self.name,
+            "wall_s": self.wall,
+            "bytes_written": self.written,
+            "commits": self.commits,
+            "statements": self.statements,
+            "http_requests": self.http_requests,
+            "ops": rows,
+            "notes": self.notes,
+        }
+
+async def open_store(path, readers):
+    db = await aiosqlite.connect(path)
+    store = GameStore(db)
+    await store.init_db()
+    if readers:
+        store.readers = await ReaderPool.open(path, readers)
+    return store
+
+async def close_store(store):
+    await store.flush()
+    if store.readers:
+        await store.readers.close()
+    await store.db.close()
+
+async def new_game(bot, phase="SIGNUP", ends_at=None, max_players=None):
+    channel = bot.add_channel()
+    game = GameState(
+        channel_id=channel.id,
+        guild_id=1,
+        host_id=HOST_ID,
+        config=GameConfig(max_players=max_players, signup_ends_at=ends_at or int(time.time()) + 3600),
+        players=[],
+        phase=Phase(name=phase, number=1 if phase == "DAY" else 0, ends_at=ends_at or int(time.time()) + 3600),
+    )
+    await bot.store.save_game(game)
+    return channel, game
+
+async def post_signup(bot, channel, game):
+    """What m!play does after configuration: post the signup message and remember it"""
+    view = SignupView()
+    message = await channel.send("🎭 Mafia Signup", view=view)
+    game.messages['signup_message_id'] = message.id
+    bot.signup_renderer.track(message)
+    await bot.store.save_game(game)
+    return view
+
+def player_id(game_index, player_index):
+    return 1000 + game_index * 1000 + player_index
+
+async def scenario_games(args, bot, scenario):
+    """N games run concurrently: signups, game start, then one vote per player"""
+    cog = VoteCog(bot)
+
+    async def lifecycle(index):
+        channel, game = await new_game(bot)
+        view = await post_signup(bot, channel, game)
+        for p in range(args.players):
+            user = bot.member(player_id(index, p))
+            await scenario.timed("join", view.join_button.callback(FakeInteraction(bot, channel, user)))
+
+        async def start(game):
+            game.mafia_count = max(1, args.players // 4)
+            game.neutral_count = 0
+            await assign_roles(bot, game)
+
+        async def start_game():
+            await bot.actors.run(channel.id, start)
+            await send_game_start(bot, game)
+
+        await scenario.timed("assign_roles", start_game())
+
+        # Everyone votes for a different player so the day never hammers
+        players = [p.id for p in game.players]
+        for p, voter_id in enumerate(players):
+            ctx = FakeContext(bot, channel, bot.member(voter_id))
+            target = bot.member(players[(p + 1) % len(players)])
+            await scenario.timed("vote", cog.vote_command.callback(cog, ctx, target))
+
+    await asyncio.gather(*(lifecycle(i) for i in range(args.games)))
+
+async def scenario_signup(args, bot, scenario):
+    """Everyone clicks Join on one signup message at the same moment"""
+    channel, game = await new_game(bot)
+    view = await post_signup(bot, channel, game)
+    clicks = [
+        scenario.timed("join", view.join_button.callback(FakeInteraction(bot, channel, bot.member(player_id(0, p)))))
+        for p in range(args.rush)
+    ]
+    await asyncio.gather(*clicks)
+
+    # Let the renderer send its last coalesced edit
+    await asyncio.sleep(bot.signup_renderer.window * 2)
+    stats = bot.signup_renderer.stats()
+    scenario.notes["signup_edits"] = f"{stats['edits']} sent for {stats['requested']} requested"
+    assert len(game.players) == args.rush
+
+async def scenario_votes(args, bot, scenario):
+    """Open-loop vote/unvote traffic at a fixed rate against one day phase"""
+    cog = VoteCog(bot)
+    channel, game = await new_game(bot, phase="DAY")
+    for p in range(args.players):
+        game.add_player(player_id(0, p))
+    await bot.store.save_game(game)
+    await scenario.start()
+
+    players = [p.id for p in game.players]
+    rng = random.Random(1)
+    total = int(args.vote_rate * args.vote_seconds)
+    hammers = 0
+
+    async def one(i, scheduled_at):
+        nonlocal hammers
+        await asyncio.sleep(max(0.0, scheduled_at - time.perf_counter()))
+        ctx = FakeContext(bot, channel, bot.member(rng.choice(players)))
+        if rng.random() < 0.1 and ctx.author.id in game.votes:
+            await scenario.timed("unvote", cog.unvote_command.callback(cog, ctx), scheduled_at)
+        else:
+            target = bot.member(rng.choice(players))
+            await scenario.timed("vote", cog.vote_command.callback(cog, ctx, target), scheduled_at)
+        if game.phase.name != "DAY":
+            # A hammer ended the day; reopen it so the storm keeps hitting the vote path
+            hammers += 1
+            game.phase.name = "DAY"
+            game.clear_votes()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i, start + i / args.vote_rate) for i in range(total)))
+    scenario.notes["target_rate"] = args.vote_rate
+    scenario.notes["hammers"] = hammers
+    problems = game.check_tally_consistency()
+    assert not problems, problems
+
+async def scenario_expiry(args, bot, scenario):
+    """Many signups expire at once and the sweep hands them to the scheduler's worker pool"""
+    now = int(time.time())
+
+    async def expired_signup(index):
+        channel, game = await new_game(bot, ends_at=now - args.expire + index)
+        await post_signup(bot, channel, game)
+        for p in range(game.config.min_players):
+            game.add_player(player_id(index, p))
+        await bot.store.save_game(game)
+
+    await asyncio.gather(*(expired_signup(i) for i in range(args.expire)))
+
+    # Start cold, as after a restart
+    bot.store._cache.clear()
+    await scenario.start()
+
+    started = time.perf_counter()
+    due = await bot.store.get_games_due(int(time.time()))
+    scenario.notes["due_query_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    assert len(due) == args.expire
+
+    await scenario.timed("sweep", bot.store.process_phase_transitions(bot))
+    scenario.notes["transitions"] = len(due)
+    for game in due:
+        assert (await bot.store.get_game(game.channel_id)).fired_phase
+
+SCENARIOS = {
+    "games": scenario_games,
+    "signup": scenario_signup,
+    "votes": scenario_votes,
+    "expiry": scenario_expiry,
+}
+
+async def run(args):
+    results = []
+    for name in args.scenario:
+        directory = tempfile.mkdtemp(prefix="mafia-bench-")
+        path = os.path.join(directory, "bench.db")
+        store = await open_store(path, args.readers)
+        bot = FakeBot(store, http_latency=args.http_latency / 1000)
+        try:
+            async with Scenario(name, bot) as scenario:
+                await SCENARIOS[name](args, bot, scenario)
+            result = scenario.report()
+            result["db_file_bytes"] = sum(
+                os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix)
+            )
+            results.append(result)
+        finally:
+            await close_store(store)
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+def print_results(results):
+    print(f"{'scenario':<9}{'op':<14}{'count':>7}{'ops/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for result in results:
+        for row in result["ops"]:
+            print(f"{row['scenario']:<9}{row['op']:<14}{row['count']:>7}{row['throughput']:>10,.0f}"
+                  f"{row['p50_ms']:>9.2f}{row['p99_ms']:>9.2f}{row['max_ms']:>9.2f}")
+        written = f"{result['bytes_written']:,}" if result['bytes_written'] is not None else "n/a"
+        notes = "".join(f", {key}={value}" for key, value in result["notes"].items())
+        print(f"{'':<9}wall {result['wall_s']:.2f}s, {written} bytes written, "
+              f"{result['commits']} commits / {result['statements']} statements, "
+              f"db file {result['db_file_bytes']:,} bytes, {result['http_requests']} fake HTTP calls{notes}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--games', type=int, default=50, help="concurrent games in the games scenario")
+    parser.add_argument('--players', type=int, default=13, help="players per game")
+    parser.add_argument('--rush', type=int, default=100, help="simultaneous Join clicks in the signup scenario")
+    parser.add_argument('--vote-rate', type=float, default=200, help="votes per second in the votes scenario")
+    parser.add_argument('--vote-seconds', type=float, default=5, help="length of the vote storm")
+    parser.add_argument('--expire', type=int, default=500, help="games expiring together in the expiry scenario")
+    parser.add_argument('--readers', type=int, default=3, help="read-only connections (0 = read on the writer)")
+    parser.add_argument('--http-latency', type=float, default=0, help="simulated Discord round-trip in ms")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
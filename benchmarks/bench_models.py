@@ -0,0 +1,75 @@
+"""Microbenchmark for the model classes in models.py.
+
+Reports the memory held by one cached GameState and the time to construct
+and serialize each model. Run from the repository root:
+
+    python benchmarks/bench_models.py [--games 1000] [--players 13]
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import GameState, GameConfig, Player, Phase
+
+def make_game_dict(channel_id, player_count):
+    game = GameState(
+        channel_id=channel_id,
+        guild_id=1,
+        host_id=1,
+        config=GameConfig(),
+        players=[],
+        phase=Phase(name="DAY", number=1, ends_at=1700000000)
+    )
+    for player_id in range(1, player_count + 1):
+        game.add_player(channel_id * 1000 + player_id)
+    for player in game.players[: player_count // 2]:
+        game.cast_vote(player.id, game.players[-1].id)
+    game.messages['signup_message_id'] = channel_id + 1
+    return game.to_dict()
+
+def measure_memory(game_count, player_count):
+    data = [make_game_dict(channel_id, player_count) for channel_id in range(1, game_count + 1)]
+    
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    cache = {d['channel_id']: GameState.from_dict(d) for d in data}
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    assert len(cache) == game_count
+    return (after - before) / game_count
+
+def time_per_call(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=1000, help="games held in the simulated cache")
+    parser.add_argument('--players', type=int, default=13, help="players per game")
+    args = parser.parse_args()
+    
+    game_dict = make_game_dict(1, args.players)
+    game = GameState.from_dict(game_dict)
+    player_dict = game_dict['players'][0]
+    
+    print(f"Memory per cached game ({args.players} players): {measure_memory(args.games, args.players):,.0f} bytes")
+    print()
+    print(f"{'operation':<28}{'time per call':>16}")
+    results = [
+        ("Player()", time_per_call(lambda: Player(id=1), 200000)),
+        ("Player.from_dict", time_per_call(lambda: Player.from_dict(player_dict), 200000)),
+        ("Player.to_dict", time_per_call(lambda: game.players[0].to_dict(), 200000)),
+        ("GameConfig.from_dict", time_per_call(lambda: GameConfig.from_dict(game_dict['config']), 200000)),
+        ("Phase.from_dict", time_per_call(lambda: Phase.from_dict(game_dict['phase']), 200000)),
+        ("GameState.from_dict", time_per_call(lambda: GameState.from_dict(game_dict), 20000)),
+        ("GameState.to_dict", time_per_call(lambda: game.to_dict(), 20000)),
+    ]
+    for name, seconds in results:
+        print(f"{name:<28}{seconds * 1e6:>13.2f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Stand-ins for the discord.py objects the cogs and views touch.
+
+Every fake REST call goes through FakeHTTP, which counts requests and can
+sleep for a fixed latency to approximate Discord round-trips. Nothing here
+opens a network connection.
+"""
+import asyncio
+import itertools
+
+from actors import GameActors
+from dm import DMDispatcher
+from render import MessageRenderer
+from resolver import UserResolver
+from scheduler import PhaseScheduler
+
+_ids = itertools.count(10**17)
+
+class FakeHTTP:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+
+    async def call(self):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+class FakeMessage:
+    def __init__(self, http, channel, content=None, view=None):
+        self.http = http
+        self.id = next(_ids)
+        self.channel = channel
+        self.content = content
+        self.view = view
+        self.edits = 0
+
+    async def edit(self, content=None, view=None, **kwargs):
+        await self.http.call()
+        if content is not None:
+            self.content = content
+        self.view = view
+        self.edits += 1
+        return self
+
+class FakeChannel:
+    def __init__(self, http, channel_id=None, guild=None):
+        self.http = http
+        self.id = channel_id or next(_ids)
+        self.guild = guild
+        self.mention = f"<#{self.id}>"
+        self.messages = {}
+        self.sent = 0
+
+    async def send(self, content=None, view=None, **kwargs):
+        await self.http.call()
+        message = FakeMessage(self.http, self, content, view)
+        self.messages[message.id] = message
+        self.sent += 1
+        return message
+
+    async def fetch_message(self, message_id):
+        await self.http.call()
+        return self.messages[message_id]
+
+class FakeUser:
+    def __init__(self, http, user_id):
+        self.http = http
+        self.id = user_id
+        self.mention = f"<@{user_id}>"
+        self.name = f"user{user_id}"
+        self.guild_permissions = FakePermissions()
+        self.dms = []
+
+    async def send(self, content=None, view=None, **kwargs):
+        await self.http.call()
+        self.dms.append(content)
+
+class FakePermissions:
+    manage_channels = False
+
+class FakeResponse:
+    def __init__(self, http):
+        self.http = http
+        self.messages = []
+
+    async def send_message(self, content=None, ephemeral=False, **kwargs):
+        await self.http.call()
+        self.messages.append(content)
+
+    async def defer(self, ephemeral=False, thinking=False):
+        await self.http.call()
+
+class FakeFollowup:
+    """interaction.followup: messages sent after the response was deferred"""
+
+    def __init__(self, http):
+        self.http = http
+        self.messages = []
+
+    async def send(self, content=None, ephemeral=False, **kwargs):
+        await self.http.call()
+        self.messages.append(content)
+
+class FakeInteraction:
+    """A button click or slash command from `user` in `channel`"""
+
+    def __init__(self, bot, channel, user):
+        self.client = bot
+        self.channel = channel
+        self.user = user
+        # Interactions from slash commands have no message
+        self.message = None
+        self.response = FakeResponse(bot.http)
+        self.followup = FakeFollowup(bot.http)
+        self.extras = {}
+
+class FakeContext:
+    """The parts of commands.Context the prefix commands use"""
+
+    def __init__(self, bot, channel, author):
+        self.bot = bot
+        self.channel = channel
+        self.author = author
+        self.guild = channel.guild
+        self.command = None
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+class FakeBot:
+    """Carries the real store, actors, scheduler and renderer/DM/resolver helpers over fake HTTP"""
+
+    def __init__(self, store, http_latency=0.0, render_window=0.05):
+        self.http = FakeHTTP(http_latency)
+        self.store = store
+        self.actors = GameActors(store)
+        self.scheduler = store.scheduler = PhaseScheduler(store, self)
+        self.channels = {}
+        self.users = {}
+        self.signup_renderer = MessageRenderer(render_window)
+        self.dms = DMDispatcher(self, concurrency=5, base_delay=0.01)
+        self.resolver = UserResolver(self)
+
+    def add_channel(self, channel_id=None):
+        channel = FakeChannel(self.http, channel_id)
+        self.channels[channel.id] = channel
+        return channel
+
+    def member(self, user_id):
+        user = self.users.get(user_id)
+        if user is None:
+            user = self.users[user_id] = FakeUser(self.http, user_id)
+        return user
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_guild(self, guild_id):
+        return None
+
+    def get_user(self, user_id):
+        return self.users.get(user_id)
+
+    async def fetch_user(self, user_id):
+        await self.http.call()
+        return self.member(user_id)
+
+    async def create_dm(self, user):
+        await self.http.call()
+        return FakeChannel(self.http)
+
+    def is_closed(self):
+        return False
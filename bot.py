@@ -1,15 +1,33 @@
 import discord
 from discord.ext import commands
 import aiosqlite
+import argparse
 import asyncio
+import hashlib
 import json
+import logging
 import os
+import time
 from store import GameStore
+from scheduler import PhaseScheduler
+from db import ReaderPool
+from render import MessageRenderer
+from dm import DMDispatcher
+from resolver import UserResolver
+from actors import GameActors
+from views import SignupView
+from logs import setup_logging
+import metrics
+
+log = logging.getLogger('bot')
 
 # Load configuration
 with open('config.json') as f:
     config = json.load(f)
 
+# Hash of the last command tree pushed to Discord, so restarts can skip the sync
+COMMAND_HASH_PATH = config.get('command_hash_file', 'command_tree.hash')
+
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
@@ -19,54 +37,169 @@ class MafiaBot(commands.Bot):
         super().__init__(
             command_prefix=config.get('prefix', 'm!'),
             intents=intents,
-            help_command=None
+            help_command=None,
+            tree_cls=metrics.InstrumentedTree,
+            http_trace=metrics.http_trace_config()
         )
         self.db = None
         self.store = None
+        self.scheduler = None
+        # Per-channel actors that serialize every change to a game
+        self.actors = None
+        # Coalesces signup message edits from button clicks
+        self.signup_renderer = MessageRenderer(config.get('signup_edit_window', 1.5))
+        # Role DMs go out in parallel with retries; failures are kept on the game
+        self.dms = DMDispatcher(self, config.get('dm_concurrency', 5))
+        # Cache-first user/member lookups in front of fetch_user
+        self.resolver = UserResolver(self)
+        self.metrics_runner = None
+        # Set by --force-sync to push the command tree even if its hash is unchanged
+        self.force_sync = False
+        
+        # Time every prefix command; slash commands are timed by InstrumentedTree
+        self.before_invoke(metrics.before_command)
+        self.after_invoke(metrics.after_command)
+        self.add_listener(metrics.record_command_error, 'on_command_error')
         
     async def setup_hook(self):
+        timings = {}
+        started = time.perf_counter()
+        
         # Initialize database
         self.db = await aiosqlite.connect('mafia.db')
         self.store = GameStore(self.db)
         await self.store.init_db()
+        archived = await self.store.sweep_finished_games()
+        if archived:
+            log.info("Archived %d finished game(s)", archived)
+        
+        # Read-only WAL connections so reads don't queue behind writes
+        reader_count = config.get('db_readers', 3)
+        if reader_count:
+            self.store.readers = await ReaderPool.open('mafia.db', reader_count)
+        # Phase transitions run on a worker pool, each with a timeout
+        self.scheduler = PhaseScheduler(
+            self.store, self, config.get('transition_workers', 8), config.get('transition_timeout', 60),
+            catchup_rate=config.get('catchup_rate', 2)
+        )
+        self.store.scheduler = self.scheduler
+        self.actors = GameActors(self.store)
+        timings['db'] = time.perf_counter() - started
+        
+        # Re-attach the buttons of every open signup from one indexed query,
+        # without loading any game documents
+        step = time.perf_counter()
+        signups = await self.store.get_signup_messages()
+        for channel_id, message_id in signups:
+            self.add_view(SignupView(), message_id=message_id)
+        timings['views'] = time.perf_counter() - step
+        if signups:
+            log.info("Re-attached %d signup view(s)", len(signups))
+        
+        # Component stats exported alongside the command and store timings
+        metrics.REGISTRY.add_collector('store_cache', self.store.cache_stats)
+        metrics.REGISTRY.add_collector('store_writes', self.store.write_stats)
+        if self.store.readers:
+            metrics.REGISTRY.add_collector('store_readers', self.store.readers.stats)
+        metrics.REGISTRY.add_collector('signup_renderer', self.signup_renderer.stats)
+        metrics.REGISTRY.add_collector('resolver', self.resolver.stats)
+        metrics.REGISTRY.add_collector('dms', self.dms.stats)
+        metrics.REGISTRY.add_collector('actors', self.actors.stats)
+        metrics.REGISTRY.add_collector('scheduler', self.scheduler.stats)
+        
+        # Prometheus text endpoint on localhost; set metrics_port to null to disable
+        metrics_port = config.get('metrics_port', 9108)
+        if metrics_port:
+            try:
+                self.metrics_runner = await metrics.start_server(metrics_port, config.get('metrics_host', '127.0.0.1'))
+            except OSError:
+                log.exception("Could not start metrics endpoint on port %s", metrics_port)
         
         # Load cogs
-        cogs_to_load = ['cogs.setup', 'cogs.phase', 'cogs.vote', 'cogs.time', 'cogs.endgame', 'cogs.debug', 'cogs.help']
+        step = time.perf_counter()
+        cogs_to_load = ['cogs.setup', 'cogs.phase', 'cogs.vote', 'cogs.time', 'cogs.endgame', 'cogs.debug', 'cogs.help', 'cogs.stats']
         for cog in cogs_to_load:
             try:
                 await self.load_extension(cog)
-                print(f"Successfully loaded extension: {cog}")
+                log.info("Loaded extension %s", cog)
             except discord.ClientException as e:
                 if "already loaded" in str(e):
-                    print(f"Extension {cog} is already loaded. Skipping.")
+                    log.info("Extension %s is already loaded. Skipping.", cog)
                 else:
-                    print(f"Failed to load extension {cog}: {e}")
-            except Exception as e:
-                print(f"Failed to load extension {cog}: {e}")
-        
-        print("All extensions loaded. If you don't see any error messages above, all cogs should be working.")
+                    log.exception("Failed to load extension %s", cog)
+            except Exception:
+                log.exception("Failed to load extension %s", cog)
+        timings['cogs'] = time.perf_counter() - step
         
-        # Sync application commands
-        try:
-            synced = await self.tree.sync()
-            print(f"Synced {len(synced)} command(s)")
-        except Exception as e:
-            print(f"Failed to sync commands: {e}")
+        # Sync application commands, only when they changed since the last sync
+        step = time.perf_counter()
+        await self.sync_commands()
+        timings['sync'] = time.perf_counter() - step
         
         # Start background task for phase transitions
         self.phase_task = self.loop.create_task(self.check_phase_transitions())
+        timings['total'] = time.perf_counter() - started
+        
+        log.info(
+            "Startup: %s",
+            ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()),
+            extra={"timings": timings},
+        )
+    
+    def command_tree_hash(self):
+        """Stable hash of the global command tree as it would be sent to Discord"""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands()),
+            key=lambda command: (command.get('type', 1), command['name'])
+        )
+        # The same tree registered under another application still needs a sync
+        data = json.dumps([self.application_id, payload], sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(data.encode()).hexdigest()
+    
+    async def sync_commands(self):
+        tree_hash = self.command_tree_hash()
+        try:
+            with open(COMMAND_HASH_PATH) as f:
+                synced_hash = f.read().strip()
+        except OSError:
+            synced_hash = None
+        
+        if tree_hash == synced_hash and not self.force_sync:
+            log.info("Command tree unchanged (%s), skipping sync", tree_hash[:12])
+            return
+        
+        try:
+            synced = await self.tree.sync()
+        except Exception:
+            log.exception("Failed to sync commands")
+            return
+        log.info("Synced %d command(s), tree hash %s", len(synced), tree_hash[:12])
+        # Only remember the hash once Discord has accepted the tree
+        try:
+            with open(COMMAND_HASH_PATH, 'w') as f:
+                f.write(tree_hash)
+        except OSError:
+            log.exception("Could not write %s", COMMAND_HASH_PATH)
         
     async def check_phase_transitions(self):
-        await self.wait_until_ready()
+        # Sleeps until the next phase deadline instead of polling every game
         while not self.is_closed():
             try:
-                # Check for phase transitions every 5 seconds
+                await self.scheduler.run()
+            except Exception:
+                log.exception("Error in phase transition task")
                 await asyncio.sleep(5)
-                await self.store.process_phase_transitions(self)
-            except Exception as e:
-                print(f"Error in phase transition task: {e}")
+    
+    async def on_app_command_completion(self, interaction, command):
+        self.tree.finish(interaction)
                 
     async def close(self):
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+        if self.store:
+            await self.store.flush()
+            if self.store.readers:
+                await self.store.readers.close()
         if self.db:
             await self.db.close()
         await super().close()
@@ -75,8 +208,18 @@ bot = MafiaBot()
 
 @bot.event
 async def on_ready():
-    print(f'{bot.user} has connected to Discord!')
+    log.info("%s has connected to Discord!", bot.user)
     await bot.change_presence(activity=discord.Game(name="Mafia | m!help or /help"))
 
 if __name__ == "__main__":
-    bot.run(config['token'])
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the Mafia bot")
+    parser.add_argument('--force-sync', action='store_true', help="sync slash commands even if they look unchanged")
+    args = parser.parse_args()
+    bot.force_sync = args.force_sync
+    
+    log_listener = setup_logging(config)
+    try:
+        # Our queue handler is already on the root logger, so discord.py shouldn't add its own
+        bot.run(config['token'], log_handler=None)
+    finally:
+        log_listener.stop()
\ No newline at end of file
@@ -0,0 +1,85 @@
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:  # listed in requirements.txt; without it games are stored as JSON
+    msgpack = None
+
+# Version of the GameState.to_dict layout. Bump it when fields are renamed or
+# change meaning and add the upgrade step to _upgrade(); added fields with
+# defaults need no bump because GameState.from_dict fills them in.
+SCHEMA_VERSION = 1
+
+# Binary rows start with MAGIC, a format version byte and the schema version,
+# followed by the game dict as MessagePack (https://msgpack.org), a documented
+# format that keeps int/str/bool/None types, including integer dict keys,
+# exactly. Rows that do not start with MAGIC are legacy JSON text (schema
+# version 0).
+MAGIC = b'\xa7M'
+FORMAT_VERSION = 2
+_HEADER = struct.Struct('<2sBH')
+
+class CodecError(ValueError):
+    pass
+
+def _upgrade(data, schema_version):
+    """Bring a decoded game dict from an older schema up to SCHEMA_VERSION"""
+    if schema_version > SCHEMA_VERSION:
+        raise CodecError(f"Game data schema {schema_version} is newer than supported {SCHEMA_VERSION}")
+    if schema_version == 0:
+        # JSON turned the integer voter IDs into strings
+        data['votes'] = {int(voter_id): target_id for voter_id, target_id in data.get('votes', {}).items()}
+        data['failed_dms'] = {int(user_id): reason for user_id, reason in (data.get('failed_dms') or {}).items()}
+    return data
+
+def decode_game_data(data):
+    """Decode a stored game_data value in any supported format into a GameState dict"""
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    if isinstance(data, bytes) and data[:2] == MAGIC:
+        _, format_version, schema_version = _HEADER.unpack_from(data)
+        if format_version != FORMAT_VERSION:
+            raise CodecError(f"Unsupported binary format version {format_version}")
+        if msgpack is None:
+            raise CodecError("Binary game data needs the msgpack package")
+        try:
+            value = msgpack.unpackb(data[_HEADER.size:], raw=False, strict_map_key=False)
+        except Exception as e:
+            raise CodecError(f"Corrupt binary game data: {e}") from e
+        if not isinstance(value, dict):
+            raise CodecError(f"Binary game data decoded to {type(value).__name__}, expected dict")
+        return _upgrade(value, schema_version)
+
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return _upgrade(json.loads(data), 0)
+
+class JSONCodec:
+    """The original text format; vote keys are stored as strings and restored on decode"""
+    name = "json"
+
+    def encode(self, game_dict):
+        return json.dumps(game_dict)
+
+    def decode(self, data):
+        return decode_game_data(data)
+
+class BinaryCodec:
+    """Compact versioned MessagePack format that preserves integer dict keys; needs msgpack"""
+    name = "binary"
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, SCHEMA_VERSION)
+
+    def __init__(self):
+        if msgpack is None:
+            raise CodecError("BinaryCodec needs the msgpack package")
+
+    def encode(self, game_dict):
+        return self.header + msgpack.packb(game_dict, use_bin_type=True)
+
+    def decode(self, data):
+        return decode_game_data(data)
+
+def default_codec():
+    """The codec new rows are written with: binary when msgpack is installed, else JSON"""
+    return BinaryCodec() if msgpack is not None else JSONCodec()
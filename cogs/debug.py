@@ -2,9 +2,11 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import random
+import logging
 import time
 from models import GameState, Player
-from store import GameStore
+
+log = logging.getLogger(__name__)
 
 class DebugCog(commands.Cog):
     def __init__(self, bot):
@@ -15,44 +17,33 @@ class DebugCog(commands.Cog):
     @commands.guild_only()
     async def debug_command(self, ctx, mode: str):
         """Enable or disable debug mode"""
-        print(f"DEBUG: debugmode command called with mode: {mode}")
-
-        store = GameStore(self.bot.db)
-        game = await store.get_game(ctx.channel.id)
+        log.debug("debugmode command called with mode %s", mode)
+        await ctx.send(await self.bot.actors.run(ctx.channel.id, self.set_debug_mode, ctx, mode))
+    
+    async def set_debug_mode(self, game, ctx, mode):
+        """Turn debug mode on or off; returns the reply"""
+        store = self.bot.store
         
-        print(f"DEBUG: Game found: {game is not None}")
-        if game:
-            print(f"DEBUG: Current debug_mode: {getattr(game, 'debug_mode', 'NOT SET')}")
-            print(f"DEBUG: Host ID: {game.host_id}, Author ID: {ctx.author.id}")
-
         if not game:
-            await ctx.send("No active game in this channel.")
-            return
+            return "No active game in this channel."
         
         if game.host_id != ctx.author.id:
-            await ctx.send("Only the host can enable debug mode.")
-            return
+            return "Only the host can enable debug mode."
         
         if mode.lower() == "on":
             game.debug_mode = True
-            print(f"DEBUG: Set debug_mode to True")
-            await ctx.send("Debug mode enabled. Use `m!dummy` commands to add test players.")
+            reply = "Debug mode enabled. Use `m!dummy` commands to add test players."
         elif mode.lower() == "off":
             game.debug_mode = False
             # Clear dummy players when disabling debug
-            game.dummy_players = []
-            print(f"DEBUG: Set debug_mode to False")
-            await ctx.send("Debug mode disabled. All dummy players removed.")
+            game.clear_dummy_players()
+            reply = "Debug mode disabled. All dummy players removed."
         else:
-            await ctx.send("Usage: `m!debugmode on|off`")
+            reply = "Usage: `m!debugmode on|off`"
         
-        # Add debug output before and after saving
-        print(f"DEBUG: About to save game with debug_mode: {game.debug_mode}")
         await store.save_game(game)
-        
-        # Verify the save worked by immediately retrieving the game
-        saved_game = await store.get_game(ctx.channel.id)
-        print(f"DEBUG: After save, retrieved debug_mode: {getattr(saved_game, 'debug_mode', 'NOT SET')}")
+        log.info("Debug mode %s for game in channel %s", "on" if game.debug_mode else "off", ctx.channel.id)
+        return reply
 
     @debug_command.error
     async def debug_error(self, ctx, error):
@@ -60,35 +51,33 @@ class DebugCog(commands.Cog):
         if isinstance(error, commands.MissingRequiredArgument):
             await ctx.send("Usage: `m!debugmode on|off`")
         else:
-            print(f"Unexpected error in debug command: {error}")
+            log.error("Unexpected error in debug command", exc_info=error)
     
     @commands.command(name="dummy")
     @commands.guild_only()
     async def dummy_command(self, ctx, action: str, *args):
         """Manage dummy players for testing"""
-        print(f"DEBUG: dummy command called with action: {action}, args: {args}")
-        
-        store = GameStore(self.bot.db)
-        game = await store.get_game(ctx.channel.id)
+        log.debug("dummy command called with action %s, args %s", action, args)
+        await ctx.send(await self.bot.actors.run(ctx.channel.id, self.dummy_action, ctx, action, args))
+    
+    async def dummy_action(self, game, ctx, action, args):
+        """Apply one m!dummy action; returns the reply"""
+        store = self.bot.store
         
         if not game:
-            await ctx.send("No active game in this channel.")
-            return
+            return "No active game in this channel."
         
         current_debug_mode = getattr(game, 'debug_mode', False)
         if not current_debug_mode:
-            await ctx.send("Debug mode is not enabled. Use `m!debugmode on` first.")
-            return
+            return "Debug mode is not enabled. Use `m!debugmode on` first."
         
         if game.host_id != ctx.author.id:
-            await ctx.send("Only the host can manage dummy players.")
-            return
+            return "Only the host can manage dummy players."
         
         # Handle different actions
         if action.lower() == "add":
             if len(args) < 1:
-                await ctx.send("Usage: `m!dummy add <name> [role]`")
-                return
+                return "Usage: `m!dummy add <name> [role]`"
             
             name = args[0]
             role = args[1] if len(args) > 1 else "Villager"
@@ -99,162 +88,117 @@ class DebugCog(commands.Cog):
             
             # Create and add the dummy player
             dummy_player = Player(id=dummy_id, name=name, role=role)
-            game.dummy_players.append(dummy_player)
+            game.add_dummy_player(dummy_player)
             
             await store.save_game(game)
-            await ctx.send(f"Added dummy player '{name}' with role '{role}' (ID: {dummy_id})")
+            return f"Added dummy player '{name}' with role '{role}' (ID: {dummy_id})"
         
         elif action.lower() == "remove":
             if len(args) < 1:
-                await ctx.send("Usage: `m!dummy remove <name>`")
-                return
+                return "Usage: `m!dummy remove <name>`"
             
             name = args[0]
-            removed = False
-            
-            for i, player in enumerate(game.dummy_players):
-                if player.name and player.name.lower() == name.lower():
-                    del game.dummy_players[i]
-                    removed = True
-                    break
+            player = game.get_player_by_name(name)
+            removed = player is not None and player in game.dummy_players
             
             if removed:
+                game.remove_player(player.id)
                 await store.save_game(game)
-                await ctx.send(f"Removed dummy player '{name}'")
+                return f"Removed dummy player '{name}'"
             else:
-                await ctx.send(f"No dummy player named '{name}' found")
+                return f"No dummy player named '{name}' found"
         
         elif action.lower() == "list":
             if not game.dummy_players:
-                await ctx.send("No dummy players added.")
-                return
+                return "No dummy players added."
             
             player_list = []
             for player in game.dummy_players:
                 status = f"{player.name} (ID: {player.id}, Role: {player.role}, Status: {player.status})"
                 player_list.append(status)
             
-            await ctx.send("Dummy players:\n" + "\n".join(player_list))
+            return "Dummy players:\n" + "\n".join(player_list)
         
         elif action.lower() == "vote":
             if len(args) < 2:
-                await ctx.send("Usage: `m!dummy vote <voter> <target>`")
-                return
+                return "Usage: `m!dummy vote <voter> <target>`"
             
             voter_name, target_name = args[0], args[1]
             
             # Find voter and target players
-            voter = None
-            target = None
-            
-            for player in game.get_all_players():
-                if player.name and player.name.lower() == voter_name.lower():
-                    voter = player
-                if player.name and player.name.lower() == target_name.lower():
-                    target = player
+            voter = game.get_player_by_name(voter_name)
+            target = game.get_player_by_name(target_name)
             
             if not voter:
-                await ctx.send(f"Voter '{voter_name}' not found")
-                return
+                return f"Voter '{voter_name}' not found"
             
             if not target:
-                await ctx.send(f"Target '{target_name}' not found")
-                return
+                return f"Target '{target_name}' not found"
             
             # Record the vote
-            game.votes[voter.id] = target.id
-            await store.save_game(game)
-            await ctx.send(f"{voter.name} voted for {target.name}")
+            await store.record_vote(game, voter.id, target.id)
+            return f"{voter.name} voted for {target.name}"
         
         elif action.lower() == "unvote":
             if len(args) < 1:
-                await ctx.send("Usage: `m!dummy unvote <voter>`")
-                return
+                return "Usage: `m!dummy unvote <voter>`"
             
             voter_name = args[0]
-            voter = None
-            
-            for player in game.get_all_players():
-                if player.name and player.name.lower() == voter_name.lower():
-                    voter = player
-                    break
+            voter = game.get_player_by_name(voter_name)
             
             if not voter:
-                await ctx.send(f"Voter '{voter_name}' not found")
-                return
+                return f"Voter '{voter_name}' not found"
             
             if voter.id in game.votes:
-                del game.votes[voter.id]
-                await store.save_game(game)
-                await ctx.send(f"Removed vote from {voter.name}")
+                await store.record_vote(game, voter.id, None)
+                return f"Removed vote from {voter.name}"
             else:
-                await ctx.send(f"{voter.name} doesn't have a vote to remove")
+                return f"{voter.name} doesn't have a vote to remove"
         
         elif action.lower() == "kill":
             if len(args) < 1:
-                await ctx.send("Usage: `m!dummy kill <player>`")
-                return
+                return "Usage: `m!dummy kill <player>`"
             
             player_name = args[0]
-            player = None
-            
-            for p in game.get_all_players():
-                if p.name and p.name.lower() == player_name.lower():
-                    player = p
-                    break
+            player = game.get_player_by_name(player_name)
             
             if not player:
-                await ctx.send(f"Player '{player_name}' not found")
-                return
+                return f"Player '{player_name}' not found"
             
-            player.status = "dead"
+            game.kill_player(player)
             await store.save_game(game)
-            await ctx.send(f"{player.name} has been killed")
+            return f"{player.name} has been killed"
         
         elif action.lower() == "revive":
             if len(args) < 1:
-                await ctx.send("Usage: `m!dummy revive <player>`")
-                return
+                return "Usage: `m!dummy revive <player>`"
             
             player_name = args[0]
-            player = None
-            
-            for p in game.get_all_players():
-                if p.name and p.name.lower() == player_name.lower():
-                    player = p
-                    break
+            player = game.get_player_by_name(player_name)
             
             if not player:
-                await ctx.send(f"Player '{player_name}' not found")
-                return
+                return f"Player '{player_name}' not found"
             
-            player.status = "alive"
+            game.revive_player(player)
             await store.save_game(game)
-            await ctx.send(f"{player.name} has been revived")
+            return f"{player.name} has been revived"
         
         elif action.lower() == "assign":
             if len(args) < 2:
-                await ctx.send("Usage: `m!dummy assign <player> <role>`")
-                return
+                return "Usage: `m!dummy assign <player> <role>`"
             
             player_name, role = args[0], args[1]
-            player = None
-            
-            for p in game.get_all_players():
-                if p.name and p.name.lower() == player_name.lower():
-                    player = p
-                    break
+            player = game.get_player_by_name(player_name)
             
             if not player:
-                await ctx.send(f"Player '{player_name}' not found")
-                return
+                return f"Player '{player_name}' not found"
             
             player.role = role
             await store.save_game(game)
-            await ctx.send(f"Assigned role '{role}' to {player.name}")
+            return f"Assigned role '{role}' to {player.name}"
         
         else:
-            await ctx.send("""
+            return """
             Invalid action. Available actions:
             
             add <name> [role] - Add a dummy player
@@ -265,7 +209,7 @@ class DebugCog(commands.Cog):
             kill <player> - Kill a player
             revive <player> - Revive a player
             assign <player> <role> - Assign a role to a player
-            """)
+            """
     
     @dummy_command.error
     async def dummy_error(self, ctx, error):
@@ -286,37 +230,41 @@ class DebugCog(commands.Cog):
             """)
         else:
             await ctx.send(f"An error occurred: {str(error)}")
-            print(f"Unexpected error in dummy command: {error}")
+            log.error("Unexpected error in dummy command", exc_info=error)
 
     @commands.command(name="gamestate")
     @commands.guild_only()
     async def gamestate_command(self, ctx):
         """Display current game state"""
         try:
-            store = GameStore(self.bot.db)
-            game = await store.get_game(ctx.channel.id)
-            
-            if not game:
-                await ctx.send("No active game in this channel.")
-                return
-            
-            debug_mode = getattr(game, 'debug_mode', False)
-            regular_players = len(game.players)
-            dummy_players = len(getattr(game, 'dummy_players', []))
-            
-            status_message = (
-                f"Debug Mode: **{'Enabled' if debug_mode else 'Disabled'}**\n"
-                f"Regular Players: **{regular_players}**\n"
-                f"Dummy Players: **{dummy_players}**\n"
-                f"Total Players: **{regular_players + dummy_players}**\n"
-                f"Game Phase: **{getattr(game.phase, 'name', 'UNKNOWN')}**\n"
-                f"Game State: **{getattr(game, 'state', 'UNKNOWN')}**"
-            )
-            
+            status_message = await self.bot.actors.run(ctx.channel.id, self.show_game_state)
             await ctx.send(status_message)
         except Exception as e:
             await ctx.send(f"An error occurred while fetching game state: {str(e)}")
-            print(f"Unexpected error in gamestate command: {e}")
+            log.exception("Unexpected error in gamestate command")
+    
+    async def show_game_state(self, game):
+        if not game:
+            return "No active game in this channel."
+        
+        debug_mode = getattr(game, 'debug_mode', False)
+        regular_players = len(game.players)
+        dummy_players = len(getattr(game, 'dummy_players', []))
+        
+        status_message = (
+            f"Debug Mode: **{'Enabled' if debug_mode else 'Disabled'}**\n"
+            f"Regular Players: **{regular_players}**\n"
+            f"Dummy Players: **{dummy_players}**\n"
+            f"Total Players: **{regular_players + dummy_players}**\n"
+            f"Game Phase: **{getattr(game.phase, 'name', 'UNKNOWN')}**\n"
+            f"Game State: **{getattr(game, 'state', 'UNKNOWN')}**"
+        )
+        
+        if debug_mode:
+            problems = game.check_tally_consistency()
+            status_message += f"\nTally Check: **{'OK' if not problems else '; '.join(problems)}**"
+        
+        return status_message
 
     @commands.Cog.listener()
     async def on_command_error(self, ctx, error):
@@ -330,7 +278,7 @@ class DebugCog(commands.Cog):
             await ctx.send(f"Bad argument: {str(error)}")
         else:
             await ctx.send(f"An error occurred: {str(error)}")
-        print(f"Command '{ctx.command}' raised an error: {error}")
+        log.warning("Command %s raised an error: %s", ctx.command, error)
 
 async def setup(bot):
-    print("DEBUG: Setting up DebugCo
\ No newline at end of file
+    await bot.add_cog(DebugCog(bot))
@@ -1,6 +1,9 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import logging
+
+log = logging.getLogger(__name__)
 
 class HelpCog(commands.Cog):
     def __init__(self, bot):
@@ -22,7 +25,8 @@ class HelpCog(commands.Cog):
                 "**m!endgame** - Force end/cancel current game\n"
                 "**m!cancel** - Cancel game with confirmation\n"
                 "**m!mafia** `<count>` - Set number of mafia players\n"
-                "**m!neutral** `<count>` [teamed] - Set number of neutral players"
+                "**m!neutral** `<count>` [teamed] - Set number of neutral players\n"
+                "**m!dmfailures** [yes] - Show (or resend) role DMs that failed"
             ),
             inline=False
         )
@@ -101,15 +105,14 @@ class HelpCog(commands.Cog):
     @commands.command(name="help")
     async def help_command(self, ctx, category: str = None):
         """Shows all available Mafia game commands or detailed help for a specific category"""
-        print(f"DEBUG: Text-based help command triggered. Category: {category}")
+        log.debug("Text help requested, category %s", category)
         try:
             if category and category.lower() == "debug":
                 await ctx.send(embed=self.get_debug_help_embed())
             else:
                 await ctx.send(embed=self.get_help_embed())
-            print("DEBUG: Help message sent successfully")
-        except Exception as e:
-            print(f"DEBUG: Error in text-based help command: {e}")
+        except Exception:
+            log.exception("Error in text-based help command")
 
     @app_commands.command(name="help", description="Shows all available Mafia game commands")
     @app_commands.choices(category=[
@@ -118,15 +121,14 @@ class HelpCog(commands.Cog):
     ])
     async def help_slash(self, interaction: discord.Interaction, category: app_commands.Choice[str] = None):
         """Slash command version of help"""
-        print(f"DEBUG: Slash help command triggered. Category: {category.value if category else 'None'}")
+        log.debug("Slash help requested, category %s", category.value if category else None)
         try:
             if category and category.value == "debug":
                 await interaction.response.send_message(embed=self.get_debug_help_embed())
             else:
                 await interaction.response.send_message(embed=self.get_help_embed())
-            print("DEBUG: Help message sent successfully")
-        except Exception as e:
-            print(f"DEBUG: Error in slash help command: {e}")
+        except Exception:
+            log.exception("Error in slash help command")
 
 async def setup(bot):
     await bot.add_cog(HelpCog(bot))
\ No newline at end of file
@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from store import GameStore
+from interactions import deferred_context
 import time
 
 class PhaseCog(commands.Cog):
@@ -11,33 +11,25 @@ class PhaseCog(commands.Cog):
     @app_commands.command(name="daytime", description="Start the day phase (host only)")
     async def daytime_slash(self, interaction: discord.Interaction):
         """Slash command version of daytime"""
-        # Convert interaction to context-like object for reuse
-        class Context:
-            def __init__(self, interaction):
-                self.channel = interaction.channel
-                self.author = interaction.user
-                self.send = interaction.response.send_message
-        
-        ctx = Context(interaction)
-        await self.daytime_command(ctx)
+        await self.daytime_command(await deferred_context(interaction))
 
     @commands.command(name="daytime")
     @commands.guild_only()
     async def daytime_command(self, ctx):
-        store = GameStore(self.bot.db)
-        game = await store.get_game(ctx.channel.id)
+        await ctx.send(await self.bot.actors.run(ctx.channel.id, self.start_day, ctx))
+    
+    async def start_day(self, game, ctx):
+        """Move the game from night to the next day; returns the reply"""
+        store = self.bot.store
         
         if not game:
-            await ctx.send("No active game in this channel.")
-            return
+            return "No active game in this channel."
         
         if game.host_id != ctx.author.id:
-            await ctx.send("Only the host can change phases.")
-            return
+            return "Only the host can change phases."
         
         if game.phase.name != "NIGHT":
-            await ctx.send("Can only start day from night phase.")
-            return
+            return "Can only start day from night phase."
         
         # End night and start day
         game.phase.name = "DAY"
@@ -45,11 +37,11 @@ class PhaseCog(commands.Cog):
         game.phase.ends_at = int(time.time()) + game.config.day_duration_sec
         
         # Clear votes
-        game.votes = {}
+        game.clear_votes()
         
         await store.save_game(game)
         
-        await ctx.send(
+        return (
             f"🌞 Day {game.phase.number} has begun!\n"
             f"Ends: <t:{game.phase.ends_at}:F> — <t:{game.phase.ends_at}:R>\n"
             f"Use `m!vote @player` to vote. `m!time` to see remaining time."
@@ -58,43 +50,36 @@ class PhaseCog(commands.Cog):
     @app_commands.command(name="nighttime", description="Start the night phase (host only)")
     async def nighttime_slash(self, interaction: discord.Interaction):
         """Slash command version of nighttime"""
-        class Context:
-            def __init__(self, interaction):
-                self.channel = interaction.channel
-                self.author = interaction.user
-                self.send = interaction.response.send_message
-        
-        ctx = Context(interaction)
-        await self.nighttime_command(ctx)
+        await self.nighttime_command(await deferred_context(interaction))
 
     @commands.command(name="nighttime")
     @commands.guild_only()
     async def nighttime_command(self, ctx):
-        store = GameStore(self.bot.db)
-        game = await store.get_game(ctx.channel.id)
+        await ctx.send(await self.bot.actors.run(ctx.channel.id, self.start_night, ctx))
+    
+    async def start_night(self, game, ctx):
+        """Move the game from day to night; returns the reply"""
+        store = self.bot.store
         
         if not game:
-            await ctx.send("No active game in this channel.")
-            return
+            return "No active game in this channel."
         
         if game.host_id != ctx.author.id:
-            await ctx.send("Only the host can change phases.")
-            return
+            return "Only the host can change phases."
         
         if game.phase.name != "DAY":
-            await ctx.send("Can only start night from day phase.")
-            return
+            return "Can only start night from day phase."
         
         # End day and start night
         game.phase.name = "NIGHT"
         game.phase.ends_at = int(time.time()) + game.config.night_duration_sec
         
         # Clear votes
-        game.votes = {}
+        game.clear_votes()
         
         await store.save_game(game)
         
-        await ctx.send(
+        return (
             f"🌙 Night {game.phase.number} has begun. Ends: <t:{game.phase.ends_at}:F> — <t:{game.phase.ends_at}:R>\n"
             f"No talking if your server rules disallow it. Host: actions via DM."
         )
@@ -113,7 +98,7 @@ class PhaseCog(commands.Cog):
     @commands.command(name="time")
     @commands.guild_only()
     async def time_command(self, ctx):
-        store = GameStore(self.bot.db)
+        store = self.bot.store
         game = await store.get_game(ctx.channel.id)
         
         if not game or game.phase.name in ["ENDED", "CANCELLED"]:
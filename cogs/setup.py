@@ -1,12 +1,15 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+from interactions import deferred_context
 import asyncio
-import random
+import logging
 import time
 from models import GameState, GameConfig, Player, Phase
-from views import SignupView, SetupView
-from store import GameStore
+from views import SignupView, SetupView, signup_message_content
+from roles import pick_roles
+
+log = logging.getLogger(__name__)
 
 class SetupCog(commands.Cog):
     def __init__(self, bot):
@@ -15,41 +18,18 @@ class SetupCog(commands.Cog):
     @app_commands.command(name="endgame", description="Force end/cancel the active Mafia game")
     async def endgame_slash(self, interaction: discord.Interaction):
         """Slash command version of endgame"""
-        class Context:
-            def __init__(self, interaction):
-                self.channel = interaction.channel
-                self.author = interaction.user
-                self.send = interaction.response.send_message
-                self.guild = interaction.guild
-        
-        ctx = Context(interaction)
-        await self.endgame_command(ctx)
+        await self.endgame_command(await deferred_context(interaction))
 
     @app_commands.command(name="cancel", description="Cancel the current game (host only)")
     async def cancel_slash(self, interaction: discord.Interaction):
         """Slash command version of cancel"""
-        class Context:
-            def __init__(self, interaction):
-                self.channel = interaction.channel
-                self.author = interaction.user
-                self.send = interaction.response.send_message
-                self.bot = self.bot
-        
-        ctx = Context(interaction)
-        await self.cancel_command(ctx)
+        await self.cancel_command(await deferred_context(interaction))
 
     @app_commands.command(name="mafia", description="Set the number of mafia players")
     @app_commands.describe(count="Number of mafia players (must be at least 1)")
     async def mafia_slash(self, interaction: discord.Interaction, count: int):
         """Slash command version of mafia"""
-        class Context:
-            def __init__(self, interaction):
-                self.channel = interaction.channel
-                self.author = interaction.user
-                self.send = interaction.response.send_message
-        
-        ctx = Context(interaction)
-        await self.mafia_command(ctx, count)
+        await self.mafia_command(await deferred_context(interaction), count)
 
     @app_commands.command(name="neutral", description="Set the number of neutral players")
     @app_commands.describe(
@@ -58,14 +38,13 @@ class SetupCog(commands.Cog):
     )
     async def neutral_slash(self, interaction: discord.Interaction, count: int, teamed: bool = False):
         """Slash command version of neutral"""
-        class Context:
-            def __init__(self, interaction):
-                self.channel = interaction.channel
-                self.author = interaction.user
-                self.send = interaction.response.send_message
-        
-        ctx = Context(interaction)
-        await self.neutral_command(ctx, count, teamed)
+        await self.neutral_command(await deferred_context(interaction), count, teamed)
+
+    @app_commands.command(name="dmfailures", description="Show role DMs that could not be delivered (host only)")
+    @app_commands.describe(retry="Send the failed role DMs again")
+    async def dmfailures_slash(self, interaction: discord.Interaction, retry: bool = False):
+        """Slash command version of dmfailures"""
+        await self.dmfailures_command(await deferred_context(interaction), retry)
 
     @app_commands.command(name="play", description="Start a new Mafia game in this channel")
     @app_commands.describe(
@@ -97,18 +76,32 @@ class SetupCog(commands.Cog):
         role_density: app_commands.Choice[str] = None
     ):
         """Slash command version of play"""
-        # Check if there's already a game in this channel
-        store = GameStore(self.bot.db)
-        existing_game = await store.get_game(interaction.channel.id)
+        # Acknowledge first; creating the game waits on the channel's actor
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        error, game = await self.bot.actors.run(
+            interaction.channel.id, self.create_game_slash,
+            interaction, min_players, max_players, signup_duration, game_length, role_density
+        )
+        if error:
+            await interaction.followup.send(error, ephemeral=True)
+            return
         
+        # Create the signup message
+        await self.post_signup_message(interaction.channel, game)
+        await interaction.followup.send("Game created successfully! Signup message posted.", ephemeral=True)
+    
+    async def create_game_slash(self, existing_game, interaction, min_players, max_players, signup_duration,
+                                game_length, role_density):
+        """Create and save the game; returns (error message, game)"""
+        store = self.bot.store
+        
+        # Check if there's already a game in this channel
         if existing_game and existing_game.phase.name not in ["ENDED", "CANCELLED"]:
-            await interaction.response.send_message("There's already an active game in this channel!", ephemeral=True)
-            return
+            return "There's already an active game in this channel!", None
         
         # Check permissions
         if not interaction.channel.permissions_for(interaction.user).manage_channels:
-            await interaction.response.send_message("You need 'Manage Channels' permission to start a game.", ephemeral=True)
-            return
+            return "You need 'Manage Channels' permission to start a game.", None
         
         # Create a new game
         config = GameConfig()
@@ -142,11 +135,9 @@ class SetupCog(commands.Cog):
                 seconds = int(duration_str)
             
             if seconds < 300:  # 5 minutes
-                await interaction.response.send_message("Signup duration must be at least 5 minutes.", ephemeral=True)
-                return
+                return "Signup duration must be at least 5 minutes.", None
             if seconds > 1209600:  # 14 days
-                await interaction.response.send_message("Signup duration cannot exceed 14 days.", ephemeral=True)
-                return
+                return "Signup duration cannot exceed 14 days.", None
             
             game.config.signup_ends_at = int(time.time()) + seconds
             game.phase = Phase(
@@ -155,26 +146,27 @@ class SetupCog(commands.Cog):
                 ends_at=game.config.signup_ends_at
             )
         except ValueError:
-            await interaction.response.send_message("Invalid duration format. Use something like 1h, 2d, 30m, or seconds.", ephemeral=True)
-            return
+            return "Invalid duration format. Use something like 1h, 2d, 30m, or seconds.", None
         
         # Save the game
         await store.save_game(game)
+        return None, game
+    
+    async def post_signup_message(self, channel, game):
+        """Post the signup message of a new game and remember it on the live game.
         
-        # Create the signup message
-        view = SignupView(game)
-        msg = await interaction.channel.send(
-            f"🎭 Mafia Signup (Channel: {interaction.channel.mention})\n"
-            f"Players: 0/{game.config.max_players or '∞'} (0 tentative)\n"
-            f"Signup ends: <t:{game.config.signup_ends_at}:F> — <t:{game.config.signup_ends_at}:R>",
-            view=view
-        )
+        Called outside the game's actor so the post doesn't hold up other work on the game.
+        """
+        msg = await channel.send(signup_message_content(game, channel), view=SignupView())
+        self.bot.signup_renderer.track(msg)
         
         # Save the message ID
-        game.messages['signup_message_id'] = msg.id
-        await store.save_game(game)
+        async def remember(live_game):
+            if game.is_same_game(live_game):
+                live_game.messages['signup_message_id'] = msg.id
+                await self.bot.store.save_game(live_game)
         
-        await interaction.response.send_message("Game created successfully! Signup message posted.", ephemeral=True)
+        await self.bot.actors.run(game.channel_id, remember)
     
     @commands.command(name="endgame")
     @commands.guild_only()
@@ -183,22 +175,11 @@ class SetupCog(commands.Cog):
         Prefix command to force-end/cancel the active Mafia game in this channel.
         Usable by the host or anyone with Manage Channels permission.
         """
-        store = GameStore(self.bot.db)
-        game = await store.get_game(ctx.channel.id)
-
-        if not game or game.phase.name in ["ENDED", "CANCELLED"]:
-            await ctx.send("There is no active game in this channel.", ephemeral=False)
-            return
-
-        # Authorization: host or Manage Channels
-        if game.host_id != ctx.author.id and not ctx.author.guild_permissions.manage_channels:
-            await ctx.send("Only the host or a user with Manage Channels can end the game.", ephemeral=True)
+        error, game = await self.bot.actors.run(ctx.channel.id, self.end_game, ctx)
+        if error:
+            await ctx.send(error)
             return
 
-        # Mark game cancelled/ended and persist
-        game.phase.name = "CANCELLED"
-        await store.save_game(game)
-
         # Remove signup message buttons (safe-guard)
         try:
             if game.messages.get('signup_message_id'):
@@ -217,16 +198,50 @@ class SetupCog(commands.Cog):
                 pass
 
         await ctx.send("Game has been force-ended and resources cleaned. You can now start a new game.")
+    
+    async def end_game(self, game, ctx):
+        """Cancel the game; returns (error message, game)"""
+        store = self.bot.store
+
+        if not game or game.phase.name in ["ENDED", "CANCELLED"]:
+            return "There is no active game in this channel.", None
+
+        # Authorization: host or Manage Channels
+        if game.host_id != ctx.author.id and not ctx.author.guild_permissions.manage_channels:
+            return "Only the host or a user with Manage Channels can end the game.", None
+
+        # Mark game cancelled/ended and persist
+        game.phase.name = "CANCELLED"
+        await store.save_game(game)
+        return None, game
+
     @commands.command(name="play")
     @commands.guild_only()
     async def play_command(self, ctx, *args):
-        # Check if there's already a game in this channel
-        store = GameStore(self.bot.db)
-        existing_game = await store.get_game(ctx.channel.id)
+        error, game = await self.bot.actors.run(ctx.channel.id, self.create_game, ctx, args)
+        if error:
+            await ctx.send(error)
+            return
+        
+        # Send setup wizard if no specific parameters were provided
+        if not args or args[0] not in ["custom", "signup"]:
+            view = SetupView(game)
+            await ctx.send(
+                f"{ctx.author.mention} is starting a Mafia game! Let's configure it.\n"
+                "First, select the player cap:",
+                view=view
+            )
+        else:
+            # Directly create the signup message if custom/signup args were provided
+            await self.post_signup_message(ctx.channel, game)
+    
+    async def create_game(self, existing_game, ctx, args):
+        """Create and save the game; returns (error message, game)"""
+        store = self.bot.store
         
+        # Check if there's already a game in this channel
         if existing_game and existing_game.phase.name not in ["ENDED", "CANCELLED"]:
-            await ctx.send("There's already an active game in this channel!")
-            return
+            return "There's already an active game in this channel!", None
         
         # Create a new game
         config = GameConfig()
@@ -255,11 +270,9 @@ class SetupCog(commands.Cog):
                         seconds = int(duration_str)
                     
                     if seconds < 300:  # 5 minutes
-                        await ctx.send("Signup duration must be at least 5 minutes.")
-                        return
+                        return "Signup duration must be at least 5 minutes.", None
                     if seconds > 1209600:  # 14 days
-                        await ctx.send("Signup duration cannot exceed 14 days.")
-                        return
+                        return "Signup duration cannot exceed 14 days.", None
                     
                     game.config.signup_ends_at = int(time.time()) + seconds
                     game.phase = Phase(
@@ -268,26 +281,8 @@ class SetupCog(commands.Cog):
                         ends_at=game.config.signup_ends_at
                     )
                     
-                    # Save the game
-                    await store.save_game(game)
-                    
-                    # Create the signup message
-                    view = SignupView(game)
-                    msg = await ctx.send(
-                        f"🎭 Mafia Signup (Channel: {ctx.channel.mention})\n"
-                        f"Players: 0/{game.config.max_players or '∞'} (0 tentative)\n"
-                        f"Signup ends: <t:{game.config.signup_ends_at}:F> — <t:{game.config.signup_ends_at}:R>",
-                        view=view
-                    )
-                    
-                    # Save the message ID
-                    game.messages['signup_message_id'] = msg.id
-                    await store.save_game(game)
-                    return
-                    
                 except ValueError:
-                    await ctx.send("Invalid duration format. Use something like 1h, 2d, 30m, or seconds.")
-                    return
+                    return "Invalid duration format. Use something like 1h, 2d, 30m, or seconds.", None
             # Handle custom player count parameter
             elif args[0] == "custom" and len(args) >= 3:
                 try:
@@ -295,17 +290,14 @@ class SetupCog(commands.Cog):
                     max_players = int(args[2]) if args[2].lower() != "none" else None
                     
                     if min_players < 5:
-                        await ctx.send("Minimum players must be at least 5.")
-                        return
+                        return "Minimum players must be at least 5.", None
                     if max_players and max_players < min_players:
-                        await ctx.send("Maximum players must be greater than or equal to minimum players.")
-                        return
+                        return "Maximum players must be greater than or equal to minimum players.", None
                     
                     game.config.min_players = min_players
                     game.config.max_players = max_players
                 except ValueError:
-                    await ctx.send("Invalid number format. Usage: `m!play custom <min> <max|none>`")
-                    return
+                    return "Invalid number format. Usage: `m!play custom <min> <max|none>`", None
         
         # If no signup duration was set via args, use default (24h)
         if game.config.signup_ends_at == 0:
@@ -318,33 +310,12 @@ class SetupCog(commands.Cog):
         
         # Save the game
         await store.save_game(game)
-        
-        # Send setup wizard if no specific parameters were provided
-        if not args or args[0] not in ["custom", "signup"]:
-            view = SetupView(game)
-            await ctx.send(
-                f"{ctx.author.mention} is starting a Mafia game! Let's configure it.\n"
-                "First, select the player cap:",
-                view=view
-            )
-        else:
-            # Directly create the signup message if custom/signup args were provided
-            view = SignupView(game)
-            msg = await ctx.send(
-                f"🎭 Mafia Signup (Channel: {ctx.channel.mention})\n"
-                f"Players: 0/{game.config.max_players or '∞'} (0 tentative)\n"
-                f"Signup ends: <t:{game.config.signup_ends_at}:F> — <t:{game.config.signup_ends_at}:R>",
-                view=view
-            )
-            
-            # Save the message ID
-            game.messages['signup_message_id'] = msg.id
-            await store.save_game(game)
+        return None, game
     
     @commands.command(name="cancel")
     @commands.guild_only()
     async def cancel_command(self, ctx):
-        store = GameStore(self.bot.db)
+        store = self.bot.store
         game = await store.get_game(ctx.channel.id)
         
         if not game or game.phase.name in ["ENDED", "CANCELLED"]:
@@ -366,8 +337,21 @@ class SetupCog(commands.Cog):
                     await interaction.response.send_message("Only the host can confirm cancellation.", ephemeral=True)
                     return
                 
-                game.phase.name = "CANCELLED"
-                await store.save_game(game)
+                # Acknowledge first; the cancel waits on the game's actor
+                await interaction.response.defer()
+                
+                # Cancel the live game, unless it ended or was replaced while the prompt was open
+                async def cancel_game(live_game):
+                    if not game.is_same_game(live_game) or live_game.phase.name in ["ENDED", "CANCELLED"]:
+                        return False
+                    live_game.phase.name = "CANCELLED"
+                    await store.save_game(live_game)
+                    return True
+                
+                if not await interaction.client.actors.run(game.channel_id, cancel_game):
+                    await interaction.followup.send("This game is no longer active.", ephemeral=True)
+                    self.stop()
+                    return
                 
                 # Remove signup message buttons
                 if game.messages.get('signup_message_id'):
@@ -377,7 +361,7 @@ class SetupCog(commands.Cog):
                     except:
                         pass
                 
-                await interaction.response.send_message("Game has been cancelled.")
+                await interaction.followup.send("Game has been cancelled.")
                 self.stop()
             
             @discord.ui.button(label="Cancel", style=discord.ButtonStyle.secondary)
@@ -398,119 +382,141 @@ class SetupCog(commands.Cog):
     @commands.command(name="mafia")
     @commands.guild_only()
     async def mafia_command(self, ctx, count: int):
-        store = GameStore(self.bot.db)
-        game = await store.get_game(ctx.channel.id)
+        await ctx.send(await self.bot.actors.run(ctx.channel.id, self.set_mafia_count, ctx, count))
+    
+    async def set_mafia_count(self, game, ctx, count):
+        """Returns the reply for the host"""
+        store = self.bot.store
         
         if not game or game.phase.name != "SIGNUP":
-            await ctx.send("No active signup phase in this channel.")
-            return
+            return "No active signup phase in this channel."
         
         if game.host_id != ctx.author.id:
-            await ctx.send("Only the host can set mafia count.")
-            return
+            return "Only the host can set mafia count."
         
         total_players = len(game.players)
         if count < 1:
-            await ctx.send("Mafia count must be at least 1.")
-            return
+            return "Mafia count must be at least 1."
         
         if count >= total_players:
-            await ctx.send("Mafia count must be less than total player count.")
-            return
+            return "Mafia count must be less than total player count."
         
         game.mafia_count = count
         await store.save_game(game)
         
-        await ctx.send(f"Mafia count set to {count}. Use `m!neutral <count>` to set neutral count.")
+        return f"Mafia count set to {count}. Use `m!neutral <count>` to set neutral count."
     
     @commands.command(name="neutral")
     @commands.guild_only()
     async def neutral_command(self, ctx, count: int, teamed: bool = False):
-        store = GameStore(self.bot.db)
-        game = await store.get_game(ctx.channel.id)
+        await ctx.send(await self.bot.actors.run(ctx.channel.id, self.set_neutral_count, ctx, count, teamed))
+    
+    async def set_neutral_count(self, game, ctx, count, teamed):
+        """Returns the reply for the host"""
+        store = self.bot.store
         
         if not game or game.phase.name != "SIGNUP":
-            await ctx.send("No active signup phase in this channel.")
-            return
+            return "No active signup phase in this channel."
         
         if game.host_id != ctx.author.id:
-            await ctx.send("Only the host can set neutral count.")
-            return
+            return "Only the host can set neutral count."
         
         total_players = len(game.players)
-        mafia_count = getattr(game, 'mafia_count', 0)
+        mafia_count = game.mafia_count or 0
         
         if count < 0:
-            await ctx.send("Neutral count cannot be negative.")
-            return
+            return "Neutral count cannot be negative."
         
         if mafia_count + count >= total_players:
-            await ctx.send("Mafia + neutral count must be less than total player count.")
-            return
+            return "Mafia + neutral count must be less than total player count."
         
         game.neutral_count = count
         game.config.neutrals_teamed = teamed
         await store.save_game(game)
         
         team_status = "on the same team" if teamed else "on individual teams"
-        await ctx.send(f"Neutral count set to {count} ({team_status}). Use the confirmation button in DMs to start the game.")
-
-async def assign_roles(bot, game):
-    store = GameStore(bot.db)
+        return f"Neutral count set to {count} ({team_status}). Use the confirmation button in DMs to start the game."
     
-    # Calculate town count
-    total_players = len(game.players)
-    town_count = total_players - game.mafia_count - game.neutral_count
-    
-    # Assign roles
-    player_ids = [player.id for player in game.players]
-    random.shuffle(player_ids)
+    @commands.command(name="dmfailures")
+    @commands.guild_only()
+    async def dmfailures_command(self, ctx, retry: bool = False):
+        """Show the role DMs that could not be delivered; `m!dmfailures yes` sends them again"""
+        error, game, failed_dms, messages = await self.bot.actors.run(ctx.channel.id, self.dm_failures, ctx)
+        if error:
+            await ctx.send(error, ephemeral=True)
+            return
+        
+        if retry:
+            # Resent outside the game's actor; DM retries and rate limits can take a while
+            failed_dms = await self.bot.dms.send_many(messages)
+            
+            async def record(live_game):
+                if game.is_same_game(live_game):
+                    live_game.failed_dms = failed_dms
+                    await self.bot.store.save_game(live_game)
+            
+            await self.bot.actors.run(ctx.channel.id, record)
+            header = f"Resent role DMs: {len(messages) - len(failed_dms)} delivered, {len(failed_dms)} still failing."
+        else:
+            header = f"{len(failed_dms)} role DM(s) could not be delivered:"
+        
+        lines = [f"<@{user_id}>: {reason}" for user_id, reason in failed_dms.items()]
+        if not retry:
+            lines.append("Use `m!dmfailures yes` to try again.")
+        await ctx.send("\n".join([header] + lines), ephemeral=True)
     
-    # Assign mafia roles
-    for i in range(game.mafia_count):
-        player_id = player_ids.pop()
-        player = game.get_player(player_id)
-        player.role = "Mafia"
-        game.mafia_ids.append(player_id)
+    async def dm_failures(self, game, ctx):
+        """Returns (error message, game, failed DMs, (user ID, role DM) pairs to resend)"""
+        if not game:
+            return "No active game in this channel.", None, None, None
+        
+        if game.host_id != ctx.author.id:
+            return "Only the host can view DM failures.", None, None, None
+        
+        if not game.failed_dms:
+            return "All role DMs were delivered.", None, None, None
+        
+        messages = []
+        for user_id in game.failed_dms:
+            player = game.get_player(user_id)
+            if player:
+                messages.append((user_id, role_dm_content(game, player)))
+        return None, game, dict(game.failed_dms), messages
+
+async def assign_roles(bot, game):
+    """Deal roles and start day 1; run it on the game's actor.
     
-    # Assign neutral roles
-    neutral_roles = ["Jester", "Executioner", "Serial Killer", "Arsonist"]
-    for i in range(game.neutral_count):
-        player_id = player_ids.pop()
-        player = game.get_player(player_id)
-        player.role = random.choice(neutral_roles) if game.config.role_density != "VANILLA" else "Neutral"
-        game.neutral_ids.append(player_id)
+    Only the game changes here. send_game_start() sends the role DMs, creates
+    the mafia channel and announces the day afterwards, so votes and clicks
+    on the game don't wait on Discord.
+    """
+    pick_roles(game)
     
-    # Assign town roles
-    town_roles = ["Vanilla Townie"]
-    if game.config.role_density != "VANILLA":
-        town_roles.extend(["Cop", "Doctor", "Vigilante", "Investigator"])
+    # Start the first day
+    game.phase = Phase(
+        name="DAY",
+        number=1,
+        ends_at=int(time.time()) + game.config.day_duration_sec
+    )
+    await bot.store.save_game(game)
+
+async def send_game_start(bot, game):
+    """DM the roles, create the mafia channel and announce day 1 of a game assign_roles() started.
     
-    for i in range(town_count):
-        player_id = player_ids.pop()
-        player = game.get_player(player_id)
-        if game.config.role_density == "VANILLA" or i == 0:
-            player.role = "Vanilla Townie"
-        else:
-            # Assign special roles based on density
-            if game.config.role_density == "LIGHT" and i % 4 == 0:
-                player.role = random.choice(town_roles[1:])
-            elif game.config.role_density == "HEAVY" and i % 2 == 0:
-                player.role = random.choice(town_roles[1:])
-            else:
-                player.role = "Vanilla Townie"
-        game.town_ids.append(player_id)
+    Runs outside the game's actor; what it learns (failed DMs, the mafia
+    channel) is recorded on the live game at the end. Returns step timings.
+    """
+    timings = {}
+    started = time.perf_counter()
     
-    # DM roles to players
-    for player in game.players:
-        try:
-            user = await bot.fetch_user(player.id)
-            if user:
-                await user.send(f"Your role for the Mafia game in <#{game.channel_id}> is: **{player.role}**")
-        except:
-            print(f"Could not DM user {player.id}")
+    # DM roles to players while the mafia channel is being created
+    step = time.perf_counter()
+    dm_task = asyncio.create_task(bot.dms.send_many([
+        (player.id, role_dm_content(game, player)) for player in game.players
+    ]))
     
     # Create mafia channel if needed
+    mafia_channel_id = None
     if game.mafia_count >= 2:
         guild = bot.get_guild(game.guild_id)
         if guild:
@@ -521,7 +527,7 @@ async def assign_roles(bot, game):
             
             # Add mafia players
             for player_id in game.mafia_ids:
-                member = guild.get_member(player_id)
+                member = await bot.resolver.member(guild, player_id)
                 if member:
                     overwrites[member] = discord.PermissionOverwrite(read_messages=True)
             
@@ -531,28 +537,54 @@ async def assign_roles(bot, game):
                     overwrites=overwrites,
                     reason="Mafia game private channel"
                 )
-                game.mafia_channel_id = mafia_channel.id
+                mafia_channel_id = mafia_channel.id
             except discord.Forbidden:
-                print("Could not create mafia channel - insufficient permissions")
+                log.warning("Could not create mafia channel in guild %s - insufficient permissions", guild.id)
+    timings['mafia_channel'] = time.perf_counter() - step
     
-    # Start the first day
-    game.phase = Phase(
-        name="DAY",
-        number=1,
-        ends_at=int(time.time()) + game.config.day_duration_sec
-    )
+    failed_dms = await dm_task
+    timings['dms'] = time.perf_counter() - step
+    
+    step = time.perf_counter()
+    
+    async def record(live_game):
+        if game.is_same_game(live_game):
+            live_game.failed_dms = failed_dms
+            if mafia_channel_id:
+                live_game.mafia_channel_id = mafia_channel_id
+            await bot.store.save_game(live_game)
     
-    await store.save_game(game)
+    await bot.actors.run(game.channel_id, record)
+    timings['save'] = time.perf_counter() - step
     
     # Announce game start
+    step = time.perf_counter()
     channel = bot.get_channel(game.channel_id)
     if channel:
+        failed_note = ""
+        if failed_dms:
+            failed_note = f"\n⚠️ {len(failed_dms)} role DM(s) could not be delivered. The host can check them with `m!dmfailures`."
         await channel.send(
             f"🌞 Day 1 has begun!\n"
             f"Ends: <t:{game.phase.ends_at}:F> — <t:{game.phase.ends_at}:R>\n"
             f"Use `m!vote @player` to vote. `m!time` to see remaining time.\n"
             f"Check your DMs for your role!"
+            f"{failed_note}"
         )
+    timings['announce'] = time.perf_counter() - step
+    timings['total'] = time.perf_counter() - started
+    
+    log.info(
+        "Game start in channel %s (%d players, %d DMs failed): %s",
+        game.channel_id, len(game.players), len(failed_dms),
+        ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()),
+        extra={"timings": timings},
+    )
+    return timings
+
+def role_dm_content(game, player):
+    return f"Your role for the Mafia game in <#{game.channel_id}> is: **{player.role}**"
+
 
 async def setup(bot):
     cog = SetupCog(bot)
@@ -564,10 +596,12 @@ async def setup(bot):
     bot.tree.remove_command("cancel", type=discord.AppCommandType.chat_input)
     bot.tree.remove_command("mafia", type=discord.AppCommandType.chat_input)
     bot.tree.remove_command("neutral", type=discord.AppCommandType.chat_input)
+    bot.tree.remove_command("dmfailures", type=discord.AppCommandType.chat_input)
     
     # Add all slash commands
     bot.tree.add_command(cog.play_slash)
     bot.tree.add_command(cog.endgame_slash)
     bot.tree.add_command(cog.cancel_slash)
     bot.tree.add_command(cog.mafia_slash)
-    bot.tree.add_command(cog.neutral_slash)
\ No newline at end of file
+    bot.tree.add_command(cog.neutral_slash)
+    bot.tree.add_command(cog.dmfailures_slash)
\ No newline at end of file
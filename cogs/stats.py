@@ -0,0 +1,80 @@
+import discord
+from discord.ext import commands
+from metrics import REGISTRY
+
+def _ms(seconds):
+    if seconds is None:
+        return "-"
+    if seconds == float("inf"):
+        return ">10s"
+    return f"{seconds * 1000:g}ms"
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:.3g}"
+    return str(value)
+
+class StatsCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    def timing_lines(self, name, label, limit=10):
+        """One line per series of a histogram, busiest first"""
+        series = [(dict(labels), histogram) for (metric, labels), histogram in REGISTRY.histograms.items() if metric == name]
+        series.sort(key=lambda item: item[1].count, reverse=True)
+
+        lines = []
+        for labels, histogram in series[:limit]:
+            title = labels.pop(label, "?")
+            if labels:
+                title = f"{title} ({', '.join(labels.values())})"
+            avg = histogram.sum / histogram.count
+            lines.append(
+                f"{title:<28} n={histogram.count:<6} avg={avg * 1000:.1f}ms "
+                f"p50<={_ms(histogram.quantile(0.5))} p99<={_ms(histogram.quantile(0.99))}"
+            )
+        return lines
+
+    def error_count(self, name):
+        return sum(value for (metric, _), value in REGISTRY.counters.items() if metric == name)
+
+    def in_flight(self, name):
+        return sum(value for (metric, _), value in REGISTRY.gauges.items() if metric == name)
+
+    @commands.command(name="stats")
+    @commands.is_owner()
+    async def stats_command(self, ctx):
+        """Owner-only summary of command, store and component metrics"""
+        sections = [
+            ("Commands", self.timing_lines("mafia_command_seconds", "command")),
+            ("GameStore", self.timing_lines("mafia_store_seconds", "method")),
+            ("SQLite", self.timing_lines("mafia_sqlite_seconds", "op")),
+            ("Discord HTTP", self.timing_lines("mafia_discord_http_seconds", "method")),
+        ]
+
+        text = []
+        for title, lines in sections:
+            text.append(f"[{title}]")
+            text.extend(lines or ["no data yet"])
+        text.append(
+            f"Errors: {self.error_count('mafia_command_errors_total')} command, "
+            f"{self.error_count('mafia_store_errors_total')} store. "
+            f"In flight: {self.in_flight('mafia_command_in_flight')} command, "
+            f"{self.in_flight('mafia_store_in_flight')} store"
+        )
+        for name, stats in REGISTRY.collect().items():
+            text.append(f"[{name}] " + ", ".join(f"{key}={_format_value(value)}" for key, value in stats.items()))
+
+        # Stay under Discord's 2000 character message limit
+        message = "\n".join(text)
+        if len(message) > 1990 - 8:
+            message = message[:1990 - 12] + "\n..."
+        await ctx.send(f"```\n{message}\n```")
+
+    @stats_command.error
+    async def stats_error(self, ctx, error):
+        if isinstance(error, commands.NotOwner):
+            await ctx.send("Only the bot owner can view stats.")
+
+async def setup(bot):
+    await bot.add_cog(StatsCog(bot))
@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-from store import GameStore
 
 class TimeCog(commands.Cog):
     def __init__(self, bot):
@@ -9,7 +8,7 @@ class TimeCog(commands.Cog):
     @commands.command(name="time")
     @commands.guild_only()
     async def time_command(self, ctx):
-        store = GameStore(self.bot.db)
+        store = self.bot.store
         game = await store.get_game(ctx.channel.id)
         
         if not game or game.phase.name in ["ENDED", "CANCELLED"]:
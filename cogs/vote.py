@@ -1,8 +1,11 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from store import GameStore
-import time
+from interactions import deferred_context
+from models import TWILIGHT_SECONDS
+import logging
+
+log = logging.getLogger(__name__)
 
 class VoteCog(commands.Cog):
     def __init__(self, bot):
@@ -12,45 +15,24 @@ class VoteCog(commands.Cog):
     @app_commands.describe(player="The player to vote for")
     async def vote_slash(self, interaction: discord.Interaction, player: discord.Member):
         """Slash command version of vote"""
-        # Convert interaction to context-like object
-        class Context:
-            def __init__(self, interaction, bot):
-                self.channel = interaction.channel
-                self.author = interaction.user
-                self.send = interaction.response.send_message
-                self.bot = bot
-        
-        ctx = Context(interaction, self.bot)
-        await self.vote_command(ctx, player)
+        await self.vote_command(await deferred_context(interaction), player)
         
     @app_commands.command(name="unvote", description="Remove your current vote")
     async def unvote_slash(self, interaction: discord.Interaction):
         """Slash command version of unvote"""
-        # Convert interaction to context-like object
-        class Context:
-            def __init__(self, interaction, bot):
-                self.channel = interaction.channel
-                self.author = interaction.user
-                self.send = interaction.response.send_message
-                self.bot = bot
-        
-        ctx = Context(interaction, self.bot)
-        await self.unvote_command(ctx)
+        await self.unvote_command(await deferred_context(interaction))
     
     @commands.command(name="vote")
     @commands.guild_only()
     async def vote_command(self, ctx, target: discord.Member = None):
-        store = GameStore(self.bot.db)
-        game = await store.get_game(ctx.channel.id)
-        
-        if not game or game.phase.name != "DAY":
-            await ctx.send("Voting is only allowed during day phases.")
-            return
-        
-        # Check if voter is alive
-        voter = game.get_player(ctx.author.id)
-        if not voter or voter.status != "alive":
-            await ctx.send("Only alive players can vote.")
+        # The checks, the vote and a hammer are applied together on the channel's
+        # GameActor; messages go out afterwards so they don't hold up other votes
+        target_id = target.id if target else None
+        error, game, hammered, problems = await self.bot.actors.run(
+            ctx.channel.id, self.apply_vote, ctx.author.id, target_id
+        )
+        if error:
+            await ctx.send(error)
             return
         
         if target is None:
@@ -58,77 +40,81 @@ class VoteCog(commands.Cog):
             await self.show_tally(ctx, game)
             return
         
-        # Check if target is valid
-        target_player = game.get_player(target.id)
-        if not target_player or target_player.status != "alive":
-            await ctx.send("You can only vote for alive players.")
-            return
-        
-        # Record vote
-        game.votes[ctx.author.id] = target.id
-        await store.save_game(game)
-        
+        await self.report_tally_problems(ctx, problems)
         await ctx.send(f"{ctx.author.mention} has voted for {target.mention}.", allowed_mentions=discord.AllowedMentions.none())
         
         # Update tally
         await self.update_tally(ctx, game)
         
-        # Check for hammer
-        vote_count = game.get_vote_count(target.id)
-        majority = game.get_majority_threshold()
-        
-        if vote_count >= majority:
-            # Hammer reached
-            await ctx.send(f"🔨 Hammer on {target.mention}! Twilight begins. (60s)")
+        if hammered:
+            await ctx.send(f"🔨 Hammer on {target.mention}! Twilight begins. ({TWILIGHT_SECONDS}s)")
             
             # Notify host
-            host = await self.bot.fetch_user(game.host_id)
+            host = await self.bot.resolver.user(game.host_id)
             if host:
                 await host.send(f"Hammer reached on {target.mention} in <#{game.channel_id}>. Please record the flip.")
-            
+    
+    async def apply_vote(self, game, voter_id, target_id):
+        """Returns (error message, game, hammered, tally problems)"""
+        if not game:
+            return "Voting is only allowed during day phases.", game, False, []
+        
+        # Check the voter and target against the voting rules
+        error = game.vote_error(voter_id, target_id)
+        if error or target_id is None:
+            return error, game, False, []
+        
+        # Record vote
+        store = self.bot.store
+        await store.record_vote(game, voter_id, target_id)
+        problems = self.check_tally(game)
+        
+        # Check for hammer
+        hammered = game.is_hammer(target_id)
+        
+        if hammered:
             # End day phase
-            game.phase.name = "TWILIGHT"
-            game.phase.ends_at = int(time.time()) + 60  # 60 second twilight
+            game.start_twilight()
             await store.save_game(game)
+        return None, game, hammered, problems
     
     @commands.command(name="unvote")
     @commands.guild_only()
     async def unvote_command(self, ctx):
-        store = GameStore(self.bot.db)
-        game = await store.get_game(ctx.channel.id)
-        
-        if not game or game.phase.name != "DAY":
-            await ctx.send("Voting is only allowed during day phases.")
+        error, game, problems = await self.bot.actors.run(ctx.channel.id, self.apply_unvote, ctx.author.id)
+        if error:
+            await ctx.send(error)
             return
         
-        # Check if voter has a vote
-        if ctx.author.id not in game.votes:
-            await ctx.send("You don't have an active vote to remove.")
-            return
-        
-        # Remove vote
-        del game.votes[ctx.author.id]
-        await store.save_game(game)
-        
+        await self.report_tally_problems(ctx, problems)
         await ctx.send(f"{ctx.author.mention} has removed their vote.")
         
         # Update tally
         await self.update_tally(ctx, game)
     
+    async def apply_unvote(self, game, voter_id):
+        """Returns (error message, game, tally problems)"""
+        if not game:
+            return "Voting is only allowed during day phases.", game, []
+        
+        # Check if voter has a vote
+        error = game.unvote_error(voter_id)
+        if error:
+            return error, game, []
+        
+        # Remove vote
+        await self.bot.store.record_vote(game, voter_id, None)
+        return None, game, self.check_tally(game)
+    
     async def show_tally(self, ctx, game):
         alive_players = game.get_alive_players()
-        alive_count = len(alive_players)
+        alive_count = game.alive_count
         majority = game.get_majority_threshold()
         
-        # Count votes per player
-        vote_counts = {}
-        for target_id in game.votes.values():
-            vote_counts[target_id] = vote_counts.get(target_id, 0) + 1
-        
-        # Create tally message
+        # Create tally message from the counters GameState keeps up to date
         lines = []
         for player in alive_players:
-            count = vote_counts.get(player.id, 0)
+            count = game.get_vote_count(player.id)
             to_hammer = majority - count
             hammer_text = f" **[{to_hammer} to hammer]**" if to_hammer > 0 and to_hammer <= 3 else ""
             lines.append(f"# <@{player.id}> ({count}){hammer_text}")
@@ -145,6 +131,21 @@ class VoteCog(commands.Cog):
         
         await ctx.send(tally_msg, allowed_mentions=discord.AllowedMentions.none())
     
+    def check_tally(self, game):
+        """In debug mode, verify the incremental vote counters against a full recount and rebuild them on a mismatch"""
+        if not game.debug_mode:
+            return []
+        
+        problems = game.check_tally_consistency()
+        if problems:
+            log.warning("Tally mismatch in channel %s: %s", game.channel_id, problems)
+            game.rebuild_tallies()
+        return problems
+    
+    async def report_tally_problems(self, ctx, problems):
+        if problems:
+            await ctx.send("⚠️ Debug: tally counters out of sync, rebuilding.\n" + "\n".join(problems))
+    
     async def update_tally(self, ctx, game):
         # Check if we have a tally message to update
         if not game.messages.get('tally_message_id'):
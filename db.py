@@ -0,0 +1,276 @@
+import aiosqlite
+import asyncio
+import contextvars
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from metrics import REGISTRY
+
+# Connection settings applied at startup. WAL lets readers run alongside the
+# writer, and synchronous=NORMAL only fsyncs at checkpoints, which is safe in
+# WAL mode (a power loss can drop the last commits but never corrupts the file).
+CONNECTION_PROFILE = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("mmap_size", 268435456),  # 256 MiB
+    ("cache_size", -16000),    # 16 MB (negative values are KiB)
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),    # ms
+)
+
+async def apply_connection_profile(db, profile=CONNECTION_PROFILE):
+    """Apply the PRAGMA profile to a connection and return the values SQLite reports back"""
+    applied = {}
+    for pragma, value in profile:
+        async with db.execute(f'PRAGMA {pragma} = {value}') as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            async with db.execute(f'PRAGMA {pragma}') as cursor:
+                row = await cursor.fetchone()
+        applied[pragma] = row[0] if row else None
+    return applied
+
+# While set (see defer_commits), writes return as soon as they are queued and
+# the futures for their commits are collected in this list instead
+_deferred_commits = contextvars.ContextVar('deferred_commits', default=None)
+
+@contextmanager
+def wait_for_commits():
+    """Undo defer_commits() for this block, e.g. for code that retries on a conflict"""
+    token = _deferred_commits.set(None)
+    try:
+        yield
+    finally:
+        _deferred_commits.reset(token)
+
+@contextmanager
+def defer_commits():
+    """Collect the commit futures of writes made in this block instead of waiting for them.
+
+    The caller must await the yielded futures (through asyncio.shield) before
+    treating the writes as durable.
+    """
+    pending = []
+    token = _deferred_commits.set(pending)
+    try:
+        yield pending
+    finally:
+        _deferred_commits.reset(token)
+
+class WriteBatcher:
+    """Group commit for a single aiosqlite connection.
+
+    Writes arriving within `window` seconds of the first pending one run in
+    one transaction with one commit. A write given a key replaces any pending
+    write with the same key in place (last write wins), so a burst of saves
+    for one game becomes a single statement. execute() returns once the
+    batch containing the write has committed, or raises its error, except
+    inside defer_commits().
+
+    A write given a conflict callable is a compare-and-swap: it runs on its
+    own and must change at least one row. If it changes none, the rest of
+    the batch still commits and the exception returned by conflict() is
+    raised to that write's callers only.
+    """
+
+    def __init__(self, db, window: float = 0.025):
+        self.db = db
+        self.window = window
+        self._ops = []  # [sql, params, conflict, checked future] in submission order
+        self._keyed = {}  # key -> index into self._ops
+        self._done = None  # future resolved when the pending batch commits
+        self._lock = asyncio.Lock()
+
+        self.started_at = time.time()
+        self.commits = 0
+        self.writes = 0
+        self.coalesced = 0
+        self.statements = 0
+        self.max_batch = 0
+        self._recent = deque()  # (commit time, statements) over the last minute
+
+    async def execute(self, sql, params=(), key=None, conflict=None):
+        await self._wait(self._enqueue(sql, params, key, conflict))
+
+    async def execute_all(self, statements):
+        """Queue several (sql, params[, conflict]) statements in the same batch and wait for its commit.
+        
+        A statement with a conflict callable is checked like execute()'s: if
+        it changes no rows, the exception conflict() returns is raised.
+        """
+        waiters = {}
+        for sql, params, *conflict in statements:
+            waiters[self._enqueue(sql, params, conflict=conflict[0] if conflict else None)] = None
+        for done in waiters:
+            await self._wait(done)
+
+    async def _wait(self, done):
+        deferred = _deferred_commits.get()
+        if deferred is not None:
+            deferred.append(done)
+            return
+        await asyncio.shield(done)
+
+    def _enqueue(self, sql, params=(), key=None, conflict=None):
+        self.writes += 1
+        loop = asyncio.get_running_loop()
+        if key is not None and key in self._keyed:
+            op = self._ops[self._keyed[key]]
+            # Everyone who wrote this key in the batch shares the outcome of the last write
+            checked = op[3] or (loop.create_future() if conflict else None)
+            self._ops[self._keyed[key]] = [sql, params, conflict, checked]
+            self.coalesced += 1
+        else:
+            checked = loop.create_future() if conflict else None
+            if key is not None:
+                self._keyed[key] = len(self._ops)
+            self._ops.append([sql, params, conflict, checked])
+
+        done = self._done
+        if done is None:
+            done = self._done = loop.create_future()
+            asyncio.create_task(self._flush_later())
+        return checked or done
+
+    def pending(self, key):
+        """Whether a write with this key is waiting in the current batch"""
+        return key in self._keyed
+
+    def forget(self, key):
+        """Make the next write with this key start a new statement instead of replacing a pending one"""
+        self._keyed.pop(key, None)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        await self.flush()
+
+    async def flush(self):
+        """Commit everything pending now"""
+        async with self._lock:
+            ops, done = self._ops, self._done
+            if done is None:
+                return
+            self._ops, self._keyed, self._done = [], {}, None
+
+            started = time.perf_counter()
+            conflicts = set()
+            try:
+                # Consecutive unchecked writes of the same statement go through executemany
+                i = 0
+                while i < len(ops):
+                    sql, params, conflict, _ = ops[i]
+                    if conflict:
+                        async with self.db.execute(sql, params) as cursor:
+                            if cursor.rowcount == 0:
+                                conflicts.add(i)
+                        i += 1
+                        continue
+                    j = i + 1
+                    while j < len(ops) and ops[j][0] == sql and not ops[j][2]:
+                        j += 1
+                    if j - i == 1:
+                        await self.db.execute(sql, params)
+                    else:
+                        await self.db.executemany(sql, [op[1] for op in ops[i:j]])
+                    i = j
+                await self.db.commit()
+            except Exception as e:
+                try:
+                    await self.db.rollback()
+                except Exception:
+                    pass
+                for waiter in [done] + [op[3] for op in ops if op[3]]:
+                    waiter.set_exception(e)
+                    # Mark retrieved; every waiter re-raises it through the shield
+                    waiter.exception()
+                return
+            finally:
+                REGISTRY.observe("mafia_sqlite_seconds", time.perf_counter() - started, op="commit")
+
+            self._record_commit(len(ops))
+            done.set_result(None)
+            for index, (_, _, conflict, checked) in enumerate(ops):
+                if not checked:
+                    continue
+                if index in conflicts:
+                    checked.set_exception(conflict())
+                    checked.exception()
+                else:
+                    checked.set_result(None)
+
+    def _record_commit(self, statements):
+        now = time.time()
+        self.commits += 1
+        self.statements += statements
+        self.max_batch = max(self.max_batch, statements)
+        self._recent.append((now, statements))
+        while self._recent and self._recent[0][0] < now - 60:
+            self._recent.popleft()
+
+    def stats(self):
+        """Commit and batch-size counters for monitoring"""
+        uptime = max(time.time() - self.started_at, 1e-9)
+        recent_commits = len(self._recent)
+        return {
+            "commits": self.commits,
+            "writes": self.writes,
+            "coalesced_writes": self.coalesced,
+            "statements": self.statements,
+            "avg_batch_size": self.statements / self.commits if self.commits else 0.0,
+            "max_batch_size": self.max_batch,
+            "commits_per_sec": self.commits / uptime,
+            "commits_per_sec_1m": recent_commits / 60,
+            "avg_batch_size_1m": sum(size for _, size in self._recent) / recent_commits if recent_commits else 0.0,
+        }
+
+# Settings for read-only connections; journal mode is a property of the file
+READER_PROFILE = (
+    ("query_only", 1),
+    ("mmap_size", 268435456),
+    ("cache_size", -8000),
+    ("busy_timeout", 5000),
+)
+
+class ReaderPool:
+    """A fixed set of read-only connections to a WAL database.
+
+    In WAL mode readers see the last committed state without waiting for the
+    writer, so cheap queries no longer queue behind writes on the writer
+    connection's worker thread.
+    """
+
+    def __init__(self, connections):
+        self.size = len(connections)
+        self._connections = connections
+        self._idle = asyncio.Queue()
+        for connection in connections:
+            self._idle.put_nowait(connection)
+        self.reads = 0
+        self.waits = 0  # reads that had to wait for a free connection
+
+    @classmethod
+    async def open(cls, path, size: int = 3):
+        connections = []
+        for _ in range(size):
+            connection = await aiosqlite.connect(f'file:{path}?mode=ro', uri=True)
+            await apply_connection_profile(connection, READER_PROFILE)
+            connections.append(connection)
+        return cls(connections)
+
+    @asynccontextmanager
+    async def acquire(self):
+        if self._idle.empty():
+            self.waits += 1
+        connection = await self._idle.get()
+        self.reads += 1
+        try:
+            yield connection
+        finally:
+            self._idle.put_nowait(connection)
+
+    async def close(self):
+        for connection in self._connections:
+            await connection.close()
+
+    def stats(self):
+        return {"size": self.size, "idle": self._idle.qsize(), "reads": self.reads, "waits": self.waits}
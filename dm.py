@@ -0,0 +1,100 @@
+import asyncio
+import random
+import time
+import discord
+
+class DMDispatcher:
+    """Sends direct messages with bounded concurrency.
+
+    At most `concurrency` deliveries run at once. A 429 pauses the route it
+    came from (opening a DM channel is one shared route, each DM channel is
+    its own) for the reported retry_after before trying again; server errors
+    and timeouts retry with exponential backoff and jitter. Forbidden (DMs
+    closed or the bot is blocked) and NotFound fail straight away.
+    """
+
+    def __init__(self, bot, concurrency: int = 5, max_attempts: int = 4, base_delay: float = 1.0):
+        self.bot = bot
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._resume_at = {}  # route -> time.monotonic() it may be used again
+
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.rate_limited = 0
+
+    async def send_many(self, messages):
+        """Send (user_id, content) pairs; returns {user_id: reason} for the ones that failed"""
+        results = await asyncio.gather(*(self.send(user_id, content) for user_id, content in messages))
+        return {user_id: reason for (user_id, _), reason in zip(messages, results) if reason is not None}
+
+    async def send(self, user_id, content):
+        """Deliver one DM; returns None on success or a short reason it failed"""
+        async with self._semaphore:
+            reason = None
+            for attempt in range(self.max_attempts):
+                if attempt:
+                    self.retries += 1
+                route = "create_dm"
+                try:
+                    await self._wait_route(route)
+                    # Opening the DM channel from the ID skips a fetch_user round-trip
+                    channel = await self.bot.create_dm(discord.Object(id=user_id))
+                    route = f"dm:{channel.id}"
+                    await self._wait_route(route)
+                    await channel.send(content)
+                    self.sent += 1
+                    return None
+                except discord.Forbidden:
+                    reason = "DMs are closed or the bot is blocked"
+                    break
+                except discord.NotFound:
+                    reason = "User not found"
+                    break
+                except discord.RateLimited as e:
+                    reason = "Rate limited"
+                    self._pause_route(route, e.retry_after)
+                except discord.HTTPException as e:
+                    if e.status == 429:
+                        reason = "Rate limited"
+                        self._pause_route(route, self._retry_after(e))
+                    elif e.status >= 500:
+                        reason = f"Discord error {e.status}"
+                        await self._backoff(attempt)
+                    else:
+                        reason = f"HTTP {e.status}: {e.text or 'request rejected'}"
+                        break
+                except (OSError, asyncio.TimeoutError) as e:
+                    reason = f"Connection error: {e.__class__.__name__}"
+                    await self._backoff(attempt)
+
+            self.failed += 1
+            return reason
+
+    @staticmethod
+    def _retry_after(error):
+        try:
+            return float(error.response.headers.get('Retry-After', 1))
+        except (AttributeError, TypeError, ValueError):
+            return 1.0
+
+    def _pause_route(self, route, retry_after):
+        self.rate_limited += 1
+        resume_at = time.monotonic() + retry_after
+        self._resume_at[route] = max(self._resume_at.get(route, 0), resume_at)
+
+    async def _wait_route(self, route):
+        delay = self._resume_at.get(route, 0) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        elif route in self._resume_at:
+            del self._resume_at[route]
+
+    async def _backoff(self, attempt):
+        if attempt + 1 < self.max_attempts:
+            await asyncio.sleep(self.base_delay * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    def stats(self):
+        return {"sent": self.sent, "failed": self.failed, "retries": self.retries, "rate_limited": self.rate_limited}
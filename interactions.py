@@ -0,0 +1,23 @@
+"""Running the prefix commands' handlers from slash commands."""
+import discord
+
+class InteractionContext:
+    """The parts of commands.Context the command handlers use, for a deferred slash command"""
+
+    def __init__(self, interaction: discord.Interaction):
+        self.interaction = interaction
+        self.bot = interaction.client
+        self.channel = interaction.channel
+        self.guild = interaction.guild
+        self.author = interaction.user
+        # The response was used up by the defer; replies go out as followups
+        self.send = interaction.followup.send
+
+async def deferred_context(interaction: discord.Interaction, ephemeral: bool = False) -> InteractionContext:
+    """Acknowledge a slash command and return a ctx whose send() replies to it.
+
+    Handlers wait on the game's actor, which can take longer than Discord's
+    3 second window to acknowledge an interaction, so it is deferred first.
+    """
+    await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+    return InteractionContext(interaction)
@@ -0,0 +1,86 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+# Levels used when config.json has no "logging.levels" entry for a logger
+DEFAULT_LEVELS = {
+    "": "INFO",
+    "discord": "INFO",
+    "discord.gateway": "WARNING",
+    "discord.http": "WARNING",
+}
+
+# Per-game tracing goes through this logger; it is always enabled and
+# trace() decides per call based on the game's debug_mode
+TRACE_LOGGER = "mafia.trace"
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+class JSONLinesFormatter(logging.Formatter):
+    """One JSON object per line with the standard fields plus any extra= values"""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def setup_logging(config):
+    """Route all logging through a queue to the console and a rotating JSON-lines file.
+
+    Loggers only put records on the queue; a background QueueListener
+    thread does the formatting and I/O, so logging never blocks the event
+    loop on a write. Returns the listener, which must be stopped on shutdown
+    to flush what is still queued.
+    """
+    settings = config.get('logging', {})
+    path = settings.get('file', 'logs/mafia.jsonl')
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=settings.get('max_bytes', 10 * 1024 * 1024),
+        backupCount=settings.get('backup_count', 5),
+        encoding='utf-8',
+    )
+    file_handler.setFormatter(JSONLinesFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)-8s %(name)s: %(message)s'))
+    console_handler.setLevel(settings.get('console_level', 'INFO'))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    levels = dict(DEFAULT_LEVELS)
+    levels.update(settings.get('levels', {}))
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level.upper() if isinstance(level, str) else level)
+    logging.getLogger(TRACE_LOGGER).setLevel(logging.DEBUG)
+
+    listener.start()
+    return listener
+
+_trace_log = logging.getLogger(TRACE_LOGGER)
+
+def trace(game, msg, *args):
+    """Log a DEBUG line about a game, only when that game has debug_mode on"""
+    if game.debug_mode:
+        _trace_log.debug(msg, *args, extra={"channel_id": game.channel_id}, stacklevel=2)
@@ -0,0 +1,240 @@
+import bisect
+import functools
+import logging
+import time
+import aiohttp
+from aiohttp import web
+from discord import app_commands
+
+log = logging.getLogger(__name__)
+
+# Latency histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "mafia_command_seconds": "Command latency by command and kind (prefix or slash)",
+    "mafia_command_errors_total": "Commands that raised an error",
+    "mafia_command_in_flight": "Commands currently running",
+    "mafia_store_seconds": "GameStore method latency",
+    "mafia_store_errors_total": "GameStore methods that raised",
+    "mafia_store_in_flight": "GameStore calls currently running",
+    "mafia_sqlite_seconds": "Time spent in SQLite by operation",
+    "mafia_store_conflicts_total": "Writes rejected because another writer changed the game first",
+    "mafia_transition_lag_seconds": "Delay between a phase deadline and the start of its transition",
+    "mafia_transition_seconds": "Phase transition handler duration",
+    "mafia_transition_failures_total": "Phase transitions that could not be claimed, raised or timed out",
+    "mafia_discord_http_seconds": "Discord REST request latency by HTTP method and status",
+}
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket containing the q-th quantile (None when empty)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+class Metrics:
+    """In-process counters, in-flight gauges and latency histograms.
+
+    Series are keyed by metric name and a sorted tuple of label pairs.
+    Collectors are callables returning a dict of numbers (e.g. a component's
+    stats()) that are exported as gauges when the registry is rendered.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.collectors = {}  # name -> callable returning {stat: number}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def add_gauge(self, name, amount, **labels):
+        key = self._key(name, labels)
+        self.gauges[key] = self.gauges.get(key, 0) + amount
+
+    def add_collector(self, name, collect):
+        self.collectors[name] = collect
+
+    def collect(self):
+        """{collector name: stats dict} for every registered collector"""
+        results = {}
+        for name, collect in self.collectors.items():
+            try:
+                results[name] = collect()
+            except Exception:
+                log.exception("Metrics collector %s failed", name)
+        return results
+
+    def render_prometheus(self):
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for (name, labels), value in sorted(self.gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for collector, stats in self.collect().items():
+            for stat, value in stats.items():
+                if isinstance(value, (int, float)):
+                    name = f"mafia_{collector}_{stat}"
+                    header(name, "gauge")
+                    lines.append(f"{name} {float(value)}")
+
+        return "\n".join(lines) + "\n"
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+REGISTRY = Metrics()
+
+def timed(prefix):
+    """Record latency, errors and in-flight count of an async method as <prefix>_seconds{method=...}"""
+    def decorator(fn):
+        method = fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            REGISTRY.add_gauge(f"{prefix}_in_flight", 1, method=method)
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                REGISTRY.inc(f"{prefix}_errors_total", method=method)
+                raise
+            finally:
+                REGISTRY.observe(f"{prefix}_seconds", time.perf_counter() - started, method=method)
+                REGISTRY.add_gauge(f"{prefix}_in_flight", -1, method=method)
+        return wrapper
+    return decorator
+
+# Prefix command hooks, registered with Bot.before_invoke / Bot.after_invoke.
+# after_invoke runs whether or not the command raised; errors (including
+# failed checks, which never reach before_invoke) are counted by
+# record_command_error from on_command_error.
+
+async def before_command(ctx):
+    ctx.metrics_started = time.perf_counter()
+    REGISTRY.add_gauge("mafia_command_in_flight", 1, command=ctx.command.qualified_name, kind="prefix")
+
+async def after_command(ctx):
+    started = getattr(ctx, "metrics_started", None)
+    if started is None:
+        return
+    command = ctx.command.qualified_name
+    REGISTRY.observe("mafia_command_seconds", time.perf_counter() - started, command=command, kind="prefix")
+    REGISTRY.add_gauge("mafia_command_in_flight", -1, command=command, kind="prefix")
+
+async def record_command_error(ctx, error):
+    command = ctx.command.qualified_name if ctx.command else "unknown"
+    REGISTRY.inc("mafia_command_errors_total", command=command, kind="prefix", error=type(error).__name__)
+
+class InstrumentedTree(app_commands.CommandTree):
+    """CommandTree that times every slash command from its checks to completion or error"""
+
+    async def interaction_check(self, interaction):
+        if interaction.command is not None:
+            interaction.extras["metrics_started"] = time.perf_counter()
+            REGISTRY.add_gauge("mafia_command_in_flight", 1, command=interaction.command.qualified_name, kind="slash")
+        return True
+
+    def finish(self, interaction, error=None):
+        started = interaction.extras.pop("metrics_started", None)
+        if started is None:
+            return
+        command = interaction.command.qualified_name
+        REGISTRY.observe("mafia_command_seconds", time.perf_counter() - started, command=command, kind="slash")
+        REGISTRY.add_gauge("mafia_command_in_flight", -1, command=command, kind="slash")
+        if error is not None:
+            REGISTRY.inc("mafia_command_errors_total", command=command, kind="slash", error=type(error).__name__)
+
+    async def on_error(self, interaction, error):
+        self.finish(interaction, error)
+        await super().on_error(interaction, error)
+
+def http_trace_config():
+    """aiohttp TraceConfig timing every Discord REST request (pass as Client(http_trace=...))"""
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        REGISTRY.observe("mafia_discord_http_seconds", time.perf_counter() - context.started,
+                         method=params.method, status=params.response.status)
+
+    async def on_request_exception(session, context, params):
+        REGISTRY.observe("mafia_discord_http_seconds", time.perf_counter() - context.started,
+                         method=params.method, status="error")
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+async def start_server(port, host="127.0.0.1", registry=REGISTRY):
+    """Serve the registry in Prometheus text format at http://host:port/metrics"""
+    async def handle(request):
+        return web.Response(text=registry.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.info("Serving metrics on http://%s:%s/metrics", host, port)
+    return runner
@@ -1,10 +1,63 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field, fields, MISSING
 from typing import List, Dict, Optional, Union
 import json
 from datetime import datetime, timedelta
 import time
+from logs import trace
 
-@dataclass
+# How long the twilight after a hammer lasts
+TWILIGHT_SECONDS = 60
+
+def _compile_codec(cls, nested=None, nested_lists=None):
+    """Generate straight-line to_dict/from_dict functions for a dataclass.
+    
+    nested maps a field name to the model class stored in it, nested_lists maps
+    a field name to the model class of its list items. from_dict builds the
+    instance with positional arguments and fills in field defaults for keys
+    missing from older saved data.
+    """
+    nested = nested or {}
+    nested_lists = nested_lists or {}
+    namespace = {"cls": cls}
+    items = []
+    args = []
+    
+    for f in fields(cls):
+        if not f.init:
+            continue
+        name = f.name
+        key = repr(name)
+        
+        if name in nested:
+            namespace[f"_{name}_from"] = nested[name].from_dict
+            items.append(f"{key}: self.{name}.to_dict() if self.{name} is not None else None")
+            value = f"_{name}_from(data[{key}]) if data.get({key}) is not None else None"
+        elif name in nested_lists:
+            namespace[f"_{name}_from"] = nested_lists[name].from_dict
+            items.append(f"{key}: [item.to_dict() for item in self.{name}]")
+            value = f"[_{name}_from(item) for item in data.get({key}) or ()]"
+        else:
+            items.append(f"{key}: self.{name}")
+            value = f"data.get({key}, _{name}_default)"
+        
+        if f.default is not MISSING:
+            namespace[f"_{name}_default"] = f.default
+        elif f.default_factory is not MISSING:
+            namespace[f"_{name}_default"] = None
+        elif name not in nested and name not in nested_lists:
+            value = f"data[{key}]"
+        args.append(value)
+    
+    source = (
+        "def to_dict(self):\n"
+        "    return {" + ", ".join(items) + "}\n"
+        "def from_dict(data):\n"
+        "    return cls(" + ", ".join(args) + ")\n"
+    )
+    exec(source, namespace)
+    return namespace["to_dict"], namespace["from_dict"]
+
+@dataclass(slots=True)
 class GameConfig:
     min_players: int = 5
     max_players: Optional[int] = 13
@@ -15,56 +68,32 @@ class GameConfig:
     neutrals_teamed: bool = False
     role_density: str = "LIGHT"  # VANILLA, LIGHT, HEAVY
     game_length: str = "LONG"    # QUICK, LONG, EXTENDED
-    
-    def to_dict(self):
-        return {
-            "min_players": self.min_players,
-            "max_players": self.max_players,
-            "signup_ends_at": self.signup_ends_at,
-            "day_duration_sec": self.day_duration_sec,
-            "night_duration_sec": self.night_duration_sec,
-            "twilight_enabled": self.twilight_enabled,
-            "neutrals_teamed": self.neutrals_teamed,
-            "role_density": self.role_density,
-            "game_length": getattr(self, 'game_length', 'LONG')
-        }
 
-@dataclass
+@dataclass(slots=True)
 class Player:
     id: int
     status: str = "alive"  # alive, dead
     tentative: bool = False
     role: Optional[str] = None
-    name: Optional[str] = None  # Add this missing attribute
-    
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "status": self.status,
-            "tentative": self.tentative,
-            "role": self.role,
-            "name": getattr(self, 'name', None)  # Handle the name attribute if it exists
-        }
+    name: Optional[str] = None
     
     def get_display_name(self):
         if self.name:
             return self.name
         return f"<@{self.id}>"
 
-@dataclass
+@dataclass(slots=True)
 class Phase:
     name: str = "SIGNUP"  # SIGNUP, DAY, NIGHT, ENDED, CANCELLED
     number: int = 0
     ends_at: int = 0
-    
-    def to_dict(self):
-        return {
-            "name": self.name,
-            "number": self.number,
-            "ends_at": self.ends_at
-        }
 
-@dataclass
+for _model in (GameConfig, Player, Phase):
+    _to_dict, _from_dict = _compile_codec(_model)
+    _model.to_dict = _to_dict
+    _model.from_dict = staticmethod(_from_dict)
+
+@dataclass(slots=True)
 class GameState:
     channel_id: int
     guild_id: int
@@ -79,6 +108,25 @@ class GameState:
     messages: Dict[str, int] = None
     debug_mode: bool = False
     dummy_players: List[Player] = None
+    vote_seq: int = 0  # sequence number of the last vote event folded into votes
+    mafia_count: Optional[int] = None
+    neutral_count: Optional[int] = None
+    mafia_channel_id: Optional[int] = None
+    failed_dms: Dict[int, str] = None  # user ID -> reason a role DM could not be delivered
+    fired_phase: Optional[List] = None  # [name, number, ends_at] of the last phase whose deadline was processed
+    fired_effects: Dict[str, List] = None  # transition side effect -> phase key it was sent for (see PhaseScheduler.once)
+    
+    # Derived counters kept in step with votes and player status; not serialized
+    vote_counts: Dict[int, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+    alive_count: int = field(default=0, init=False, repr=False, compare=False)
+    
+    # Version of the games row this object was loaded from or last saved as
+    # (0 = never saved); kept in its own column, not serialized
+    version: int = field(default=0, init=False, repr=False, compare=False)
+    
+    # Lookup indexes over players + dummy_players; not serialized
+    players_by_id: Dict[int, Player] = field(default_factory=dict, init=False, repr=False, compare=False)
+    players_by_name: Dict[str, Player] = field(default_factory=dict, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.mafia_ids is None:
@@ -95,93 +143,203 @@ class GameState:
             self.messages = {}
         if self.dummy_players is None:
             self.dummy_players = []
+        if self.failed_dms is None:
+            self.failed_dms = {}
+        if self.fired_effects is None:
+            self.fired_effects = {}
         self.debug_mode = bool(self.debug_mode)
+        self.rebuild_player_index()
+        self.rebuild_tallies()
             
-    def to_dict(self):
-        """Convert GameState object to dictionary for serialization"""
-        return {
-            "channel_id": self.channel_id,
-            "guild_id": self.guild_id,
-            "host_id": self.host_id,
-            "config": self.config.to_dict() if hasattr(self.config, 'to_dict') else vars(self.config),
-            "players": [player.to_dict() if hasattr(player, 'to_dict') else vars(player) for player in self.players],
-            "mafia_ids": self.mafia_ids,
-            "neutral_ids": self.neutral_ids,
-            "town_ids": self.town_ids,
-            "phase": self.phase.to_dict() if hasattr(self.phase, 'to_dict') else vars(self.phase),
-            "votes": self.votes,
-            "messages": self.messages,
-            "debug_mode": getattr(self, 'debug_mode', False),
-            "dummy_players": [player.to_dict() if hasattr(player, 'to_dict') else vars(player) 
-                            for player in getattr(self, 'dummy_players', [])]
-        }
-    
     def get_all_players(self):
         """Get both real and dummy players"""
         return self.players + self.dummy_players
     
     def get_player(self, player_id: int) -> Optional[Player]:
         """Get a player by ID (checks both real and dummy players)"""
+        return self.players_by_id.get(player_id)
+    
+    def get_player_by_name(self, name: str) -> Optional[Player]:
+        """Get a player by case-insensitive name (only dummy players have names)"""
+        return self.players_by_name.get(name.lower())
+    
+    def rebuild_player_index(self):
+        """Recompute players_by_id and players_by_name from the player lists"""
+        self.players_by_id = {}
+        self.players_by_name = {}
         for player in self.get_all_players():
-            if player.id == player_id:
-                return player
-        return None
+            self._index_player(player)
+    
+    def _index_player(self, player: Player):
+        self.players_by_id.setdefault(player.id, player)
+        if player.name:
+            self.players_by_name.setdefault(player.name.lower(), player)
+    
+    def _unindex_player(self, player: Player):
+        """Drop a player that has left the lists; a remaining player with the same id or name takes its place"""
+        name = player.name.lower() if player.name else None
+        by_id = self.players_by_id.get(player.id) is player
+        by_name = name is not None and self.players_by_name.get(name) is player
+        if by_id:
+            del self.players_by_id[player.id]
+        if by_name:
+            del self.players_by_name[name]
+        if by_id or by_name:
+            for other in self.get_all_players():
+                if by_id and other.id == player.id:
+                    self.players_by_id.setdefault(other.id, other)
+                if by_name and other.name and other.name.lower() == name:
+                    self.players_by_name.setdefault(name, other)
     
     @classmethod
     def from_dict(cls, data):
-        # Only print debug info when debug_mode is changing or there's an issue
-        debug_mode_value = data.get('debug_mode', False)
-        
-        # Optional: only print when debug_mode is True or when it's missing but should be True
-        if debug_mode_value == True or ('debug_mode' not in data and debug_mode_value == True):
-            print(f"FROM_DICT: Raw data debug_mode = {data.get('debug_mode', 'MISSING')}")
-            print(f"FROM_DICT: Extracted debug_mode = {debug_mode_value}")
-        
-        config = GameConfig(**data['config'])
-        players = [Player(**p) for p in data['players']]
-        phase = Phase(**data['phase'])
-        
-        # Extract dummy_players with proper default handling
-        dummy_players_data = data.get('dummy_players', [])
-        dummy_players = [Player(**p) for p in dummy_players_data]
-        
-        # Create the GameState instance with ALL parameters
-        game = cls(
-            channel_id=data['channel_id'],
-            guild_id=data['guild_id'],
-            host_id=data['host_id'],
-            config=config,
-            players=players,
-            mafia_ids=data.get('mafia_ids', []),
-            neutral_ids=data.get('neutral_ids', []),
-            town_ids=data.get('town_ids', []),
-            phase=phase,
-            votes=data.get('votes', {}),
-            messages=data.get('messages', {}),
-            debug_mode=debug_mode_value,  # Use the extracted value
-            dummy_players=dummy_players
-        )
-        
-        # Only print final debug mode when it's True
-        if game.debug_mode == True:
-            print(f"FROM_DICT: Final game.debug_mode = {game.debug_mode}")
-        
+        game = _game_state_from_dict(data)
+        trace(game, "Built game for channel %s: %d players, %d votes", game.channel_id, len(game.players), len(game.votes))
         return game
 
     def get_alive_players(self):
         return [p for p in self.get_all_players() if p.status == "alive"]
     
     def add_player(self, player_id: int, tentative: bool = False):
-        if not any(p.id == player_id for p in self.get_all_players()):
-            self.players.append(Player(id=player_id, tentative=tentative))
+        if player_id not in self.players_by_id:
+            player = Player(id=player_id, tentative=tentative)
+            self.players.append(player)
+            self._index_player(player)
+            self.alive_count += 1
+    
+    def add_dummy_player(self, player: Player):
+        self.dummy_players.append(player)
+        self._index_player(player)
+        if player.status == "alive":
+            self.alive_count += 1
     
     def remove_player(self, player_id: int):
-        self.players = [p for p in self.players if p.id != player_id]
-        self.dummy_players = [p for p in self.dummy_players if p.id != player_id]
+        player = self.players_by_id.get(player_id)
+        if player is None:
+            return
+        
+        # By identity: two players can compare equal
+        for players in (self.players, self.dummy_players):
+            for index, other in enumerate(players):
+                if other is player:
+                    del players[index]
+                    break
+            else:
+                continue
+            break
+        self._unindex_player(player)
+        if player.status == "alive":
+            self.alive_count -= 1
+    
+    def clear_dummy_players(self):
+        dummies, self.dummy_players = self.dummy_players, []
+        for player in dummies:
+            self._unindex_player(player)
+            if player.status == "alive":
+                self.alive_count -= 1
+    
+    def kill_player(self, player: Player):
+        if player.status == "alive":
+            player.status = "dead"
+            self.alive_count -= 1
+    
+    def revive_player(self, player: Player):
+        if player.status != "alive":
+            player.status = "alive"
+            self.alive_count += 1
+    
+    def cast_vote(self, voter_id: int, target_id: int):
+        previous = self.votes.get(voter_id)
+        if previous == target_id:
+            return
+        if previous is not None:
+            self._decrement_vote(previous)
+        self.votes[voter_id] = target_id
+        self.vote_counts[target_id] = self.vote_counts.get(target_id, 0) + 1
+    
+    def remove_vote(self, voter_id: int):
+        previous = self.votes.pop(voter_id, None)
+        if previous is not None:
+            self._decrement_vote(previous)
+    
+    def clear_votes(self):
+        self.votes = {}
+        self.vote_counts = {}
+    
+    def _decrement_vote(self, target_id: int):
+        remaining = self.vote_counts.get(target_id, 0) - 1
+        if remaining > 0:
+            self.vote_counts[target_id] = remaining
+        else:
+            self.vote_counts.pop(target_id, None)
+    
+    def rebuild_tallies(self):
+        """Recompute vote_counts and alive_count from scratch"""
+        self.vote_counts = {}
+        for target_id in self.votes.values():
+            self.vote_counts[target_id] = self.vote_counts.get(target_id, 0) + 1
+        self.alive_count = sum(1 for p in self.get_all_players() if p.status == "alive")
+    
+    def check_tally_consistency(self) -> List[str]:
+        """Compare the incremental counters against a full recount; returns a list of mismatches"""
+        problems = []
+        expected_counts = {}
+        for target_id in self.votes.values():
+            expected_counts[target_id] = expected_counts.get(target_id, 0) + 1
+        if expected_counts != self.vote_counts:
+            problems.append(f"vote_counts {self.vote_counts} != recount {expected_counts}")
+        
+        expected_alive = sum(1 for p in self.get_all_players() if p.status == "alive")
+        if expected_alive != self.alive_count:
+            problems.append(f"alive_count {self.alive_count} != recount {expected_alive}")
+        return problems
     
     def get_vote_count(self, target_id: int) -> int:
-        return sum(1 for voter_id, voted_id in self.votes.items() if voted_id == target_id)
+        return self.vote_counts.get(target_id, 0)
     
     def get_majority_threshold(self) -> int:
-        alive_count = len(self.get_alive_players())
-        return (alive_count // 2) + 1
\ No newline at end of file
+        return (self.alive_count // 2) + 1
+    
+    def is_same_game(self, other: Optional["GameState"]) -> bool:
+        """Whether other is this game (or another copy of it) rather than a later game in the channel"""
+        return (other is not None and other.channel_id == self.channel_id
+                and other.config.signup_ends_at == self.config.signup_ends_at)
+    
+    # The voting rules, shared by VoteCog and the simulator
+    def vote_error(self, voter_id: int, target_id: Optional[int] = None) -> Optional[str]:
+        """Why voter_id can't vote for target_id right now, or None if they can.
+        
+        With no target only the voter is checked (e.g. before showing the tally).
+        """
+        if self.phase.name != "DAY":
+            return "Voting is only allowed during day phases."
+        voter = self.get_player(voter_id)
+        if not voter or voter.status != "alive":
+            return "Only alive players can vote."
+        if target_id is not None:
+            target = self.get_player(target_id)
+            if not target or target.status != "alive":
+                return "You can only vote for alive players."
+        return None
+    
+    def unvote_error(self, voter_id: int) -> Optional[str]:
+        """Why voter_id can't remove their vote right now, or None if they can"""
+        if self.phase.name != "DAY":
+            return "Voting is only allowed during day phases."
+        if voter_id not in self.votes:
+            return "You don't have an active vote to remove."
+        return None
+    
+    def is_hammer(self, target_id: int) -> bool:
+        """Whether the votes on target_id have reached majority, which ends the day"""
+        return self.get_vote_count(target_id) >= self.get_majority_threshold()
+    
+    def start_twilight(self, now: Optional[int] = None):
+        self.phase.name = "TWILIGHT"
+        self.phase.ends_at = int(time.time() if now is None else now) + TWILIGHT_SECONDS
+
+GameState.to_dict, _game_state_from_dict = _compile_codec(
+    GameState,
+    nested={"config": GameConfig, "phase": Phase},
+    nested_lists={"players": Player, "dummy_players": Player}
+)
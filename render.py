@@ -0,0 +1,81 @@
+import asyncio
+import discord
+import logging
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+class MessageRenderer:
+    """Coalesces edits to bot messages.
+
+    request() records the latest way to render a message and at most one
+    edit per message is sent every `window` seconds, built from whatever
+    state is current when it is sent. Message objects are cached so an edit
+    does not need a fetch_message round-trip first.
+    """
+
+    def __init__(self, window: float = 1.5, max_messages: int = 256):
+        self.window = window
+        self.max_messages = max_messages
+        self._messages = OrderedDict()  # message_id -> discord.Message
+        self._pending = {}  # message_id -> (channel, render callable)
+        self._tasks = {}  # message_id -> flush task
+
+        self.requested = 0
+        self.edits = 0
+        self.fetches = 0
+        self.failures = 0
+
+    def track(self, message):
+        """Remember a message object (e.g. one the bot just sent) for later edits"""
+        self._messages[message.id] = message
+        self._messages.move_to_end(message.id)
+        while len(self._messages) > self.max_messages:
+            self._messages.popitem(last=False)
+
+    def forget(self, message_id):
+        self._messages.pop(message_id, None)
+        self._pending.pop(message_id, None)
+
+    def request(self, channel, message_id, render):
+        """Schedule an edit of message_id; render() returns the kwargs for Message.edit"""
+        self.requested += 1
+        self._pending[message_id] = (channel, render)
+        if message_id not in self._tasks:
+            self._tasks[message_id] = asyncio.create_task(self._flush_later(message_id))
+
+    async def _flush_later(self, message_id):
+        try:
+            # Requests that arrive while an edit is in flight are picked up by the next pass
+            while message_id in self._pending:
+                await asyncio.sleep(self.window)
+                channel, render = self._pending.pop(message_id)
+                await self._edit(channel, message_id, render())
+        finally:
+            del self._tasks[message_id]
+
+    async def _edit(self, channel, message_id, kwargs):
+        try:
+            message = self._messages.get(message_id)
+            if message is None:
+                message = await channel.fetch_message(message_id)
+                self.fetches += 1
+                self.track(message)
+            await message.edit(**kwargs)
+            self.edits += 1
+        except discord.NotFound:
+            self.forget(message_id)
+            self.failures += 1
+        except Exception:
+            self.failures += 1
+            log.exception("Failed to edit message %s", message_id)
+
+    def stats(self):
+        return {
+            "requested": self.requested,
+            "edits": self.edits,
+            "edits_saved": self.requested - self.edits - self.failures - len(self._pending),
+            "fetches": self.fetches,
+            "failures": self.failures,
+            "cached_messages": len(self._messages),
+        }
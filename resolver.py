@@ -0,0 +1,73 @@
+import time
+import discord
+from collections import OrderedDict
+
+class UserResolver:
+    """Looks up users and members without an API call where possible.
+
+    Order: the client's own cache (get_user / guild.get_member), then an LRU
+    of objects fetched earlier that are younger than `ttl` seconds, then the
+    API (fetch_user / guild.fetch_member). Lookups of IDs that do not exist
+    return None.
+    """
+
+    def __init__(self, bot, max_size: int = 1024, ttl: float = 3600):
+        self.bot = bot
+        self.max_size = max_size
+        self.ttl = ttl
+        self._users = OrderedDict()  # user_id -> (fetched_at, User)
+        self._members = OrderedDict()  # (guild_id, user_id) -> (fetched_at, Member)
+
+        self.client_hits = 0
+        self.lru_hits = 0
+        self.api_fetches = 0
+        self.not_found = 0
+
+    async def user(self, user_id):
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            self.client_hits += 1
+            return user
+        return await self._cached_or_fetch(self._users, user_id, lambda: self.bot.fetch_user(user_id))
+
+    async def member(self, guild, user_id):
+        member = guild.get_member(user_id)
+        if member is not None:
+            self.client_hits += 1
+            return member
+        return await self._cached_or_fetch(self._members, (guild.id, user_id), lambda: guild.fetch_member(user_id))
+
+    async def _cached_or_fetch(self, cache, key, fetch):
+        entry = cache.get(key)
+        if entry is not None:
+            fetched_at, value = entry
+            if time.monotonic() - fetched_at < self.ttl:
+                cache.move_to_end(key)
+                self.lru_hits += 1
+                return value
+            del cache[key]
+
+        self.api_fetches += 1
+        try:
+            value = await fetch()
+        except discord.NotFound:
+            self.not_found += 1
+            return None
+
+        cache[key] = (time.monotonic(), value)
+        while len(cache) > self.max_size:
+            cache.popitem(last=False)
+        return value
+
+    def stats(self):
+        lookups = self.client_hits + self.lru_hits + self.api_fetches
+        return {
+            "lookups": lookups,
+            "client_hits": self.client_hits,
+            "lru_hits": self.lru_hits,
+            "api_fetches": self.api_fetches,
+            "not_found": self.not_found,
+            "hit_rate": (self.client_hits + self.lru_hits) / lookups if lookups else 0.0,
+            "cached_users": len(self._users),
+            "cached_members": len(self._members),
+        }
@@ -0,0 +1,49 @@
+import random
+
+NEUTRAL_ROLES = ["Jester", "Executioner", "Serial Killer", "Arsonist"]
+SPECIAL_TOWN_ROLES = ["Cop", "Doctor", "Vigilante", "Investigator"]
+
+def pick_roles(game, rng=random):
+    """Give every player a role and fill in mafia_ids, neutral_ids and town_ids.
+
+    Uses game.mafia_count, game.neutral_count and the role density. Only the
+    GameState is touched, so this runs the same in the bot and in the
+    simulator; pass a seeded random.Random as rng for a reproducible deal.
+    """
+    # Calculate town count
+    total_players = len(game.players)
+    town_count = total_players - game.mafia_count - game.neutral_count
+    
+    # Assign roles
+    player_ids = [player.id for player in game.players]
+    rng.shuffle(player_ids)
+    
+    # Assign mafia roles
+    for i in range(game.mafia_count):
+        player_id = player_ids.pop()
+        player = game.get_player(player_id)
+        player.role = "Mafia"
+        game.mafia_ids.append(player_id)
+    
+    # Assign neutral roles
+    for i in range(game.neutral_count):
+        player_id = player_ids.pop()
+        player = game.get_player(player_id)
+        player.role = rng.choice(NEUTRAL_ROLES) if game.config.role_density != "VANILLA" else "Neutral"
+        game.neutral_ids.append(player_id)
+    
+    # Assign town roles
+    for i in range(town_count):
+        player_id = player_ids.pop()
+        player = game.get_player(player_id)
+        if game.config.role_density == "VANILLA" or i == 0:
+            player.role = "Vanilla Townie"
+        else:
+            # Assign special roles based on density
+            if game.config.role_density == "LIGHT" and i % 4 == 0:
+                player.role = rng.choice(SPECIAL_TOWN_ROLES)
+            elif game.config.role_density == "HEAVY" and i % 2 == 0:
+                player.role = rng.choice(SPECIAL_TOWN_ROLES)
+            else:
+                player.role = "Vanilla Townie"
+        game.town_ids.append(player_id)
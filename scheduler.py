@@ -0,0 +1,344 @@
+import asyncio
+import discord
+import heapq
+import logging
+import time
+from metrics import REGISTRY
+
+log = logging.getLogger(__name__)
+
+# Phases whose deadline triggers a transition in GameStore.process_game_transition
+SCHEDULED_PHASES = ("SIGNUP", "DAY", "NIGHT")
+
+class PhaseScheduler:
+    """Fires phase transitions at their deadlines.
+
+    Deadlines live in a min-heap of (ends_at, channel_id). The run loop sleeps
+    until the earliest one is due and is woken early whenever arm() schedules
+    a sooner deadline. Entries are never removed from the heap directly; an
+    entry is stale once its deadline no longer matches self._deadlines.
+
+    Due games are handed to a pool of `workers` tasks, so a transition stuck
+    on a slow or rate-limited guild only holds up its own game. Each
+    transition is claimed on the game (fired_phase) and saved on the game's
+    actor before any of its side effects run, so restarts and other bot
+    processes don't fire the same phase again while it is handled. The side
+    effects run outside the actor, so votes and clicks aren't held up behind
+    Discord, and are cancelled after `timeout` seconds. A transition that
+    fails or times out releases its claim and is retried with backoff, up to
+    `attempts` times; after that it is left for the next startup's catch-up.
+    Messages a transition sends go through once(), which records them on the
+    game so a retry skips what already went out. A transition stopped while
+    a message was in flight, or refused by Discord (Forbidden), keeps its
+    claim and is not retried, since retrying could repeat or won't help.
+
+    Deadlines that passed while the bot was offline are replayed once at
+    startup by catch_up(), oldest first and at most `catchup_rate` games per
+    second. Until catch-up reaches a game, saving it doesn't arm it, so it
+    still waits its turn. The scheduler records every `heartbeat` seconds
+    that the bot is running; only deadlines after the last record fell in
+    downtime and get the "while the bot was offline" notice. The others are
+    transitions given up on while the bot was running, and are retried
+    without it.
+    """
+
+    def __init__(self, store, bot, workers: int = 8, timeout: float = 60.0, attempts: int = 3,
+                 catchup_rate: float = 2.0, backoff: float = 1.0, heartbeat: float = 60.0):
+        self.store = store
+        self.bot = bot
+        self.workers = workers
+        self.timeout = timeout
+        self.attempts = attempts
+        self.backoff = backoff  # seconds before the first retry, doubling after each
+        self.catchup_rate = catchup_rate
+        self.heartbeat = heartbeat
+        self._heartbeat_task = None
+        self._catchup_task = None
+        self._catchup = set()  # channel_ids with a missed deadline catch-up hasn't reached yet
+        self.caught_up = 0
+        self.catchup_pending = 0
+        self._heap = []
+        self._deadlines = {}  # channel_id -> ends_at currently armed
+        self._wakeup = asyncio.Event()
+        self._queue = asyncio.Queue()
+        self._queued = set()  # channel_ids waiting for or being handled by a worker
+        self._worker_tasks = []
+        self._sending = {}  # channel_id -> side effect a transition has in flight
+
+    @staticmethod
+    def phase_key(game):
+        return [game.phase.name, game.phase.number, game.phase.ends_at]
+
+    def arm(self, game):
+        """Schedule (or reschedule) the transition for a game's current phase"""
+        channel_id = game.channel_id
+        if game.phase.name not in SCHEDULED_PHASES or not game.phase.ends_at:
+            self.disarm(channel_id)
+            return
+
+        # catch_up() will queue it, throttled and with its offline notice
+        if channel_id in self._catchup:
+            return
+
+        # Saving a game whose phase was already processed must not fire it again
+        if game.fired_phase == self.phase_key(game):
+            return
+
+        self.arm_deadline(channel_id, game.phase.ends_at)
+
+    def arm_deadline(self, channel_id, ends_at):
+        if self._deadlines.get(channel_id) == ends_at:
+            return
+
+        self._deadlines[channel_id] = ends_at
+        heapq.heappush(self._heap, (ends_at, channel_id))
+
+        # Only wake the loop if this is now the earliest deadline
+        if self._heap[0] == (ends_at, channel_id):
+            self._wakeup.set()
+
+    def disarm(self, channel_id):
+        self._deadlines.pop(channel_id, None)
+
+    def next_deadline(self):
+        while self._heap:
+            ends_at, channel_id = self._heap[0]
+            if self._deadlines.get(channel_id) == ends_at:
+                return ends_at
+            heapq.heappop(self._heap)
+        return None
+
+    async def load(self):
+        """Arm every game whose deadline is still ahead and start catching up on the rest; called at startup"""
+        now = int(time.time())
+        for channel_id, ends_at in await self.store.get_scheduled_deadlines(after=now):
+            self.arm_deadline(channel_id, ends_at)
+        if self._catchup_task is None:
+            # Read before recording this start, so it marks where the downtime began
+            last_alive = await self.store.get_last_alive()
+            await self.store.record_alive(now)
+            overdue = await self.store.get_overdue_deadlines(now)
+            self._catchup.update(channel_id for channel_id, _ in overdue)
+            if overdue:
+                log.info("Catching up on %d overdue phase deadline(s)", len(overdue))
+            self._catchup_task = asyncio.create_task(self.catch_up(overdue, last_alive))
+
+    async def catch_up(self, overdue, last_alive=None):
+        """Replay overdue deadlines oldest first, throttled so a restart doesn't burst into rate limits.
+        
+        last_alive is when the previous run was last known to be up (None if
+        unknown); deadlines after it passed while the bot was offline.
+        """
+        self.catchup_pending = len(overdue)
+        interval = 1 / self.catchup_rate if self.catchup_rate else 0
+        for channel_id, ends_at in overdue:
+            self._catchup.discard(channel_id)
+            self.enqueue(channel_id, missed=last_alive is None or ends_at > last_alive)
+            self.catchup_pending -= 1
+            self.caught_up += 1
+            await asyncio.sleep(interval)
+
+    def start_workers(self):
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.create_task(self._worker()))
+
+    def enqueue(self, channel_id, missed=False):
+        """Queue a transition check for a game; a game already queued is not added twice.
+        
+        missed marks a deadline that passed while the bot was offline.
+        """
+        if channel_id in self._queued:
+            return
+        self._queued.add(channel_id)
+        self._queue.put_nowait((channel_id, missed))
+        self.start_workers()
+
+    async def drain(self):
+        """Wait until every queued transition has been handled"""
+        await self._queue.join()
+
+    async def _worker(self):
+        while True:
+            channel_id, missed = await self._queue.get()
+            try:
+                await self.fire(channel_id, missed)
+            finally:
+                self._queued.discard(channel_id)
+                self._queue.task_done()
+
+    def stats(self):
+        return {
+            "armed": len(self._deadlines),
+            "queued": self._queue.qsize(),
+            "in_progress": len(self._queued) - self._queue.qsize(),
+            "workers": len(self._worker_tasks),
+            "caught_up": self.caught_up,
+            "catchup_pending": self.catchup_pending,
+        }
+
+    async def run(self):
+        await self.bot.wait_until_ready()
+        await self.load()
+        self.start_workers()
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self.keep_alive())
+
+        while not self.bot.is_closed():
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                ends_at, channel_id = heapq.heappop(self._heap)
+                if self._deadlines.get(channel_id) != ends_at:
+                    continue
+                del self._deadlines[channel_id]
+                self.enqueue(channel_id)
+
+            self._wakeup.clear()
+            deadline = self.next_deadline()
+            timeout = max(0, deadline - time.time()) if deadline is not None else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def keep_alive(self):
+        """Record every `heartbeat` seconds that the bot is running, for catch_up() after a restart"""
+        while not self.bot.is_closed():
+            await asyncio.sleep(self.heartbeat)
+            try:
+                await self.store.record_alive(int(time.time()))
+            except Exception:
+                log.warning("Could not record the scheduler heartbeat", exc_info=True)
+
+    async def fire(self, channel_id, missed=False):
+        # Retrying is safe: a phase is only handled again once its claim was released
+        for attempt in range(1, self.attempts + 1):
+            try:
+                # Serialized with commands and clicks on the same game
+                game = await self.bot.actors.run(channel_id, self.claim)
+                if not game:
+                    return
+            except Exception:
+                if attempt == self.attempts:
+                    REGISTRY.inc("mafia_transition_failures_total", reason="claim")
+                    log.exception("Could not start phase transition for channel %s", channel_id)
+                    return
+                log.warning("Phase transition for channel %s failed, retrying", channel_id, exc_info=True)
+            else:
+                if await self.transition(game, missed):
+                    return
+                if attempt == self.attempts:
+                    # Releasing the claim re-armed the deadline; leave it to the next startup
+                    self.disarm(channel_id)
+                    log.error("Giving up on phase transition for channel %s after %d attempts",
+                              channel_id, self.attempts)
+                    return
+                log.warning("Retrying phase transition for channel %s", channel_id)
+            await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+    async def claim(self, game):
+        """Claim a due game's current phase durably; runs on the game's actor and returns the claimed game or None"""
+        if not game or game.phase.name not in SCHEDULED_PHASES:
+            return None
+        if game.phase.ends_at > time.time():
+            # Deadline moved later without being re-armed through save_game
+            self.arm(game)
+            return None
+
+        key = self.phase_key(game)
+
+        async def claim(game):
+            if game.fired_phase == key or self.phase_key(game) != key:
+                return False
+            game.fired_phase = key
+            return game
+
+        return await self.store.update_game(game.channel_id, claim) or None
+
+    async def release(self, game, key):
+        """Drop the claim on a phase whose handling failed; runs on the game's actor"""
+        async def release(game):
+            # A handler that got as far as moving the game on isn't undone
+            if game.fired_phase != key or self.phase_key(game) != key:
+                return False
+            game.fired_phase = None
+            return True
+
+        if game:
+            await self.store.update_game(game.channel_id, release)
+
+    async def transition(self, game, missed=False):
+        """Run the end-of-phase handling for a claimed game, outside its actor.
+        
+        Returns False if it failed and should be retried; the claim has then
+        been released.
+        """
+        key = self.phase_key(game)
+        phase = game.phase.name
+        started = time.perf_counter()
+        REGISTRY.observe(
+            "mafia_transition_lag_seconds", time.time() - game.phase.ends_at,
+            phase=phase, source="catchup" if missed else "live"
+        )
+        try:
+            await asyncio.wait_for(self.process(game, missed), self.timeout)
+        except asyncio.TimeoutError:
+            REGISTRY.inc("mafia_transition_failures_total", reason="timeout")
+            log.error("Phase transition %s for channel %s timed out after %ss", key, game.channel_id, self.timeout)
+        except discord.Forbidden:
+            # Missing permissions or closed DMs won't fix themselves on a retry
+            self._sending.pop(game.channel_id, None)
+            REGISTRY.inc("mafia_transition_failures_total", reason="forbidden")
+            log.exception("Phase transition %s for channel %s was refused by Discord", key, game.channel_id)
+            return True
+        except Exception:
+            REGISTRY.inc("mafia_transition_failures_total", reason="error")
+            log.exception("Error processing phase transition %s for channel %s", key, game.channel_id)
+        else:
+            return True
+        finally:
+            REGISTRY.observe("mafia_transition_seconds", time.perf_counter() - started, phase=phase)
+
+        effect = self._sending.pop(game.channel_id, None)
+        if effect:
+            # It may have gone out; keep the claim rather than risk sending it twice
+            log.error("Phase transition %s for channel %s stopped while sending %s; not retrying",
+                      key, game.channel_id, effect)
+            return True
+        try:
+            await self.bot.actors.run(game.channel_id, self.release, key)
+        except Exception:
+            REGISTRY.inc("mafia_transition_failures_total", reason="release")
+            log.exception("Could not release phase transition %s for channel %s", key, game.channel_id)
+        return False
+
+    async def once(self, game, effect, send):
+        """Run `await send()` for a claimed transition unless an earlier attempt already did.
+        
+        The effect is recorded in game.fired_effects once it has gone out.
+        """
+        if game.fired_effects.get(effect) == game.fired_phase:
+            return
+        self._sending[game.channel_id] = effect
+        await send()
+        await self.bot.actors.run(game.channel_id, self.record_effect, game.fired_phase, effect)
+        del self._sending[game.channel_id]
+
+    async def record_effect(self, game, key, effect):
+        """Note that a side effect of the transition claimed as `key` was sent; runs on the game's actor"""
+        async def record(game):
+            if game.fired_phase != key:
+                return False
+            game.fired_effects[effect] = key
+            return True
+
+        if game:
+            await self.store.update_game(game.channel_id, record)
+
+    async def process(self, game, missed):
+        channel = self.bot.get_channel(game.channel_id)
+        if missed and channel:
+            await self.once(game, "offline_notice", lambda: channel.send(
+                f"⏰ This {game.phase.name.lower()} phase ended at <t:{game.phase.ends_at}:F> "
+                f"while the bot was offline. Catching up now."
+            ))
+        await self.store.process_game_transition(self.bot, game)
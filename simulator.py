@@ -0,0 +1,353 @@
+"""Headless Mafia games for stress testing and as a correctness oracle.
+
+Games use the real GameState, pick_roles and the voting rules VoteCog
+applies (GameState.vote_error, unvote_error and is_hammer), so changes to
+those rules reach the simulator too. Agents decide the votes and the mafia's night kill. After every
+action the incremental tallies are checked against a full recount, and at
+every phase change the game must survive a codec round-trip unchanged.
+
+    python simulator.py [--games 10000] [--players 13] [--agents mixed]
+                        [--workers N] [--seed 1] [--replay SEED]
+"""
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from codec import default_codec
+from models import GameState, GameConfig, Phase
+from roles import pick_roles
+
+class InvariantError(AssertionError):
+    pass
+
+class RandomAgent:
+    """Votes for a random living player other than itself, sometimes unvoting instead"""
+    name = "random"
+
+    def __init__(self, unvote_chance=0.1):
+        self.unvote_chance = unvote_chance
+
+    def candidates(self, game, player):
+        return [p.id for p in game.get_alive_players() if p.id != player.id]
+
+    def vote(self, game, player, rng):
+        """Target player ID, or None to unvote"""
+        if player.id in game.votes and rng.random() < self.unvote_chance:
+            return None
+        return rng.choice(self.candidates(game, player))
+
+    def night_kill(self, game, rng):
+        """Mafia's pick for the night kill; the first living mafia member's agent decides"""
+        targets = [p.id for p in game.get_alive_players() if p.id not in game.mafia_ids]
+        return rng.choice(targets) if targets else None
+
+class BandwagonAgent(RandomAgent):
+    """Joins the wagon with the most votes, or starts a random one"""
+    name = "bandwagon"
+
+    def vote(self, game, player, rng):
+        candidates = self.candidates(game, player)
+        leading = [target for target in candidates if game.get_vote_count(target) > 0]
+        if leading and rng.random() < 0.7:
+            return max(leading, key=game.get_vote_count)
+        return super().vote(game, player, rng)
+
+class MafiaAgent(RandomAgent):
+    """Never votes for a fellow mafia member"""
+    name = "mafia"
+
+    def candidates(self, game, player):
+        return [p.id for p in game.get_alive_players() if p.id != player.id and p.id not in game.mafia_ids]
+
+class ScriptedAgent(RandomAgent):
+    """Plays back a fixed list of vote targets (None = unvote), then votes randomly"""
+    name = "scripted"
+
+    def __init__(self, script):
+        super().__init__()
+        self.script = list(script)
+
+    def vote(self, game, player, rng):
+        if self.script:
+            return self.script.pop(0)
+        return super().vote(game, player, rng)
+
+AGENT_MIXES = {
+    "random": lambda role: RandomAgent(),
+    "bandwagon": lambda role: BandwagonAgent(),
+    "mixed": lambda role: MafiaAgent() if role == "Mafia" else BandwagonAgent(),
+}
+
+class Simulation:
+    """One complete game from signup to a win (or a draw after max_days)"""
+
+    def __init__(self, seed, players=13, mafia=None, neutrals=0, density="LIGHT", agents="mixed",
+                 max_days=50, actions_per_day=None, check_every_action=True, roundtrip=True, log=False):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.player_count = players
+        self.mafia = mafia if mafia is not None else max(1, players // 4)
+        self.neutrals = neutrals
+        self.density = density
+        self.agent_for = AGENT_MIXES[agents] if isinstance(agents, str) else agents
+        self.max_days = max_days
+        self.actions_per_day = actions_per_day
+        self.check_every_action = check_every_action
+        self.roundtrip = roundtrip
+        self.codec = default_codec()
+        self.events = [] if log else None
+
+        self.votes = 0
+        self.unvotes = 0
+        self.rejected = 0
+        self.hammers = 0
+        self.no_lynch_days = 0
+        self.night_kills = 0
+
+    def note(self, message):
+        if self.events is not None:
+            self.events.append(message)
+
+    def setup(self):
+        game = GameState(
+            channel_id=self.seed,
+            guild_id=0,
+            host_id=0,
+            config=GameConfig(min_players=self.player_count, max_players=self.player_count, role_density=self.density),
+            players=[],
+            phase=Phase(name="SIGNUP", number=0, ends_at=0),
+        )
+        for player_id in range(1, self.player_count + 1):
+            game.add_player(player_id)
+        game.mafia_count = self.mafia
+        game.neutral_count = self.neutrals
+        pick_roles(game, self.rng)
+        self.agents = {player.id: self.agent_for(player.role) for player in game.players}
+        self.check_roles(game)
+        return game
+
+    def run(self):
+        game = self.setup()
+        day = 1
+        winner = None
+        while winner is None:
+            game.phase = Phase(name="DAY", number=day, ends_at=0)
+            game.clear_votes()
+            self.check_phase(game)
+            self.play_day(game)
+            winner = self.winner(game)
+            if winner:
+                break
+
+            game.phase = Phase(name="NIGHT", number=day, ends_at=0)
+            self.check_phase(game)
+            self.play_night(game)
+            winner = self.winner(game)
+            day += 1
+            if winner is None and day > self.max_days:
+                winner = "draw"
+
+        game.phase = Phase(name="ENDED", number=day, ends_at=0)
+        self.check_phase(game)
+        self.note(f"{winner} wins on day {day}")
+        return {
+            "seed": self.seed,
+            "winner": winner,
+            "days": day,
+            "votes": self.votes,
+            "unvotes": self.unvotes,
+            "rejected": self.rejected,
+            "hammers": self.hammers,
+            "no_lynch_days": self.no_lynch_days,
+            "night_kills": self.night_kills,
+        }
+
+    def play_day(self, game):
+        budget = self.actions_per_day or game.alive_count * 3
+        for _ in range(budget):
+            voter = self.rng.choice(game.get_alive_players())
+            target_id = self.agents[voter.id].vote(game, voter, self.rng)
+            hammered = self.apply_vote(game, voter.id, target_id)
+            if self.check_every_action:
+                self.check_votes(game)
+            if hammered is not None:
+                return hammered
+        self.no_lynch_days += 1
+        self.note(f"Day {game.phase.number}: no lynch")
+        return None
+
+    def apply_vote(self, game, voter_id, target_id):
+        """Apply a vote (or an unvote when target_id is None) under VoteCog's rules;
+        returns the hammered player's ID when the vote reaches majority"""
+        if target_id is None:
+            if game.unvote_error(voter_id):
+                self.rejected += 1
+                return None
+            game.remove_vote(voter_id)
+            self.unvotes += 1
+            return None
+
+        if game.vote_error(voter_id, target_id):
+            self.rejected += 1
+            return None
+
+        game.cast_vote(voter_id, target_id)
+        self.votes += 1
+        if game.is_hammer(target_id):
+            self.hammers += 1
+            target = game.get_player(target_id)
+            game.start_twilight(0)
+            self.check_phase(game)
+            # The host records the flip; in the simulator the hammered player always dies
+            game.kill_player(target)
+            self.note(f"Day {game.phase.number}: {target_id} ({target.role}) hammered")
+            return target_id
+        return None
+
+    def play_night(self, game):
+        mafia = [p for p in game.get_alive_players() if p.id in game.mafia_ids]
+        if not mafia:
+            return
+        target_id = self.agents[mafia[0].id].night_kill(game, self.rng)
+        if target_id is None:
+            return
+        target = game.get_player(target_id)
+        if target.status != "alive" or target_id in game.mafia_ids:
+            raise InvariantError(f"night kill chose invalid target {target_id}")
+        game.kill_player(target)
+        self.night_kills += 1
+        self.note(f"Night {game.phase.number}: {target_id} ({target.role}) killed")
+
+    @staticmethod
+    def winner(game):
+        alive = game.get_alive_players()
+        mafia = sum(1 for p in alive if p.id in game.mafia_ids)
+        if mafia == 0:
+            return "town"
+        if mafia >= len(alive) - mafia:
+            return "mafia"
+        return None
+
+    def check_roles(self, game):
+        ids = [p.id for p in game.players]
+        teams = game.mafia_ids + game.neutral_ids + game.town_ids
+        if sorted(teams) != sorted(ids):
+            raise InvariantError(f"team lists {teams} do not partition players {ids}")
+        if len(game.mafia_ids) != game.mafia_count or len(game.neutral_ids) != game.neutral_count:
+            raise InvariantError("team sizes do not match the configured counts")
+        if any(p.role is None for p in game.players):
+            raise InvariantError("a player has no role")
+        if any(game.get_player(i).role != "Mafia" for i in game.mafia_ids):
+            raise InvariantError("a mafia member does not have the Mafia role")
+
+    def check_votes(self, game):
+        problems = game.check_tally_consistency()
+        if problems:
+            raise InvariantError("; ".join(problems))
+        if game.phase.name == "DAY":
+            # Votes freeze at the hammer, so these only hold while the day is running
+            for voter_id, target_id in game.votes.items():
+                if game.get_player(voter_id).status != "alive":
+                    raise InvariantError(f"dead player {voter_id} has a vote")
+                if game.get_player(target_id).status != "alive":
+                    raise InvariantError(f"vote on dead player {target_id}")
+            threshold = game.get_majority_threshold()
+            over = [target for target, count in game.vote_counts.items() if count >= threshold]
+            if over:
+                raise InvariantError(f"{over} reached majority without a hammer")
+
+    def check_phase(self, game):
+        if self.check_every_action:
+            problems = game.check_tally_consistency()
+            if problems:
+                raise InvariantError("; ".join(problems))
+        if self.roundtrip:
+            copy = GameState.from_dict(self.codec.decode(self.codec.encode(game.to_dict())))
+            if copy != game or copy.vote_counts != game.vote_counts or copy.alive_count != game.alive_count:
+                raise InvariantError(f"codec round-trip changed the game in phase {game.phase.name}")
+
+def run_batch(seeds, options):
+    """Play one game per seed; returns totals plus the first few invariant failures"""
+    winners = Counter()
+    totals = Counter()
+    failures = []
+    started = time.perf_counter()
+    for seed in seeds:
+        try:
+            result = Simulation(seed, **options).run()
+        except InvariantError as e:
+            winners["failed"] += 1
+            if len(failures) < 10:
+                failures.append((seed, str(e)))
+            continue
+        winners[result["winner"]] += 1
+        for key in ("days", "votes", "unvotes", "rejected", "hammers", "no_lynch_days", "night_kills"):
+            totals[key] += result[key]
+    return winners, totals, failures, time.perf_counter() - started
+
+def run_parallel(games, options, seed=1, workers=None, chunk=250):
+    workers = workers or os.cpu_count() or 1
+    chunks = [range(start, min(start + chunk, seed + games)) for start in range(seed, seed + games, chunk)]
+    winners, totals, failures = Counter(), Counter(), []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch_winners, batch_totals, batch_failures, _ in pool.map(run_batch, chunks, [options] * len(chunks)):
+            winners += batch_winners
+            totals += batch_totals
+            failures.extend(batch_failures)
+    return winners, totals, failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--players', type=int, default=13)
+    parser.add_argument('--mafia', type=int, help="mafia per game (default players // 4)")
+    parser.add_argument('--neutrals', type=int, default=0)
+    parser.add_argument('--density', choices=["VANILLA", "LIGHT", "HEAVY"], default="LIGHT")
+    parser.add_argument('--agents', choices=list(AGENT_MIXES), default="mixed")
+    parser.add_argument('--workers', type=int, help="processes (default: all cores)")
+    parser.add_argument('--seed', type=int, default=1, help="seed of the first game; game i uses seed + i")
+    parser.add_argument('--no-roundtrip', action='store_true', help="skip the codec check at phase changes")
+    parser.add_argument('--replay', type=int, help="play the game with this seed and print what happened")
+    args = parser.parse_args()
+
+    options = {
+        "players": args.players,
+        "mafia": args.mafia,
+        "neutrals": args.neutrals,
+        "density": args.density,
+        "agents": args.agents,
+        "roundtrip": not args.no_roundtrip,
+    }
+
+    if args.replay is not None:
+        simulation = Simulation(args.replay, log=True, **options)
+        try:
+            result = simulation.run()
+        finally:
+            print("\n".join(simulation.events))
+        print(result)
+        return
+
+    started = time.perf_counter()
+    winners, totals, failures = run_parallel(args.games, options, args.seed, args.workers)
+    elapsed = time.perf_counter() - started
+
+    played = sum(winners.values())
+    print(f"{played} games in {elapsed:.2f}s ({played / elapsed:,.0f} games/s, "
+          f"{(totals['votes'] + totals['unvotes']) / elapsed:,.0f} votes/s)")
+    for winner, count in winners.most_common():
+        print(f"  {winner:<8}{count:>8}  {count / played:6.1%}")
+    completed = played - winners["failed"]
+    if completed:
+        print(f"  avg days {totals['days'] / completed:.2f}, hammers {totals['hammers'] / completed:.2f}, "
+              f"no-lynch days {totals['no_lynch_days'] / completed:.2f}, night kills {totals['night_kills'] / completed:.2f}")
+    for seed, error in failures[:10]:
+        print(f"  invariant failure in seed {seed}: {error} (rerun with --replay {seed})")
+    if failures:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
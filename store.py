@@ -1,121 +1,673 @@
 import aiosqlite
-import json
+import asyncio
+import zlib
 from models import GameState
+from codec import default_codec
+from db import WriteBatcher, apply_connection_profile, wait_for_commits
+from scheduler import SCHEDULED_PHASES, PhaseScheduler
+from logs import trace
+from metrics import REGISTRY, timed
 from typing import Optional, List
+import logging
 import time
 
+log = logging.getLogger(__name__)
+
+# Phases after which a game no longer changes; save_game archives it out of the live tables
+FINISHED_PHASES = ("ENDED", "CANCELLED")
+_FINISHED_LIST = ", ".join(f"'{phase}'" for phase in FINISHED_PHASES)
+
+# Number of vote events appended for a game before its full document is rewritten
+VOTE_COMPACT_EVERY = 50
+
+class ConcurrentModificationError(Exception):
+    """A save or vote lost a compare-and-swap against a newer write of the same game"""
+
+# Columns mirrored out of game_data so they can be queried through an index
+INDEXED_COLUMNS = (
+    ("phase_name", "TEXT"),
+    ("ends_at", "INTEGER"),
+    ("guild_id", "INTEGER"),
+    ("host_id", "INTEGER"),
+    ("signup_message_id", "INTEGER"),
+    ("phase_fired", "INTEGER"),  # 1 once the current phase's deadline has been processed
+)
+_INDEXED_SET = ", ".join(f"{column} = ?" for column, _ in INDEXED_COLUMNS)
+
+# Writes of a game row: a new game may only replace a finished one, an
+# existing game is a compare-and-swap on the row version
+_INSERT_GAME = (
+    f'INSERT INTO games (channel_id, game_data, {", ".join(column for column, _ in INDEXED_COLUMNS)}, version) '
+    f'VALUES (?, ?, {", ".join("?" for _ in INDEXED_COLUMNS)}, 1) '
+    f'ON CONFLICT (channel_id) DO UPDATE SET game_data = excluded.game_data, '
+    f'{", ".join(f"{column} = excluded.{column}" for column, _ in INDEXED_COLUMNS)}, version = 1 '
+    f'WHERE games.phase_name IN ({_FINISHED_LIST})'
+)
+_UPDATE_GAME = f'UPDATE games SET game_data = ?, {_INDEXED_SET}, version = ? WHERE channel_id = ? AND version = ?'
+
 class GameStore:
-    def __init__(self, db):
+    def __init__(self, db, codec=None, commit_window: float = 0.025):
         self.db = db
+        
+        # All writes go through the batcher so bursts share one transaction.
+        # Reads use the ReaderPool when the bot attaches one, else the writer connection.
+        self.writer = WriteBatcher(db, commit_window)
+        self.readers = None
+        
+        # Encodes game documents for the game_data column; every codec can read
+        # rows written by the others, including legacy JSON text
+        self.codec = codec or default_codec()
+        
+        # Live GameState objects keyed by channel_id. Active games stay cached for
+        # as long as the bot runs; a game leaves the cache when it is archived
+        # (see archive_game), so finished games are never kept here.
+        self._cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # channel_id -> in-flight cache-miss load
+        self._loading = {}
+        # channel_id -> removals (archive or delete) of the channel's row started
+        # so far, and those not yet committed; a load that overlaps one doesn't
+        # cache what it read
+        self._removals = {}
+        self._removing = {}
+        
+        # channel_id -> vote_seq stored in the last persisted game_data
+        self._snapshot_seq = {}
+        # channel_id -> last vote event seq written by this process
+        self._vote_heads = {}
+        
+        # Writes rejected by the version check, by kind
+        self.conflicts = {"save": 0, "vote": 0, "archive": 0, "delete": 0}
+        
+        # Set by the bot; re-armed on every save so phase deadlines are always current
+        self.scheduler = None
     
     async def init_db(self):
+        self.connection_profile = await apply_connection_profile(self.db)
+        
         await self.db.execute('''
             CREATE TABLE IF NOT EXISTS games (
                 channel_id INTEGER PRIMARY KEY,
-                game_data TEXT NOT NULL
+                game_data TEXT NOT NULL,
+                phase_name TEXT,
+                ends_at INTEGER,
+                guild_id INTEGER,
+                host_id INTEGER,
+                signup_message_id INTEGER,
+                version INTEGER NOT NULL DEFAULT 1
             )
         ''')
+        await self.migrate_game_columns()
+        
+        # Indexed copies of fields inside game_data, kept in sync by save_game
+        await self.db.execute('CREATE INDEX IF NOT EXISTS idx_games_phase_ends ON games (phase_name, ends_at)')
+        await self.db.execute('CREATE INDEX IF NOT EXISTS idx_games_guild_phase ON games (guild_id, phase_name)')
+        await self.db.execute('CREATE INDEX IF NOT EXISTS idx_games_host ON games (host_id)')
+        await self.db.execute('CREATE INDEX IF NOT EXISTS idx_games_pending ON games (phase_fired, phase_name, ends_at)')
+        
+        # Append-only vote log; target_id NULL records an unvote
+        await self.db.execute('''
+            CREATE TABLE IF NOT EXISTS vote_events (
+                channel_id INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                day_number INTEGER NOT NULL,
+                voter_id INTEGER NOT NULL,
+                target_id INTEGER,
+                created_at INTEGER NOT NULL,
+                PRIMARY KEY (channel_id, seq)
+            )
+        ''')
+        
+        # Finished games, moved out of games by archive_game. A channel can host
+        # many games over time; config.signup_ends_at tells them apart.
+        await self.db.execute('''
+            CREATE TABLE IF NOT EXISTS games_archive (
+                archive_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel_id INTEGER NOT NULL,
+                signup_ends_at INTEGER NOT NULL,
+                guild_id INTEGER,
+                host_id INTEGER,
+                phase_name TEXT NOT NULL,
+                phase_number INTEGER NOT NULL,
+                player_count INTEGER NOT NULL,
+                archived_at INTEGER NOT NULL,
+                game_data BLOB NOT NULL,
+                UNIQUE (channel_id, signup_ends_at)
+            )
+        ''')
+        await self.db.execute('CREATE INDEX IF NOT EXISTS idx_archive_guild ON games_archive (guild_id, archived_at)')
+        await self.db.execute('CREATE INDEX IF NOT EXISTS idx_archive_host ON games_archive (host_id, archived_at)')
+        
+        # Small process-wide values, e.g. when the bot was last known to be running
+        await self.db.execute('CREATE TABLE IF NOT EXISTS bot_state (key TEXT PRIMARY KEY, value INTEGER)')
         await self.db.commit()
     
+    async def migrate_game_columns(self):
+        """Add the indexed columns to databases created before they existed and backfill them"""
+        async with self.db.execute('PRAGMA table_info(games)') as cursor:
+            existing = {row[1] for row in await cursor.fetchall()}
+        
+        added = [column for column, _ in INDEXED_COLUMNS if column not in existing]
+        for column, column_type in INDEXED_COLUMNS:
+            if column in added:
+                await self.db.execute(f'ALTER TABLE games ADD COLUMN {column} {column_type}')
+        if 'version' not in existing:
+            # Rows saved before versioning start at 1; version 0 means a game was never saved
+            await self.db.execute('ALTER TABLE games ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+        
+        # A new column needs every row filled in, otherwise only rows saved without the columns
+        where = '' if added else ' WHERE phase_name IS NULL'
+        async with self.db.execute(f'SELECT channel_id, game_data FROM games{where}') as cursor:
+            rows = await cursor.fetchall()
+        for channel_id, game_data in rows:
+            game = GameState.from_dict(self.codec.decode(game_data))
+            await self.db.execute(
+                f'UPDATE games SET {_INDEXED_SET} WHERE channel_id = ?',
+                self._indexed_values(game) + (channel_id,)
+            )
+        if rows:
+            log.info("Backfilled indexed columns for %d game(s)", len(rows))
+    
+    @staticmethod
+    def _indexed_values(game):
+        return (game.phase.name, game.phase.ends_at, game.guild_id, game.host_id,
+                game.messages.get('signup_message_id'),
+                int(game.fired_phase == PhaseScheduler.phase_key(game)))
+    
+    def _cache_put(self, game):
+        self._cache[game.channel_id] = game
+    
+    def _cache_drop(self, channel_id):
+        self._cache.pop(channel_id, None)
+    
+    def cache_stats(self):
+        """Return cache counters for monitoring"""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "cached_games": len(self._cache),
+        }
+    
+    @timed("mafia_store")
     async def get_game(self, channel_id):
-        """Get game with debug output"""
-        async with self.db.execute('SELECT game_data FROM games WHERE channel_id = ?', (channel_id,)) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                game_data = json.loads(row[0])
-                print(f"STORE DEBUG: Raw loaded data - debug_mode = {game_data.get('debug_mode', 'MISSING')}")
-                
-                game = GameState.from_dict(game_data)
-                print(f"STORE DEBUG: Loaded game for channel {channel_id}")
-                print(f"STORE DEBUG: debug_mode = {getattr(game, 'debug_mode', 'NOT SET')}")
-                return game
-        print(f"STORE DEBUG: No game found for channel {channel_id}")
-        return None
+        """Get game from the cache, falling back to the database"""
+        game = self._cache.get(channel_id)
+        if game is not None:
+            self.cache_hits += 1
+            return game
         
+        # Concurrent misses for one channel share a single load so only one
+        # live object is ever created for it
+        loading = self._loading.get(channel_id)
+        if loading is None:
+            self.cache_misses += 1
+            loading = self._loading[channel_id] = asyncio.ensure_future(self._load_game(channel_id))
+            loading.add_done_callback(lambda _: self._loading.pop(channel_id, None))
+        else:
+            self.cache_hits += 1
+        return await asyncio.shield(loading)
+    
+    async def _load_game(self, channel_id):
+        removals = self._removals.get(channel_id)
+        rows = await self._read('SELECT game_data, version FROM games WHERE channel_id = ?', (channel_id,))
+        if channel_id in self._removing or self._removals.get(channel_id) != removals:
+            # The row may have been read just before its DELETE committed
+            return self._cache.get(channel_id)
+        if rows:
+            game_data = self.codec.decode(rows[0][0])
+            game = GameState.from_dict(game_data)
+            game.version = rows[0][1]
+            await self._fold_vote_events(game)
+            trace(game, "Loaded game for channel %s (%d bytes, vote_seq %d)", channel_id, len(rows[0][0]), game.vote_seq)
+            
+            # A save during the load already put the authoritative object in the cache
+            cached = self._cache.get(channel_id)
+            if cached is not None:
+                return cached
+            self._cache_put(game)
+            return game
+        return self._cache.get(channel_id)
+        
+    @timed("mafia_store")
     async def save_game(self, game):
-        """Save game with debug output"""
-        print(f"STORE DEBUG: Saving game for channel {game.channel_id}")
-        print(f"STORE DEBUG: debug_mode = {getattr(game, 'debug_mode', 'NOT SET')}")
+        """Write game through the cache to the database.
+        
+        The write is a compare-and-swap on the row version: it raises
+        ConcurrentModificationError if another writer (e.g. another bot
+        process) saved the game since this copy was loaded, or started a
+        different game in the channel. See update_game for a retrying helper.
+        """
+        trace(game, "Saving game for channel %s in phase %s %s", game.channel_id, game.phase.name, game.phase.number)
+        
+        # Finished games leave the live tables as soon as they finish
+        if game.phase.name in FINISHED_PHASES:
+            await self.archive_game(game)
+            return
+        
+        # A new game replacing an old one in the same channel starts after that
+        # game's vote events so they are never folded into it
+        if game.vote_seq == 0 and self._cache.get(game.channel_id) is not game:
+            rows = await self._read(
+                'SELECT COALESCE(MAX(seq), 0) FROM vote_events WHERE channel_id = ?', (game.channel_id,)
+            )
+            game.vote_seq = max(rows[0][0], self._vote_heads.get(game.channel_id, 0))
+        
+        game_data = self.codec.encode(game.to_dict())
+        self._cache_put(game)
+        
+        # Saves of the same game within one commit window collapse into the last
+        # one, which checks the version the first of them started from
+        key = ('game', game.channel_id)
+        if self.writer.pending(key):
+            expected = game.version - 1
+        else:
+            expected = game.version
+            game.version += 1
+        
+        if expected == 0:
+            sql = _INSERT_GAME
+            params = (game.channel_id, game_data) + self._indexed_values(game)
+        else:
+            sql = _UPDATE_GAME
+            params = (game_data,) + self._indexed_values(game) + (expected + 1, game.channel_id, expected)
+        await self.writer.execute(sql, params, key=key, conflict=lambda: self._conflict(game, "save"))
+        self._snapshot_seq[game.channel_id] = game.vote_seq
+        if self.scheduler:
+            self.scheduler.arm(game)
+        trace(game, "Saved game for channel %s (%d bytes)", game.channel_id, len(game_data))
+    
+    @timed("mafia_store")
+    async def record_vote(self, game, voter_id: int, target_id: Optional[int]):
+        """Apply a vote (or an unvote when target_id is None) and append it to the vote log.
+        
+        Only a small vote_events row is written; the full game document is
+        rewritten once VOTE_COMPACT_EVERY events have accumulated.
+        """
+        if target_id is None:
+            game.remove_vote(voter_id)
+        else:
+            game.cast_vote(voter_id, target_id)
+        game.vote_seq += 1
+        self._vote_heads[game.channel_id] = game.vote_seq
+        self._cache_put(game)
+        
+        # Another process appending to the same game's log takes the seq first
+        await self.writer.execute(
+            'INSERT OR IGNORE INTO vote_events (channel_id, seq, day_number, voter_id, target_id, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (game.channel_id, game.vote_seq, game.phase.number, voter_id, target_id, int(time.time())),
+            conflict=lambda: self._conflict(game, "vote")
+        )
+        
+        if game.vote_seq - self._snapshot_seq.get(game.channel_id, 0) >= VOTE_COMPACT_EVERY:
+            await self.save_game(game)
+    
+    def _conflict(self, game, kind):
+        """Count a lost compare-and-swap and drop the stale copy so the next read reloads it"""
+        self.conflicts[kind] += 1
+        REGISTRY.inc("mafia_store_conflicts_total", kind=kind)
+        log.warning("%s conflict for game in channel %s (local version %d)", kind.capitalize(), game.channel_id, game.version)
+        if self._cache.get(game.channel_id) is game:
+            self._cache_drop(game.channel_id)
+            self._snapshot_seq.pop(game.channel_id, None)
+            self._vote_heads.pop(game.channel_id, None)
+        return ConcurrentModificationError(
+            f"Game in channel {game.channel_id} was changed by another writer"
+        )
+    
+    @timed("mafia_store")
+    async def update_game(self, channel_id: int, mutate, attempts: int = 3):
+        """Load a game, apply `await mutate(game)` and save it, retrying on conflicts.
+        
+        mutate runs again on a freshly loaded copy after each conflict, so it
+        must only change the game it is given. Returns mutate's result, or
+        None without saving if there is no game or mutate returns False.
+        """
+        for attempt in range(1, attempts + 1):
+            game = await self.get_game(channel_id)
+            if game is None:
+                return None
+            result = await mutate(game)
+            if result is False:
+                return result
+            try:
+                # Inside a GameActor the save would otherwise return before its commit
+                with wait_for_commits():
+                    await self.save_game(game)
+                return result
+            except ConcurrentModificationError:
+                if attempt == attempts:
+                    raise
+                log.info("Retrying update of game in channel %s (attempt %d)", channel_id, attempt + 1)
+    
+    async def _fold_vote_events(self, game):
+        """Replay vote events newer than the stored document onto a freshly loaded game"""
+        self._snapshot_seq[game.channel_id] = game.vote_seq
+        rows = await self._read(
+            'SELECT seq, voter_id, target_id FROM vote_events WHERE channel_id = ? AND seq > ? ORDER BY seq',
+            (game.channel_id, game.vote_seq)
+        )
+        
+        for seq, voter_id, target_id in rows:
+            if target_id is None:
+                game.remove_vote(voter_id)
+            else:
+                game.cast_vote(voter_id, target_id)
+            game.vote_seq = seq
+    
+    @timed("mafia_store")
+    async def get_vote_history(self, channel_id: int, day_number: Optional[int] = None):
+        """Every vote event for a game, oldest first, optionally limited to one day"""
+        sql = 'SELECT seq, day_number, voter_id, target_id, created_at FROM vote_events WHERE channel_id = ?'
+        params = (channel_id,)
+        if day_number is not None:
+            sql += ' AND day_number = ?'
+            params += (day_number,)
+        return [
+            {"seq": seq, "day": day, "voter_id": voter_id, "target_id": target_id, "created_at": created_at}
+            for seq, day, voter_id, target_id, created_at in await self._read(sql + ' ORDER BY seq', params)
+        ]
+    
+    async def _remove_channel(self, channel_id: int, statements):
+        """Run the statements deleting a channel's game and drop its cached state once they commit.
+        
+        Until then the cache keeps serving the game being removed, so reads
+        never fall through to the row that is about to be deleted. A game
+        saved in the channel meanwhile stays cached.
+        """
+        cached = self._cache.get(channel_id)
+        # Saves made from now on must not be folded into a pending write ahead of the DELETE
+        self.writer.forget(('game', channel_id))
+        if self.scheduler:
+            self.scheduler.disarm(channel_id)
+        
+        self._removals[channel_id] = self._removals.get(channel_id, 0) + 1
+        self._removing[channel_id] = self._removing.get(channel_id, 0) + 1
+        try:
+            # Inside a GameActor the next operation must not run before the row is gone
+            with wait_for_commits():
+                await self.writer.execute_all(statements)
+        finally:
+            self._removing[channel_id] -= 1
+            if not self._removing[channel_id]:
+                del self._removing[channel_id]
+        
+        if self._cache.get(channel_id) is cached:
+            self._cache_drop(channel_id)
+            self._snapshot_seq.pop(channel_id, None)
+            self._vote_heads.pop(channel_id, None)
+    
+    @timed("mafia_store")
+    async def delete_game(self, game):
+        """Delete a game and its vote log without archiving it.
+        
+        Like save_game this is a compare-and-swap on the row version: it
+        raises ConcurrentModificationError if the game was saved elsewhere
+        since this copy was loaded.
+        """
+        await self.writer.flush()
+        await self._remove_channel(game.channel_id, self._delete_statements(game, "delete"))
+    
+    def _delete_statements(self, game, kind):
+        """Statements deleting this copy's live row, checked against its version, then the channel's vote log"""
+        statements = []
+        if game.version:
+            statements.append((
+                'DELETE FROM games WHERE channel_id = ? AND version = ?', (game.channel_id, game.version),
+                lambda: self._conflict(game, kind)
+            ))
+        # The log goes with the row; if a newer game holds the channel, both stay
+        statements.append((
+            'DELETE FROM vote_events WHERE channel_id = ? AND NOT EXISTS (SELECT 1 FROM games WHERE channel_id = ?)',
+            (game.channel_id, game.channel_id)
+        ))
+        return statements
+    
+    @timed("mafia_store")
+    async def archive_game(self, game):
+        """Move a finished game and its vote log from the live tables into games_archive.
         
-        # Convert to dict and check what's being serialized
+        The first archive of a game wins; saving it again afterwards (e.g. a
+        second cancel) leaves the archived copy and its vote history alone.
+        The live row is only deleted if it is still the version this copy was
+        loaded as (see save_game); otherwise nothing is archived and
+        ConcurrentModificationError is raised.
+        """
+        # Pending vote events must be committed before the log is read
+        await self.writer.flush()
         game_dict = game.to_dict()
-        print(f"STORE DEBUG: Serialized debug_mode = {game_dict.get('debug_mode', 'MISSING')}")
+        game_dict['vote_history'] = await self.get_vote_history(game.channel_id)
+        encoded = self.codec.encode(game_dict)
+        if isinstance(encoded, str):
+            # JSONCodec writes text
+            encoded = encoded.encode('utf-8')
+        archive_data = zlib.compress(encoded)
         
-        game_data = json.dumps(game_dict)
-        await self.db.execute(
-            'INSERT OR REPLACE INTO games (channel_id, game_data) VALUES (?, ?)',
-            (game.channel_id, game_data)
+        # Only archived together with deleting the row it was loaded from
+        archive = (
+            'INSERT OR IGNORE INTO games_archive (channel_id, signup_ends_at, guild_id, host_id, phase_name, '
+            'phase_number, player_count, archived_at, game_data) SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?'
         )
-        await self.db.commit()
-        print("STORE DEBUG: Game saved successfully")
+        params = (game.channel_id, game.config.signup_ends_at, game.guild_id, game.host_id, game.phase.name,
+                  game.phase.number, len(game.players), int(time.time()), archive_data)
+        if game.version:
+            archive += ' WHERE EXISTS (SELECT 1 FROM games WHERE channel_id = ? AND version = ?)'
+            params += (game.channel_id, game.version)
+        
+        await self._remove_channel(game.channel_id, [(archive, params)] + self._delete_statements(game, "archive"))
+        # This copy no longer has a live row; archiving it again only finds the archived copy
+        game.version = 0
     
-    async def delete_game(self, channel_id: int):
-        await self.db.execute('DELETE FROM games WHERE channel_id = ?', (channel_id,))
-        await self.db.commit()
+    @timed("mafia_store")
+    async def sweep_finished_games(self) -> int:
+        """Archive any finished games still in the live table (e.g. from before archiving existed)"""
+        placeholders = ', '.join('?' * len(FINISHED_PHASES))
+        games = await self._query_games(
+            f'SELECT channel_id, game_data, version FROM games WHERE phase_name IN ({placeholders})', FINISHED_PHASES
+        )
+        for game in games:
+            await self.archive_game(game)
+        return len(games)
+    
+    @timed("mafia_store")
+    async def get_archived_games(self, guild_id: Optional[int] = None, host_id: Optional[int] = None,
+                                 limit: int = 25):
+        """Summaries of archived games, newest first, filtered by guild and/or host"""
+        conditions, params = [], []
+        if guild_id is not None:
+            conditions.append('guild_id = ?')
+            params.append(guild_id)
+        if host_id is not None:
+            conditions.append('host_id = ?')
+            params.append(host_id)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+        rows = await self._read(
+            'SELECT archive_id, channel_id, guild_id, host_id, phase_name, phase_number, player_count, archived_at '
+            f'FROM games_archive {where}ORDER BY archived_at DESC LIMIT ?',
+            tuple(params) + (limit,)
+        )
+        columns = ("archive_id", "channel_id", "guild_id", "host_id", "phase_name", "phase_number",
+                   "player_count", "archived_at")
+        return [dict(zip(columns, row)) for row in rows]
     
+    @timed("mafia_store")
+    async def get_archived_game(self, archive_id: int):
+        """Load an archived game; returns (GameState, vote history) or None"""
+        rows = await self._read('SELECT game_data FROM games_archive WHERE archive_id = ?', (archive_id,))
+        if not rows:
+            return None
+        game_dict = self.codec.decode(zlib.decompress(rows[0][0]))
+        return GameState.from_dict(game_dict), game_dict.get('vote_history', [])
+    
+    @timed("mafia_store")
+    async def flush(self):
+        """Commit any batched writes immediately (e.g. before shutdown)"""
+        await self.writer.flush()
+    
+    def write_stats(self):
+        stats = self.writer.stats()
+        stats.update({f"{kind}_conflicts": count for kind, count in self.conflicts.items()})
+        return stats
+    
+    @timed("mafia_store")
     async def get_all_games(self) -> List[GameState]:
-        async with self.db.execute('SELECT game_data FROM games') as cursor:
-            rows = await cursor.fetchall()
-            return [GameState.from_dict(json.loads(row[0])) for row in rows]
+        return await self._query_games('SELECT channel_id, game_data, version FROM games')
+    
+    @timed("mafia_store")
+    async def get_games_due(self, before: int) -> List[GameState]:
+        """Games in a scheduled phase whose deadline is at or before the given time and not yet processed"""
+        placeholders = ', '.join('?' * len(SCHEDULED_PHASES))
+        return await self._query_games(
+            f'SELECT channel_id, game_data, version FROM games '
+            f'WHERE phase_fired = 0 AND phase_name IN ({placeholders}) AND ends_at <= ? ORDER BY ends_at',
+            SCHEDULED_PHASES + (before,)
+        )
+    
+    @timed("mafia_store")
+    async def get_active_games_in_guild(self, guild_id: int) -> List[GameState]:
+        placeholders = ', '.join('?' * len(FINISHED_PHASES))
+        return await self._query_games(
+            f'SELECT channel_id, game_data, version FROM games '
+            f'WHERE guild_id = ? AND phase_name NOT IN ({placeholders})',
+            (guild_id,) + FINISHED_PHASES
+        )
+    
+    @timed("mafia_store")
+    async def get_games_by_host(self, host_id: int) -> List[GameState]:
+        return await self._query_games('SELECT channel_id, game_data, version FROM games WHERE host_id = ?', (host_id,))
+    
+    @timed("mafia_store")
+    async def get_scheduled_deadlines(self, after: int = 0):
+        """(channel_id, ends_at) for every game in a scheduled phase ending after `after`, without loading game_data"""
+        placeholders = ', '.join('?' * len(SCHEDULED_PHASES))
+        return await self._read(
+            f'SELECT channel_id, ends_at FROM games WHERE phase_name IN ({placeholders}) AND ends_at > ?',
+            SCHEDULED_PHASES + (after,)
+        )
+    
+    @timed("mafia_store")
+    async def get_signup_messages(self):
+        """(channel_id, signup_message_id) for every game in signup, without loading game_data"""
+        return await self._read(
+            "SELECT channel_id, signup_message_id FROM games "
+            "WHERE phase_name = 'SIGNUP' AND signup_message_id IS NOT NULL"
+        )
+    
+    @timed("mafia_store")
+    async def get_last_alive(self) -> Optional[int]:
+        """When the bot last recorded that it was running (see record_alive), or None"""
+        rows = await self._read("SELECT value FROM bot_state WHERE key = 'last_alive'")
+        return rows[0][0] if rows else None
     
+    async def record_alive(self, at: int):
+        """Note that the bot is running at `at`; the scheduler calls this periodically"""
+        await self.writer.execute(
+            "INSERT INTO bot_state (key, value) VALUES ('last_alive', ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (at,), key=('bot_state', 'last_alive')
+        )
+    
+    @timed("mafia_store")
+    async def get_overdue_deadlines(self, before: int):
+        """(channel_id, ends_at) for unprocessed games in a scheduled phase whose deadline is at or before `before`, oldest first"""
+        placeholders = ', '.join('?' * len(SCHEDULED_PHASES))
+        return await self._read(
+            f'SELECT channel_id, ends_at FROM games '
+            f'WHERE phase_fired = 0 AND phase_name IN ({placeholders}) AND ends_at > 0 AND ends_at <= ? '
+            f'ORDER BY ends_at',
+            SCHEDULED_PHASES + (before,)
+        )
+    
+    async def _read(self, sql, params=()):
+        """Run a SELECT on a pooled reader connection (or the writer when there is no pool)"""
+        started = time.perf_counter()
+        try:
+            if self.readers is None:
+                async with self.db.execute(sql, params) as cursor:
+                    return await cursor.fetchall()
+            async with self.readers.acquire() as connection:
+                async with connection.execute(sql, params) as cursor:
+                    return await cursor.fetchall()
+        finally:
+            REGISTRY.observe("mafia_sqlite_seconds", time.perf_counter() - started, op="read")
+    
+    async def _query_games(self, sql, params=()) -> List[GameState]:
+        rows = await self._read(sql, params)
+        
+        # Prefer live cached objects so callers never mutate a stale copy
+        games = []
+        for channel_id, game_data, version in rows:
+            game = self._cache.get(channel_id)
+            if game is None:
+                game = GameState.from_dict(self.codec.decode(game_data))
+                game.version = version
+                await self._fold_vote_events(game)
+            games.append(game)
+        return games
+    
+    @timed("mafia_store")
     async def process_phase_transitions(self, bot):
-        games = await self.get_all_games()
-        current_time = int(time.time())
+        """Process every overdue game in one sweep (the scheduler normally does this per deadline).
         
-        for game in games:
-            if game.phase.ends_at <= current_time:
-                if game.phase.name == "SIGNUP":
-                    # Process signup ending
-                    await self.process_signup_end(bot, game)
-                elif game.phase.name == "DAY":
-                    # Process day ending
-                    await self.process_day_end(bot, game)
-                elif game.phase.name == "NIGHT":
-                    # Process night ending
-                    await self.process_night_end(bot, game)
+        The games go through the scheduler's worker pool, so they run
+        concurrently, each claimed once and under the transition timeout.
+        """
+        for game in await self.get_games_due(int(time.time())):
+            self.scheduler.enqueue(game.channel_id)
+        await self.scheduler.drain()
+    
+    @timed("mafia_store")
+    async def process_game_transition(self, bot, game):
+        """Run the end-of-phase handler for a game whose deadline has passed"""
+        if game.phase.name == "SIGNUP":
+            # Process signup ending
+            await self.process_signup_end(bot, game)
+        elif game.phase.name == "DAY":
+            # Process day ending
+            await self.process_day_end(bot, game)
+        elif game.phase.name == "NIGHT":
+            # Process night ending
+            await self.process_night_end(bot, game)
     
     async def process_signup_end(self, bot, game):
-        # Check if we have enough players
-        if len(game.players) < game.config.min_players:
-            # Auto-extend signup by 10 minutes (once)
-            if game.config.signup_ends_at == game.phase.ends_at:
-                game.phase.ends_at += 600  # 10 minutes
-                await self.save_game(game)
-                
-                channel = bot.get_channel(game.channel_id)
-                if channel:
-                    await channel.send(
-                        f"Not enough players to start the game. Signup extended by 10 minutes. "
-                        f"Current players: {len(game.players)}/{game.config.min_players} required."
-                    )
-                return
-            else:
-                # Already extended once, cancel the game
-                game.phase.name = "CANCELLED"
-                await self.save_game(game)
-                
-                channel = bot.get_channel(game.channel_id)
-                if channel:
-                    await channel.send(
-                        "Game cancelled due to insufficient players. "
-                        f"Required: {game.config.min_players}, got: {len(game.players)}."
-                    )
-                return
+        """End a claimed signup phase; the game changes on its actor, messages go out afterwards"""
+        outcome, game = await bot.actors.run(game.channel_id, self._end_signup, game)
+        channel = bot.get_channel(game.channel_id) if game else None
+        
+        if outcome == "extended":
+            if channel:
+                await channel.send(
+                    f"Not enough players to start the game. Signup extended by 10 minutes. "
+                    f"Current players: {len(game.players)}/{game.config.min_players} required."
+                )
+            return
+        if outcome == "cancelled":
+            if channel:
+                await channel.send(
+                    "Game cancelled due to insufficient players. "
+                    f"Required: {game.config.min_players}, got: {len(game.players)}."
+                )
+            return
+        if outcome != "start":
+            return
         
         # Proceed with game start
         from views import RoleAssignmentView
         view = RoleAssignmentView(game)
         
-        # DM the host for role assignment
-        host = await bot.fetch_user(game.host_id)
+        # DM the host for role assignment, once even if the transition is retried
+        host = await bot.resolver.user(game.host_id)
         if host:
-            await host.send(
+            await self.scheduler.once(game, "host_setup_dm", lambda: host.send(
                 "Signup has ended. Please configure the role distribution:",
                 view=view
-            )
+            ))
         
         # Update the signup message to remove buttons
-        channel = bot.get_channel(game.channel_id)
         if channel and game.messages.get('signup_message_id'):
             try:
                 msg = await channel.fetch_message(game.messages['signup_message_id'])
@@ -123,6 +675,31 @@ class GameStore:
             except:
                 pass
     
+    async def _end_signup(self, live_game, game):
+        """Extend, cancel or start a signup that ended; runs on the game's actor.
+        
+        Returns (outcome, game) with outcome "extended", "cancelled", "start",
+        or None when the live game has moved on since the phase was claimed.
+        """
+        if (not game.is_same_game(live_game) or live_game.phase.name != "SIGNUP"
+                or live_game.phase.ends_at != game.phase.ends_at):
+            return None, live_game
+        game = live_game
+        
+        # Check if we have enough players
+        if len(game.players) < game.config.min_players:
+            # Auto-extend signup by 10 minutes (once)
+            if game.config.signup_ends_at == game.phase.ends_at:
+                game.phase.ends_at += 600  # 10 minutes
+                await self.save_game(game)
+                return "extended", game
+            
+            # Already extended once, cancel the game
+            game.phase.name = "CANCELLED"
+            await self.save_game(game)
+            return "cancelled", game
+        return "start", game
+    
     async def process_day_end(self, bot, game):
         # Implement day end logic
         pass
@@ -0,0 +1,92 @@
+"""GameActors run each channel's operations one at a time against the live game."""
+import asyncio
+
+from bench_load import close_store, new_game, open_store
+from fakes import FakeBot
+
+def run_with_bot(tmp_path, test):
+    async def run():
+        store = await open_store(str(tmp_path / "games.db"), 0)
+        try:
+            await test(FakeBot(store), store)
+        finally:
+            await close_store(store)
+
+    asyncio.run(run())
+
+def test_operations_on_one_channel_run_one_at_a_time_in_order(tmp_path):
+    async def test(bot, store):
+        channel, _ = await new_game(bot)
+        other, _ = await new_game(bot)
+        running = {channel.id: 0, other.id: 0}
+        overlap = []
+        order = []
+
+        async def join(game, player_id):
+            running[game.channel_id] += 1
+            overlap.append(dict(running))
+            # Yield mid-update; nothing else may touch this game until we save
+            await asyncio.sleep(0)
+            game.add_player(player_id)
+            await store.save_game(game)
+            order.append((game.channel_id, player_id))
+            running[game.channel_id] -= 1
+            return len(game.players)
+
+        counts = await asyncio.gather(
+            *(bot.actors.run(channel.id, join, player_id) for player_id in range(2, 7)),
+            bot.actors.run(other.id, join, 2),
+        )
+
+        assert counts[:5] == [1, 2, 3, 4, 5]
+        assert [player_id for channel_id, player_id in order if channel_id == channel.id] == [2, 3, 4, 5, 6]
+        assert all(active <= 1 for snapshot in overlap for active in snapshot.values())
+        # The other channel did not wait for the first one's queue to drain
+        assert any(snapshot[channel.id] and snapshot[other.id] for snapshot in overlap)
+        assert bot.actors.stats()["active"] == 0
+
+    run_with_bot(tmp_path, test)
+
+def test_operation_submitting_to_its_own_channel_runs_inline(tmp_path):
+    async def test(bot, store):
+        channel, _ = await new_game(bot)
+
+        async def add(game, player_id):
+            game.add_player(player_id)
+            await store.save_game(game)
+
+        async def add_two(game):
+            await bot.actors.run(channel.id, add, 2)
+            # The inline call saw and changed this same live game
+            await bot.actors.run(channel.id, add, 3)
+            return [player.id for player in game.players]
+
+        # Queuing behind itself would never finish
+        assert await asyncio.wait_for(bot.actors.run(channel.id, add_two), 5) == [2, 3]
+        stats = bot.actors.stats()
+        assert stats["inline"] == 2
+        assert stats["operations"] == 1
+
+    run_with_bot(tmp_path, test)
+
+def test_cancelled_caller_does_not_cut_the_operation_short(tmp_path):
+    async def test(bot, store):
+        channel, _ = await new_game(bot)
+        started = asyncio.Event()
+
+        async def slow_join(game):
+            started.set()
+            await asyncio.sleep(0.05)
+            game.add_player(2)
+            await store.save_game(game)
+
+        caller = asyncio.create_task(bot.actors.run(channel.id, slow_join))
+        await started.wait()
+        caller.cancel()
+
+        async def players(game):
+            return [player.id for player in game.players]
+
+        assert await bot.actors.run(channel.id, players) == [2]
+
+    run_with_bot(tmp_path, test)
@@ -0,0 +1,60 @@
+"""Finished games move to the archive tables and stay out of the live store."""
+import asyncio
+import time
+
+import aiosqlite
+
+from bench_load import close_store
+from models import GameState, GameConfig, Phase
+from store import GameStore
+
+CHANNEL_ID = 100
+
+async def open_store(path):
+    store = GameStore(await aiosqlite.connect(path))
+    await store.init_db()
+    return store
+
+def day_game(players=5):
+    now = int(time.time())
+    game = GameState(
+        channel_id=CHANNEL_ID,
+        guild_id=1,
+        host_id=1,
+        config=GameConfig(signup_ends_at=now - 60),
+        players=[],
+        phase=Phase(name="DAY", number=1, ends_at=now + 3600),
+    )
+    for player_id in range(1, players + 1):
+        game.add_player(player_id)
+    return game
+
+def test_archived_game_is_not_read_back(tmp_path):
+    async def run():
+        store = await open_store(tmp_path / "games.db")
+        try:
+            game = day_game()
+            await store.save_game(game)
+            await store.record_vote(game, 1, 2)
+            await store.flush()
+
+            # A read racing the archive must not put the game back in the cache
+            game.phase.name = "ENDED"
+            await asyncio.gather(store.save_game(game), store.get_game(CHANNEL_ID))
+            assert await store.get_game(CHANNEL_ID) is None
+
+            archived = await store.get_archived_games(guild_id=1)
+            assert [row["channel_id"] for row in archived] == [CHANNEL_ID]
+            _, history = await store.get_archived_game(archived[0]["archive_id"])
+            assert len(history) == 1
+        finally:
+            await close_store(store)
+
+        # Nor does it come back from the database
+        store = await open_store(tmp_path / "games.db")
+        try:
+            assert await store.get_game(CHANNEL_ID) is None
+        finally:
+            await close_store(store)
+
+    asyncio.run(run())
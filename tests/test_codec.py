@@ -0,0 +1,83 @@
+"""Round-trips of the game_data codecs, including rows written by older versions."""
+import json
+
+import pytest
+
+import codec
+from codec import CodecError, JSONCodec, decode_game_data, default_codec
+from models import GameState, GameConfig, Phase
+
+SNOWFLAKE = 1_234_567_890_123_456_789
+
+def snowflake_game(players=20):
+    game = GameState(
+        channel_id=SNOWFLAKE,
+        guild_id=SNOWFLAKE + 1,
+        host_id=SNOWFLAKE + 2,
+        config=GameConfig(signup_ends_at=1_700_000_000),
+        players=[],
+        phase=Phase(name="DAY", number=2, ends_at=1_700_086_400),
+    )
+    for index in range(players):
+        game.add_player(SNOWFLAKE + 10 + index)
+    # More votes and failed DMs than fit a fixed-size map
+    for index in range(players - 1):
+        game.cast_vote(SNOWFLAKE + 10 + index, SNOWFLAKE + 11 + index)
+    game.failed_dms = {SNOWFLAKE + 10 + index: "x" * (40 + index) for index in range(18)}
+    return game
+
+def test_legacy_json_row_gets_integer_keys_back():
+    row = json.dumps({
+        "channel_id": SNOWFLAKE, "guild_id": 1, "host_id": 2,
+        "config": {}, "players": [],
+        "votes": {str(SNOWFLAKE): SNOWFLAKE + 1},
+        "failed_dms": {str(SNOWFLAKE + 1): "Cannot send messages to this user"},
+    })
+    data = decode_game_data(row)
+    assert data["votes"] == {SNOWFLAKE: SNOWFLAKE + 1}
+    assert data["failed_dms"] == {SNOWFLAKE + 1: "Cannot send messages to this user"}
+    # Bytes from a BLOB column read the same
+    assert decode_game_data(row.encode("utf-8")) == data
+
+def test_json_codec_round_trips_a_game():
+    game = snowflake_game()
+    json_codec = JSONCodec()
+    assert GameState.from_dict(json_codec.decode(json_codec.encode(game.to_dict()))) == game
+
+def test_binary_codec_round_trips_large_values():
+    pytest.importorskip("msgpack")
+    binary = codec.BinaryCodec()
+    game = snowflake_game()
+    decoded = binary.decode(binary.encode(game.to_dict()))
+    assert GameState.from_dict(decoded) == game
+    assert decoded["votes"] == game.votes
+
+    # Every MessagePack size class for ints, strings, maps and arrays
+    values = {
+        "ints": [0, 127, 128, -32, -33, 255, 65_536, 2**32, 2**63 - 1, -2**63],
+        "short": "a" * 31, "str8": "b" * 255, "str16": "c" * 65_535, "str32": "d" * 65_536,
+        "map16": {index: str(index) for index in range(16)},
+        "map32": {index: index for index in range(65_536)},
+        "array16": list(range(16)),
+        "flags": [None, True, False, 1.5, "ünïcode"],
+    }
+    assert binary.decode(binary.encode(values)) == values
+
+def test_corrupt_and_unknown_binary_rows_are_rejected():
+    pytest.importorskip("msgpack")
+    row = codec.BinaryCodec().encode({"votes": {}})
+    with pytest.raises(CodecError):
+        decode_game_data(row[:-1] + b"\xc1")
+    with pytest.raises(CodecError):
+        decode_game_data(codec._HEADER.pack(codec.MAGIC, 1, codec.SCHEMA_VERSION) + row[codec._HEADER.size:])
+    with pytest.raises(CodecError):
+        decode_game_data(codec._HEADER.pack(codec.MAGIC, codec.FORMAT_VERSION, codec.SCHEMA_VERSION + 1)
+                         + row[codec._HEADER.size:])
+
+def test_without_msgpack_games_are_stored_as_json(monkeypatch):
+    monkeypatch.setattr(codec, "msgpack", None)
+    assert isinstance(default_codec(), JSONCodec)
+    # A binary row can't be read back without it, and says so
+    header = codec._HEADER.pack(codec.MAGIC, codec.FORMAT_VERSION, codec.SCHEMA_VERSION)
+    with pytest.raises(CodecError, match="msgpack"):
+        decode_game_data(header + b"\x80")
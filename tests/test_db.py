@@ -0,0 +1,108 @@
+"""WriteBatcher group commits against a temporary SQLite file."""
+import asyncio
+
+import aiosqlite
+
+from db import WriteBatcher
+
+def run_with_batcher(tmp_path, test, window=0.05):
+    async def run():
+        db = await aiosqlite.connect(str(tmp_path / "writes.db"))
+        await db.execute('CREATE TABLE games (channel_id INTEGER PRIMARY KEY, data TEXT, version INTEGER)')
+        await db.commit()
+        try:
+            await test(WriteBatcher(db, window=window), db)
+        finally:
+            await db.close()
+
+    asyncio.run(run())
+
+async def rows(db):
+    async with db.execute('SELECT channel_id, data, version FROM games ORDER BY channel_id') as cursor:
+        return await cursor.fetchall()
+
+UPSERT = 'INSERT OR REPLACE INTO games (channel_id, data, version) VALUES (?, ?, ?)'
+
+def test_writes_in_one_window_share_a_commit_and_keyed_writes_coalesce(tmp_path):
+    async def test(batcher, db):
+        await asyncio.gather(
+            *(batcher.execute(UPSERT, (1, f"save {n}", n), key=("game", 1)) for n in range(1, 6)),
+            batcher.execute(UPSERT, (2, "other", 1), key=("game", 2)),
+            batcher.execute(UPSERT, (3, "unkeyed", 1)),
+        )
+
+        # Last write wins for each key
+        assert await rows(db) == [(1, "save 5", 5), (2, "other", 1), (3, "unkeyed", 1)]
+        stats = batcher.stats()
+        assert stats["commits"] == 1
+        assert stats["writes"] == 7
+        assert stats["coalesced_writes"] == 4
+        assert stats["statements"] == 3
+
+        # The next window starts a new batch
+        await batcher.execute(UPSERT, (1, "later", 6), key=("game", 1))
+        assert batcher.stats()["commits"] == 2
+        assert (await rows(db))[0] == (1, "later", 6)
+
+    run_with_batcher(tmp_path, test)
+
+def test_forget_starts_a_new_statement_for_the_key(tmp_path):
+    async def test(batcher, db):
+        first = asyncio.ensure_future(batcher.execute(UPSERT, (1, "first", 1), key=("game", 1)))
+        await asyncio.sleep(0)
+        assert batcher.pending(("game", 1))
+        batcher.forget(("game", 1))
+        second = batcher.execute(UPSERT, (1, "second", 2), key=("game", 1))
+        await asyncio.gather(first, second)
+
+        assert await rows(db) == [(1, "second", 2)]
+        assert batcher.stats()["coalesced_writes"] == 0
+        assert batcher.stats()["statements"] == 2
+
+    run_with_batcher(tmp_path, test)
+
+class Conflict(Exception):
+    pass
+
+CAS = 'UPDATE games SET data = ?, version = version + 1 WHERE channel_id = ? AND version = ?'
+
+def test_conflicting_write_raises_to_its_caller_only(tmp_path):
+    async def test(batcher, db):
+        await batcher.execute(UPSERT, (1, "saved", 2))
+
+        results = await asyncio.gather(
+            batcher.execute(CAS, ("stale", 1, 1), conflict=lambda: Conflict("version 1")),
+            batcher.execute(UPSERT, (2, "other", 1)),
+            batcher.execute_all([
+                (UPSERT, (3, "batched", 1)),
+                (CAS, ("also stale", 1, 0), lambda: Conflict("version 0")),
+            ]),
+            return_exceptions=True,
+        )
+
+        assert [type(result) for result in results] == [Conflict, type(None), Conflict]
+        assert str(results[2]) == "version 0"
+        # The rest of the batch still committed, in one commit
+        assert await rows(db) == [(1, "saved", 2), (2, "other", 1), (3, "batched", 1)]
+        assert batcher.stats()["commits"] == 2
+
+        await batcher.execute(CAS, ("current", 1, 2), conflict=lambda: Conflict("version 2"))
+        assert (await rows(db))[0] == (1, "current", 3)
+
+    run_with_batcher(tmp_path, test)
+
+def test_keyed_writes_share_the_outcome_of_the_last_check(tmp_path):
+    async def test(batcher, db):
+        await batcher.execute(UPSERT, (1, "saved", 2))
+
+        first = asyncio.ensure_future(
+            batcher.execute(CAS, ("first", 1, 2), key=("game", 1), conflict=lambda: Conflict("first")))
+        await asyncio.sleep(0)
+        # Replaces the pending write, which never runs; both callers see its conflict
+        second = batcher.execute(CAS, ("second", 1, 1), key=("game", 1), conflict=lambda: Conflict("second"))
+        results = await asyncio.gather(first, second, return_exceptions=True)
+
+        assert [str(result) for result in results] == ["second", "second"]
+        assert await rows(db) == [(1, "saved", 2)]
+
+    run_with_batcher(tmp_path, test)
@@ -0,0 +1,58 @@
+"""GameState's player lookup indexes stay in step with the player lists."""
+from models import GameState, GameConfig, Player
+
+def new_game():
+    return GameState(channel_id=1, guild_id=1, host_id=1, config=GameConfig(), players=[])
+
+def assert_index_matches_lists(game):
+    rebuilt = new_game()
+    rebuilt.players, rebuilt.dummy_players = game.players, game.dummy_players
+    rebuilt.rebuild_player_index()
+    assert game.players_by_id == rebuilt.players_by_id
+    assert game.players_by_name == rebuilt.players_by_name
+    assert game.alive_count == len(game.get_alive_players())
+
+def test_removing_one_of_two_dummies_with_the_same_name():
+    game = new_game()
+    game.add_dummy_player(Player(id=-2, name="bob"))
+    game.add_dummy_player(Player(id=-3, name="Bob"))
+
+    game.remove_player(game.get_player_by_name("bob").id)
+
+    remaining = game.get_player_by_name("bob")
+    assert remaining is not None and remaining.name == "Bob"
+    assert game.dummy_players == [remaining]
+    assert_index_matches_lists(game)
+
+def test_removing_one_of_two_players_with_the_same_id():
+    # Dummy IDs restart at -1 when the bot restarts, so they can collide
+    game = new_game()
+    first, second = Player(id=-2, name="alice"), Player(id=-2, name="carol")
+    game.add_dummy_player(first)
+    game.add_dummy_player(second)
+
+    game.remove_player(-2)
+
+    assert game.dummy_players == [second]
+    assert game.get_player(-2) is second
+    assert game.get_player_by_name("alice") is None
+    assert_index_matches_lists(game)
+
+def test_add_remove_and_clear_keep_the_index_consistent():
+    game = new_game()
+    for player_id in range(1, 6):
+        game.add_player(player_id)
+    for index, name in enumerate(["dan", "DAN", "eve", "Dan"]):
+        game.add_dummy_player(Player(id=-2 - index, name=name))
+    assert_index_matches_lists(game)
+
+    game.remove_player(3)
+    game.remove_player(-2)
+    game.kill_player(game.get_player(4))
+    assert_index_matches_lists(game)
+    assert game.get_player_by_name("dan").id == -3
+
+    game.clear_dummy_players()
+    assert game.dummy_players == []
+    assert game.get_player_by_name("dan") is None
+    assert_index_matches_lists(game)
@@ -0,0 +1,237 @@
+"""PhaseScheduler claims, retries and catch-up against a temporary SQLite file and fake Discord."""
+import asyncio
+import time
+
+import discord
+
+from bench_load import HOST_ID, close_store, new_game, open_store
+from fakes import FakeBot
+
+def new_scheduler(bot, **options):
+    bot.scheduler = bot.store.scheduler = type(bot.scheduler)(bot.store, bot, backoff=0.01, **options)
+    return bot.scheduler
+
+def run_with_bot(tmp_path, test, **scheduler_options):
+    async def run():
+        store = await open_store(str(tmp_path / "games.db"), 0)
+        bot = FakeBot(store)
+        new_scheduler(bot, **scheduler_options)
+        try:
+            await test(bot, store)
+        finally:
+            await close_store(store)
+
+    asyncio.run(run())
+
+async def due_signup(bot, players=None):
+    """A signup whose deadline has passed with enough players to start"""
+    channel, game = await new_game(bot, ends_at=int(time.time()) - 60)
+    for player_id in range(2, 2 + (players or game.config.min_players)):
+        game.add_player(player_id)
+    await bot.store.save_game(game)
+    await bot.store.flush()
+    return channel, game
+
+class ForbiddenResponse:
+    status = 403
+    reason = "Forbidden"
+
+def test_concurrent_fires_process_the_phase_once(tmp_path):
+    async def test(bot, store):
+        channel, game = await due_signup(bot)
+        calls = []
+        process = store.process_game_transition
+
+        async def counted(bot_, game):
+            calls.append(game.channel_id)
+            await asyncio.sleep(0.05)
+            await process(bot_, game)
+
+        store.process_game_transition = counted
+        await asyncio.gather(*(bot.scheduler.fire(channel.id) for _ in range(3)))
+
+        assert calls == [channel.id]
+        assert len(bot.member(HOST_ID).dms) == 1
+        # A fire arriving after the phase was handled finds nothing to do
+        await bot.scheduler.fire(channel.id)
+        assert calls == [channel.id]
+
+    run_with_bot(tmp_path, test)
+
+def test_only_one_of_two_stores_claims_a_deadline(tmp_path):
+    async def test(bot, store):
+        channel, game = await due_signup(bot)
+        other = await open_store(str(tmp_path / "games.db"), 0)
+        other_bot = FakeBot(other)
+        new_scheduler(other_bot)
+        calls = []
+
+        async def counted(bot_, game):
+            calls.append(bot_)
+
+        store.process_game_transition = other.process_game_transition = counted
+        try:
+            await asyncio.gather(bot.scheduler.fire(channel.id), other_bot.scheduler.fire(channel.id))
+        finally:
+            await close_store(other)
+
+        # The losing claim hit a version conflict, reloaded and saw the phase taken
+        assert len(calls) == 1
+        assert store.conflicts["save"] + other.conflicts["save"] == 1
+        game = await store.get_game(channel.id)
+        assert game.fired_phase == bot.scheduler.phase_key(game)
+
+    run_with_bot(tmp_path, test)
+
+def test_deadline_moved_later_is_rearmed_instead_of_claimed(tmp_path):
+    async def test(bot, store):
+        channel, game = await due_signup(bot)
+        bot.scheduler.disarm(channel.id)
+        game.phase.ends_at = int(time.time()) + 3600
+        store._cache[channel.id] = game  # changed without going through save_game
+
+        assert await bot.actors.run(channel.id, bot.scheduler.claim) is None
+        assert bot.scheduler._deadlines[channel.id] == game.phase.ends_at
+        assert (await store.get_game(channel.id)).fired_phase is None
+
+    run_with_bot(tmp_path, test)
+
+def test_retry_skips_messages_already_sent(tmp_path):
+    async def test(bot, store):
+        channel, game = await due_signup(bot)
+        calls = []
+        process = store.process_game_transition
+
+        async def fail_once(bot_, game):
+            calls.append(game.channel_id)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            await process(bot_, game)
+
+        store.process_game_transition = fail_once
+        await bot.scheduler.fire(channel.id, missed=True)
+
+        assert len(calls) == 2
+        # The offline notice went out on the first attempt only
+        assert [message.content[:6] for message in channel.messages.values()] == ["⏰ This"]
+        assert len(bot.member(HOST_ID).dms) == 1
+        game = await store.get_game(channel.id)
+        assert game.fired_phase == bot.scheduler.phase_key(game)
+        assert set(game.fired_effects) == {"offline_notice", "host_setup_dm"}
+
+    run_with_bot(tmp_path, test)
+
+def test_timeout_while_sending_keeps_the_claim(tmp_path):
+    async def test(bot, store):
+        channel, game = await due_signup(bot)
+        attempts = []
+
+        async def slow_dm(content=None, view=None, **kwargs):
+            attempts.append(content)
+            await asyncio.sleep(10)
+
+        bot.member(HOST_ID).send = slow_dm
+        await bot.scheduler.fire(channel.id)
+
+        # The DM may have reached Discord, so it is not sent again
+        assert len(attempts) == 1
+        game = await store.get_game(channel.id)
+        assert game.fired_phase == bot.scheduler.phase_key(game)
+        assert "host_setup_dm" not in game.fired_effects
+
+    run_with_bot(tmp_path, test, timeout=0.1)
+
+def test_forbidden_is_not_retried(tmp_path):
+    async def test(bot, store):
+        channel, game = await due_signup(bot)
+        attempts = []
+
+        async def closed_dms(content=None, view=None, **kwargs):
+            attempts.append(content)
+            raise discord.Forbidden(ForbiddenResponse(), "Cannot send messages to this user")
+
+        bot.member(HOST_ID).send = closed_dms
+        await bot.scheduler.fire(channel.id)
+
+        assert len(attempts) == 1
+        game = await store.get_game(channel.id)
+        assert game.fired_phase == bot.scheduler.phase_key(game)
+
+    run_with_bot(tmp_path, test)
+
+def test_repeated_failure_releases_the_claim_and_gives_up(tmp_path):
+    async def test(bot, store):
+        channel, game = await due_signup(bot)
+        calls = []
+
+        async def fail(bot_, game):
+            calls.append(game.channel_id)
+            raise RuntimeError("boom")
+
+        store.process_game_transition = fail
+        await bot.scheduler.fire(channel.id)
+
+        assert len(calls) == bot.scheduler.attempts
+        game = await store.get_game(channel.id)
+        assert game.fired_phase is None
+        # Left for the next startup's catch-up rather than retried in a loop
+        assert channel.id not in bot.scheduler._deadlines
+        assert await store.get_overdue_deadlines(int(time.time())) == [(channel.id, game.phase.ends_at)]
+
+    run_with_bot(tmp_path, test)
+
+def notices(channel):
+    return [message.content for message in channel.messages.values() if message.content.startswith("⏰")]
+
+def test_catch_up_notices_only_deadlines_missed_while_offline(tmp_path):
+    async def test(bot, store):
+        now = int(time.time())
+        given_up, _ = await due_signup(bot)          # deadline passed while the bot was still up
+        offline, game = await new_game(bot, ends_at=now - 5)
+        for player_id in range(2, 2 + game.config.min_players):
+            game.add_player(player_id)
+        await store.save_game(game)
+        fired, game = await due_signup(bot)
+        game.fired_phase = bot.scheduler.phase_key(game)
+        await store.save_game(game)
+        await store.record_alive(now - 30)
+        await store.flush()
+
+        # Start over, as after a restart
+        new_scheduler(bot, catchup_rate=0)
+        store._cache.clear()
+        await bot.scheduler.load()
+        await bot.scheduler._catchup_task
+        await bot.scheduler.drain()
+
+        assert bot.scheduler.caught_up == 2
+        assert not notices(given_up)
+        assert len(notices(offline)) == 1
+        assert not fired.messages
+        for channel in (given_up, offline):
+            game = await store.get_game(channel.id)
+            assert game.fired_phase == bot.scheduler.phase_key(game)
+        # The start was recorded as the new last-alive time
+        assert await store.get_last_alive() >= now
+
+    run_with_bot(tmp_path, test)
+
+def test_game_saved_before_catch_up_reaches_it_waits_its_turn(tmp_path):
+    async def test(bot, store):
+        channels = [(await due_signup(bot))[0] for _ in range(2)]
+        new_scheduler(bot, catchup_rate=20)
+        store._cache.clear()
+        await bot.scheduler.load()
+
+        # Catch-up queued the oldest game and is throttled before the next
+        last = await store.get_game(channels[1].id)
+        assert channels[1].id in bot.scheduler._catchup
+        last.config.max_players = 20
+        await store.save_game(last)
+        assert channels[1].id not in bot.scheduler._deadlines
+
+        await bot.scheduler._catchup_task
+        await bot.scheduler.drain()
+        assert [len(notices(channel)) for channel in channels] == [1, 1]
+
+    run_with_bot(tmp_path, test)
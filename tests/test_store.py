@@ -0,0 +1,109 @@
+"""GameStore against a temporary SQLite file: optimistic locking of saves and archives."""
+import asyncio
+import time
+
+import aiosqlite
+import pytest
+
+from models import GameState, GameConfig, Phase
+from store import GameStore, ConcurrentModificationError
+
+CHANNEL_ID = 100
+
+async def open_store(path):
+    store = GameStore(await aiosqlite.connect(path))
+    await store.init_db()
+    return store
+
+async def close_store(store):
+    await store.flush()
+    await store.db.close()
+
+def day_game(players=5):
+    now = int(time.time())
+    game = GameState(
+        channel_id=CHANNEL_ID,
+        guild_id=1,
+        host_id=1,
+        config=GameConfig(signup_ends_at=now - 60),
+        players=[],
+        phase=Phase(name="DAY", number=1, ends_at=now + 3600),
+    )
+    for player_id in range(1, players + 1):
+        game.add_player(player_id)
+    return game
+
+def test_conflicting_save_is_retried_by_update_game(tmp_path):
+    async def run():
+        first = await open_store(tmp_path / "games.db")
+        second = await open_store(tmp_path / "games.db")
+        try:
+            await first.save_game(day_game(players=3))
+            await first.flush()
+
+            # Both writers hold version 1; the first to save wins
+            stale = await second.get_game(CHANNEL_ID)
+            game = await first.get_game(CHANNEL_ID)
+            game.add_player(4)
+            await first.save_game(game)
+            await first.flush()
+
+            stale.add_player(5)
+            with pytest.raises(ConcurrentModificationError):
+                await second.save_game(stale)
+            assert second.conflicts["save"] == 1
+
+            async def add_player(game):
+                game.add_player(5)
+
+            await second.update_game(CHANNEL_ID, add_player)
+            await second.flush()
+        finally:
+            await close_store(first)
+            await close_store(second)
+
+        store = await open_store(tmp_path / "games.db")
+        try:
+            game = await store.get_game(CHANNEL_ID)
+            assert sorted(player.id for player in game.players) == [1, 2, 3, 4, 5]
+            assert game.version == 3
+        finally:
+            await close_store(store)
+
+    asyncio.run(run())
+
+def test_stale_copy_cannot_archive_a_newer_save(tmp_path):
+    async def run():
+        first = await open_store(tmp_path / "games.db")
+        second = await open_store(tmp_path / "games.db")
+        try:
+            await first.save_game(day_game(players=3))
+            await first.flush()
+
+            stale = await second.get_game(CHANNEL_ID)
+            game = await first.get_game(CHANNEL_ID)
+            game.add_player(4)
+            await first.save_game(game)
+            await second.record_vote(stale, 1, 2)
+            await first.flush()
+
+            # Cancelling the stale copy must not archive it over the newer save
+            stale.phase.name = "CANCELLED"
+            with pytest.raises(ConcurrentModificationError):
+                await second.save_game(stale)
+            assert second.conflicts["archive"] == 1
+            assert await second.get_archived_games() == []
+
+            # The live copy archives normally, and archiving it again is a no-op
+            game.phase.name = "CANCELLED"
+            await first.save_game(game)
+            await first.save_game(game)
+            archived = await first.get_archived_games()
+            assert len(archived) == 1 and archived[0]["player_count"] == 4
+            _, history = await first.get_archived_game(archived[0]["archive_id"])
+            assert len(history) == 1
+        finally:
+            await close_store(first)
+            await close_store(second)
+
+    asyncio.run(run())
@@ -0,0 +1,60 @@
+"""Votes recorded in the vote log survive a restart."""
+import asyncio
+import time
+
+import aiosqlite
+
+from bench_load import close_store
+from models import GameState, GameConfig, Phase
+from store import GameStore
+
+CHANNEL_ID = 100
+
+async def open_store(path):
+    store = GameStore(await aiosqlite.connect(path))
+    await store.init_db()
+    return store
+
+def day_game(players=5):
+    now = int(time.time())
+    game = GameState(
+        channel_id=CHANNEL_ID,
+        guild_id=1,
+        host_id=1,
+        config=GameConfig(signup_ends_at=now - 60),
+        players=[],
+        phase=Phase(name="DAY", number=1, ends_at=now + 3600),
+    )
+    for player_id in range(1, players + 1):
+        game.add_player(player_id)
+    return game
+
+def test_reload_replays_votes_newer_than_the_saved_game(tmp_path):
+    async def run():
+        store = await open_store(tmp_path / "games.db")
+        try:
+            game = day_game()
+            await store.save_game(game)
+            await store.record_vote(game, 1, 2)
+            await store.record_vote(game, 3, 2)
+            await store.record_vote(game, 4, 5)
+            await store.record_vote(game, 1, None)
+            votes, vote_seq = dict(game.votes), game.vote_seq
+        finally:
+            await close_store(store)
+
+        store = await open_store(tmp_path / "games.db")
+        try:
+            # Only vote_events rows were written after the save
+            rows = await store._read('SELECT game_data FROM games WHERE channel_id = ?', (CHANNEL_ID,))
+            assert GameState.from_dict(store.codec.decode(rows[0][0])).vote_seq == 0
+
+            game = await store.get_game(CHANNEL_ID)
+            assert game.votes == votes == {3: 2, 4: 5}
+            assert game.vote_seq == vote_seq
+            assert game.vote_counts == {2: 1, 5: 1}
+            assert not game.check_tally_consistency()
+        finally:
+            await close_store(store)
+
+    asyncio.run(run())
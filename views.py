@@ -1,148 +1,182 @@
 import discord
 from discord.ui import View, Button, Select
 from models import GameState, GameConfig
+from balance import suggest_mafia_count, heuristic_mafia_count
 from typing import Optional
 
+def signup_message_content(game: GameState, channel) -> str:
+    tentative_count = len([p for p in game.players if p.tentative])
+    full_count = len([p for p in game.players if not p.tentative])
+    max_str = f"/{game.config.max_players}" if game.config.max_players else ""
+    return (f"🎭 Mafia Signup (Channel: {channel.mention})\n"
+            f"Players: {full_count}{max_str} ({tentative_count} tentative)\n"
+            f"Signup ends: <t:{game.config.signup_ends_at}:F> — <t:{game.config.signup_ends_at}:R>")
+
 class SignupView(View):
-    def __init__(self, game: GameState):
+    """Join/Tentative/Withdraw buttons of a signup message.
+
+    The view holds no game: each click looks up the live game of the
+    interaction's channel, so the same view can be re-attached to its
+    message after a restart (see MafiaBot.setup_hook).
+    """
+
+    def __init__(self):
         super().__init__(timeout=None)
-        self.game = game
+
+    def refresh_signup_message(self, interaction: discord.Interaction, game: GameState):
+        """Queue an edit of the signup message; a burst of clicks becomes one edit"""
+        message_id = game.messages.get('signup_message_id')
+        if not message_id:
+            return
+        channel = interaction.channel
+        interaction.client.signup_renderer.request(channel, message_id, lambda: self.render(game, channel))
+
+    def render(self, game: GameState, channel):
+        # Built when the edit is sent, so it always shows the latest signups
+        if game.phase.name != "SIGNUP":
+            # Signup closed while the edit was pending; don't put the buttons back
+            return {"view": None}
+        return {"content": signup_message_content(game, channel), "view": self}
     
-    @discord.ui.button(label="Join", style=discord.ButtonStyle.success, custom_id="join_button")
-    async def join_button(self, interaction: discord.Interaction, button: Button):
+    async def apply(self, interaction: discord.Interaction, change):
+        """Run change(game, user_id) on the channel's live game, reply with its message and refresh the signup post"""
+        # Acknowledge first: the click may wait behind slow work on this game
+        # for longer than Discord's 3 second window
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        actors = interaction.client.actors
+        reply, game = await actors.run(interaction.channel.id, self._apply, interaction, change)
+        await interaction.followup.send(reply, ephemeral=True)
+        if game:
+            self.refresh_signup_message(interaction, game)
+
+    async def _apply(self, game, interaction, change):
+        if not game or game.phase.name != "SIGNUP":
+            return "Signup for this game has closed.", None
+        # Buttons left on the signup message of an earlier game in this channel
+        signup_message_id = game.messages.get('signup_message_id')
+        if interaction.message and signup_message_id and interaction.message.id != signup_message_id:
+            return "This signup message is from an earlier game.", None
+        reply, changed = change(game, interaction.user.id)
+        if changed:
+            await interaction.client.store.save_game(game)
+        return reply, game
+
+    @staticmethod
+    def join(game: GameState, user_id: int):
         # Check if user is already in the game
-        user_id = interaction.user.id
-        player = self.game.get_player(user_id)
-        
+        player = game.get_player(user_id)
         if player and not player.tentative:
-            await interaction.response.send_message("You're already in the game!", ephemeral=True)
-            return
+            return "You're already in the game!", False
         
         # Check if game is full
-        max_players = self.game.config.max_players
-        if max_players and len([p for p in self.game.players if not p.tentative]) >= max_players:
+        max_players = game.config.max_players
+        if max_players and len([p for p in game.players if not p.tentative]) >= max_players:
             # Check if there are tentatives to remove
-            tentatives = [p for p in self.game.players if p.tentative]
-            if tentatives:
-                # Remove the most recent tentative
-                self.game.remove_player(tentatives[-1].id)
-                self.game.add_player(user_id, tentative=False)
-                await interaction.response.send_message("You've joined the game! A tentative player was removed to make space.", ephemeral=True)
-            else:
-                await interaction.response.send_message("The game is full!", ephemeral=True)
-                return
-        else:
-            if player and player.tentative:
-                # Promote from tentative to full
-                player.tentative = False
-                await interaction.response.send_message("You've been promoted from tentative to full player!", ephemeral=True)
-            else:
-                # Add new player
-                self.game.add_player(user_id, tentative=False)
-                await interaction.response.send_message("You've joined the game!", ephemeral=True)
+            tentatives = [p for p in game.players if p.tentative]
+            if not tentatives:
+                return "The game is full!", False
+            # Remove the most recent tentative
+            game.remove_player(tentatives[-1].id)
+            game.add_player(user_id, tentative=False)
+            return "You've joined the game! A tentative player was removed to make space.", True
         
-        # Update the signup message
-        from store import GameStore
-        store = GameStore(interaction.client.db)
-        await store.save_game(self.game)
+        if player and player.tentative:
+            # Promote from tentative to full
+            player.tentative = False
+            return "You've been promoted from tentative to full player!", True
         
-        # Update the signup message count
-        channel = interaction.channel
-        try:
-            msg = await channel.fetch_message(self.game.messages['signup_message_id'])
-            tentative_count = len([p for p in self.game.players if p.tentative])
-            full_count = len([p for p in self.game.players if not p.tentative])
-            max_str = f"/{self.game.config.max_players}" if self.game.config.max_players else ""
-            
-            await msg.edit(
-                content=f"🎭 Mafia Signup (Channel: {channel.mention})\n"
-                       f"Players: {full_count}{max_str} ({tentative_count} tentative)\n"
-                       f"Signup ends: <t:{self.game.config.signup_ends_at}:F> — <t:{self.game.config.signup_ends_at}:R>",
-                view=self
-            )
-        except:
-            pass
+        # Add new player
+        game.add_player(user_id, tentative=False)
+        return "You've joined the game!", True
 
-    @discord.ui.button(label="Tentative", style=discord.ButtonStyle.secondary, custom_id="tentative_button")
-    async def tentative_button(self, interaction: discord.Interaction, button: Button):
-        user_id = interaction.user.id
-        
+    @staticmethod
+    def tentative(game: GameState, user_id: int):
         # Check if user is already in the game
-        player = self.game.get_player(user_id)
+        player = game.get_player(user_id)
         if player:
             if player.tentative:
-                await interaction.response.send_message("You're already tentative!", ephemeral=True)
-            else:
-                await interaction.response.send_message("You're already a full player! Use the Join button if you want to confirm your spot.", ephemeral=True)
-            return
+                return "You're already tentative!", False
+            return "You're already a full player! Use the Join button if you want to confirm your spot.", False
         
         # Add as tentative
-        self.game.add_player(user_id, tentative=True)
-        await interaction.response.send_message("You've been added as a tentative player.", ephemeral=True)
-        
-        # Update the signup message
-        from store import GameStore
-        store = GameStore(interaction.client.db)
-        await store.save_game(self.game)
-        
-        # Update the signup message count
-        channel = interaction.channel
-        try:
-            msg = await channel.fetch_message(self.game.messages['signup_message_id'])
-            tentative_count = len([p for p in self.game.players if p.tentative])
-            full_count = len([p for p in self.game.players if not p.tentative])
-            max_str = f"/{self.game.config.max_players}" if self.game.config.max_players else ""
-            
-            await msg.edit(
-                content=f"🎭 Mafia Signup (Channel: {channel.mention})\n"
-                       f"Players: {full_count}{max_str} ({tentative_count} tentative)\n"
-                       f"Signup ends: <t:{self.game.config.signup_ends_at}:F> — <t:{self.game.config.signup_ends_at}:R>",
-                view=self
-            )
-        except:
-            pass
+        game.add_player(user_id, tentative=True)
+        return "You've been added as a tentative player.", True
 
-    @discord.ui.button(label="Withdraw", style=discord.ButtonStyle.danger, custom_id="withdraw_button")
-    async def withdraw_button(self, interaction: discord.Interaction, button: Button):
-        user_id = interaction.user.id
-        
+    @staticmethod
+    def withdraw(game: GameState, user_id: int):
         # Check if user is in the game
-        player = self.game.get_player(user_id)
-        if not player:
-            await interaction.response.send_message("You're not in the game!", ephemeral=True)
-            return
+        if not game.get_player(user_id):
+            return "You're not in the game!", False
         
         # Remove the player
-        self.game.remove_player(user_id)
-        await interaction.response.send_message("You've been removed from the game.", ephemeral=True)
-        
-        # Update the signup message
-        from store import GameStore
-        store = GameStore(interaction.client.db)
-        await store.save_game(self.game)
-        
-        # Update the signup message count
-        channel = interaction.channel
-        try:
-            msg = await channel.fetch_message(self.game.messages['signup_message_id'])
-            tentative_count = len([p for p in self.game.players if p.tentative])
-            full_count = len([p for p in self.game.players if not p.tentative])
-            max_str = f"/{self.game.config.max_players}" if self.game.config.max_players else ""
-            
-            await msg.edit(
-                content=f"🎭 Mafia Signup (Channel: {channel.mention})\n"
-                       f"Players: {full_count}{max_str} ({tentative_count} tentative)\n"
-                       f"Signup ends: <t:{self.game.config.signup_ends_at}:F> — <t:{self.game.config.signup_ends_at}:R>",
-                view=self
-            )
-        except:
-            pass
-
-class SetupView(View):
-    def __init__(self, game: GameState):
-        super().__init__(timeout=300)  # 5 minute timeout
-        self.game = game
+        game.remove_player(user_id)
+        return "You've been removed from the game.", True
     
+    # Clicks are applied through the channel's GameActor, so concurrent clicks
+    # can't both pass the capacity check or overwrite each other's signups
+    @discord.ui.button(label="Join", style=discord.ButtonStyle.success, custom_id="join_button")
+    async def join_button(self, interaction: discord.Interaction, button: Button):
+        await self.apply(interaction, self.join)
+
+    @discord.ui.button(label="Tentative", style=discord.ButtonStyle.secondary, custom_id="tentative_button")
+    async def tentative_button(self, interaction: discord.Interaction, button: Button):
+        await self.apply(interaction, self.tentative)
+
+    @discord.ui.button(label="Withdraw", style=discord.ButtonStyle.danger, custom_id="withdraw_button")
+    async def withdraw_button(self, interaction: discord.Interaction, button: Button):
+        await self.apply(interaction, self.withdraw)
+
+class GameView(View):
+    """Base for views about one game that are sent to the host.
+
+    The view only remembers which game it is for. Every interaction is
+    acknowledged first, then looks the game up by channel and reads or
+    changes it through the channel's GameActor, so it never works on a
+    stale copy. A game that ended or was replaced by a new one in the same
+    channel is left alone.
+    """
+
+    def __init__(self, game: GameState, timeout: Optional[float] = 300):
+        super().__init__(timeout=timeout)
+        self.channel_id = game.channel_id
+        self.host_id = game.host_id
+        # Tells this game apart from later games in the same channel
+        self.signup_ends_at = game.config.signup_ends_at
+
+    async def run(self, interaction: discord.Interaction, operation, *args):
+        """Defer the interaction and return `await operation(game, *args)`, or None if the game is gone"""
+        # The game's actor may be busy with slow work (e.g. a game start) for
+        # longer than Discord's 3 second window to acknowledge an interaction
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        return await interaction.client.actors.run(self.channel_id, self._run, operation, args)
+
+    async def _run(self, game, operation, args):
+        if not game or game.config.signup_ends_at != self.signup_ends_at or game.phase.name in ("ENDED", "CANCELLED"):
+            return None
+        return await operation(game, *args)
+
+    async def set_config(self, interaction: discord.Interaction, change, reply: str):
+        """Apply change(config) to the game during signup and save it; returns the live game or None"""
+        async def apply(game):
+            if game.phase.name != "SIGNUP":
+                return None
+            change(game.config)
+            await interaction.client.store.save_game(game)
+            return game
+
+        game = await self.run(interaction, apply)
+        await interaction.followup.send(reply if game else "This game can no longer be configured.", ephemeral=True)
+        return game
+
+# Player cap choices of the setup wizard: value -> (min players, max players)
+PLAYER_CAPS = {
+    "micro": (5, 7),
+    "normal": (7, 13),
+    "large": (14, 25),
+    "unlimited": (5, None),
+}
+
+class SetupView(GameView):
     @discord.ui.select(
         placeholder="Select player cap",
         options=[
@@ -154,47 +188,37 @@ class SetupView(View):
         ]
     )
     async def player_cap_select(self, interaction: discord.Interaction, select: Select):
-        if interaction.user.id != self.game.host_id:
+        if interaction.user.id != self.host_id:
             await interaction.response.send_message("Only the host can configure the game.", ephemeral=True)
             return
         
         value = select.values[0]
-        if value == "micro":
-            self.game.config.min_players = 5
-            self.game.config.max_players = 7
-        elif value == "normal":
-            self.game.config.min_players = 7
-            self.game.config.max_players = 13
-        elif value == "large":
-            self.game.config.min_players = 14
-            self.game.config.max_players = 25
-        elif value == "unlimited":
-            self.game.config.min_players = 5
-            self.game.config.max_players = None
-        else:  # custom
+        if value not in PLAYER_CAPS:  # custom
             # Would need to implement a modal for custom input
             await interaction.response.send_message("Please use the command again with custom parameters: `m!play custom <min> <max>`", ephemeral=True)
             return
+        min_players, max_players = PLAYER_CAPS[value]
         
-        await interaction.response.send_message(f"Player cap set to: {self.game.config.min_players}-{self.game.config.max_players or '∞'}", ephemeral=True)
+        def change(config: GameConfig):
+            config.min_players = min_players
+            config.max_players = max_players
+        
+        game = await self.set_config(interaction, change, f"Player cap set to: {min_players}-{max_players or '∞'}")
         
         # Proceed to next configuration step
-        await self.ask_game_length(interaction)
+        if game:
+            await self.ask_game_length(interaction, game)
     
-    async def ask_game_length(self, interaction: discord.Interaction):
+    async def ask_game_length(self, interaction: discord.Interaction, game: GameState):
         # Create a new view for game length selection
-        view = GameLengthView(self.game)
+        view = GameLengthView(game)
         await interaction.followup.send(
             "Select game length:",
             view=view,
             ephemeral=True
         )
 
-class GameLengthView(View):
-    def __init__(self, game: GameState):
-        super().__init__(timeout=300)
-        self.game = game
-    
+class GameLengthView(GameView):
     @discord.ui.select(
         placeholder="Select game length",
         options=[
@@ -204,29 +228,30 @@ class GameLengthView(View):
         ]
     )
     async def game_length_select(self, interaction: discord.Interaction, select: Select):
-        if interaction.user.id != self.game.host_id:
+        if interaction.user.id != self.host_id:
             await interaction.response.send_message("Only the host can configure the game.", ephemeral=True)
             return
         
-        self.game.config.game_length = select.values[0].upper()
-        await interaction.response.send_message(f"Game length set to: {self.game.config.game_length}", ephemeral=True)
+        game_length = select.values[0].upper()
+        
+        def change(config: GameConfig):
+            config.game_length = game_length
+        
+        game = await self.set_config(interaction, change, f"Game length set to: {game_length}")
         
         # Proceed to next configuration step
-        await self.ask_role_density(interaction)
+        if game:
+            await self.ask_role_density(interaction, game)
     
-    async def ask_role_density(self, interaction: discord.Interaction):
-        view = RoleDensityView(self.game)
+    async def ask_role_density(self, interaction: discord.Interaction, game: GameState):
+        view = RoleDensityView(game)
         await interaction.followup.send(
             "Select role density:",
             view=view,
             ephemeral=True
         )
 
-class RoleDensityView(View):
-    def __init__(self, game: GameState):
-        super().__init__(timeout=300)
-        self.game = game
-    
+class RoleDensityView(GameView):
     @discord.ui.select(
         placeholder="Select role density",
         options=[
@@ -236,15 +261,20 @@ class RoleDensityView(View):
         ]
     )
     async def role_density_select(self, interaction: discord.Interaction, select: Select):
-        if interaction.user.id != self.game.host_id:
+        if interaction.user.id != self.host_id:
             await interaction.response.send_message("Only the host can configure the game.", ephemeral=True)
             return
         
-        self.game.config.role_density = select.values[0].upper()
-        await interaction.response.send_message(f"Role density set to: {self.game.config.role_density}", ephemeral=True)
+        role_density = select.values[0].upper()
+        
+        def change(config: GameConfig):
+            config.role_density = role_density
+        
+        game = await self.set_config(interaction, change, f"Role density set to: {role_density}")
         
         # Proceed to next configuration step
-        await self.ask_signup_duration(interaction)
+        if game:
+            await self.ask_signup_duration(interaction)
     
     async def ask_signup_duration(self, interaction: discord.Interaction):
         # Would need to implement a modal for duration input
@@ -253,34 +283,36 @@ class RoleDensityView(View):
             ephemeral=True
         )
 
-class RoleAssignmentView(View):
+class RoleAssignmentView(GameView):
     def __init__(self, game: GameState):
-        super().__init__(timeout=None)
-        self.game = game
+        super().__init__(game, timeout=None)
     
     @discord.ui.button(label="Set Mafia Count", style=discord.ButtonStyle.primary)
     async def set_mafia_count(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != self.game.host_id:
+        if interaction.user.id != self.host_id:
             await interaction.response.send_message("Only the host can configure roles.", ephemeral=True)
             return
         
-        # Calculate suggested mafia count based on role density
-        total_players = len(self.game.players)
-        if self.game.config.role_density == "VANILLA":
-            suggested = max(1, total_players // 4)
-        elif self.game.config.role_density == "LIGHT":
-            suggested = max(1, total_players // 3)
-        else:  # HEAVY
-            suggested = max(1, total_players // 2)
-        
-        await interaction.response.send_message(
-            f"Suggested mafia count: {suggested}. Use `m!mafia <count>` to set the exact number.",
-            ephemeral=True
-        )
+        reply = await self.run(interaction, self._suggest_mafia_count)
+        await interaction.followup.send(reply or "This game is no longer waiting to start.", ephemeral=True)
+    
+    async def _suggest_mafia_count(self, game):
+        # Look up the most balanced mafia count in the precomputed balance model table
+        total_players = len(game.players)
+        density = game.config.role_density
+        suggestion = suggest_mafia_count(total_players, density, game.neutral_count or 0)
+        if suggestion:
+            suggested, mafia_win_rate = suggestion
+            estimate = f" (rough balance estimate: mafia win about {mafia_win_rate:.0%})"
+        else:
+            # Setup outside the table; fall back to the density ratios
+            suggested = heuristic_mafia_count(total_players, density)
+            estimate = ""
+        return f"Suggested mafia count: {suggested}{estimate}. Use `m!mafia <count>` to set the exact number."
     
     @discord.ui.button(label="Set Neutral Count", style=discord.ButtonStyle.secondary)
     async def set_neutral_count(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != self.game.host_id:
+        if interaction.user.id != self.host_id:
             await interaction.response.send_message("Only the host can configure roles.", ephemeral=True)
             return
         
@@ -291,17 +323,28 @@ class RoleAssignmentView(View):
     
     @discord.ui.button(label="Confirm and Start", style=discord.ButtonStyle.success)
     async def confirm_start(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != self.game.host_id:
+        if interaction.user.id != self.host_id:
             await interaction.response.send_message("Only the host can start the game.", ephemeral=True)
             return
         
+        # Validate and deal roles on the live game, so a double click can't start it twice
+        reply, game = await self.run(interaction, self._start, interaction.client) or (None, None)
+        await interaction.followup.send(reply or "This game is no longer waiting to start.", ephemeral=True)
+        
+        # DMs, the mafia channel and the announcement don't hold up the game's actor
+        if game:
+            from cogs.setup import send_game_start
+            await send_game_start(interaction.client, game)
+    
+    async def _start(self, game, bot):
+        if game.phase.name != "SIGNUP":
+            return "This game is no longer waiting to start.", None
+        
         # Validate that we have mafia and neutral counts set
-        if not hasattr(self.game, 'mafia_count') or not hasattr(self.game, 'neutral_count'):
-            await interaction.response.send_message("Please set both mafia and neutral counts first.", ephemeral=True)
-            return
+        if game.mafia_count is None or game.neutral_count is None:
+            return "Please set both mafia and neutral counts first.", None
         
         # Assign roles and start the game
         from cogs.setup import assign_roles
-        await assign_roles(interaction.client, self.game)
-        
-        await interaction.response.send_message("Game is starting! Roles are being assigned and DMed to players.", ephemeral=True)
\ No newline at end of file
+        await assign_roles(bot, game)
+        return "Game is starting! Roles are being assigned and DMed to players.", game